@@ -83,6 +83,14 @@ def create_app(config_object="config.Config"):
             'task': 'tasks.check_discord_chilli',  # Update with your actual task path
             'schedule': 30.0,  # 300 seconds = 5 minutes
         },
+        'refresh-external-sources': {
+            'task': 'tasks.refresh_external_sources',
+            'schedule': app.config['EXTERNAL_REFRESH_INTERVAL'],
+        },
+        'compact-storage': {
+            'task': 'tasks.compact_storage',
+            'schedule': app.config['STORAGE_COMPACTION_INTERVAL'],
+        },
     }
     celery_app.conf.timezone = 'UTC'  # Adjust this if you want a different timezone
     wait_for_ollama_ready()
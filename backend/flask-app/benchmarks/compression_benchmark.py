@@ -0,0 +1,82 @@
+"""
+Throughput vs. ratio of zstd compression at rest, per compression level.
+
+Usage (from backend/flask-app):
+    python -m benchmarks.compression_benchmark data/a.csv data/b.csv --levels 1 3 6 9 19
+
+Without files, a synthetic CSV shaped like our typical uploads (ids, timestamps,
+floats, categories, free text) is generated. Payloads are compressed one segment at
+a time, exactly as `ZenohFileHandler` stores them.
+"""
+import io
+import os
+import time
+import random
+import argparse
+import zstandard
+from utils.compression import ZSTD_MAGIC
+
+MB = 1024 * 1024
+SEGMENT_SIZE = int(os.getenv("ZENOH_SEGMENT_SIZE", 4 * MB))  # Same default as the file handler
+
+
+def synthetic_csv(rows=200_000, seed=42):
+    rng = random.Random(seed)
+    categories = ["sensor_a", "sensor_b", "gateway", "edge-node", "cloud"]
+    words = ["ok", "warning", "degraded", "timeout", "restarted", "nominal", "retrying"]
+    out = io.StringIO()
+    out.write("id,timestamp,device,temperature,humidity,latency_ms,status,comment\n")
+    ts = 1_700_000_000
+    for i in range(rows):
+        ts += rng.randint(1, 30)
+        out.write(
+            f"{i},{ts},{rng.choice(categories)},{rng.gauss(21, 3):.3f},{rng.uniform(20, 80):.2f},"
+            f"{rng.expovariate(1 / 40):.1f},{rng.choice(words)},\"{' '.join(rng.choices(words, k=4))}\"\n"
+        )
+    return out.getvalue().encode("utf-8")
+
+
+def segments(data):
+    view = memoryview(data)
+    return [view[i:i + SEGMENT_SIZE] for i in range(0, len(view), SEGMENT_SIZE)]
+
+
+def bench(name, data, level):
+    compressor = zstandard.ZstdCompressor(level=level)
+    decompressor = zstandard.ZstdDecompressor()
+    parts = segments(data)
+
+    start = time.perf_counter()
+    compressed = [ZSTD_MAGIC + compressor.compress(part) for part in parts]
+    compress_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for part in compressed:
+        decompressor.decompress(part[len(ZSTD_MAGIC):])
+    decompress_time = time.perf_counter() - start
+
+    stored = sum(len(part) for part in compressed)
+    print(
+        f"{name:<30} {level:>5} {len(data) / stored:>7.2f}x "
+        f"{len(data) / MB / compress_time:>12.1f} {len(data) / MB / decompress_time:>14.1f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="zstd throughput vs. ratio on CSV payloads")
+    parser.add_argument("files", nargs="*", help="CSV files to benchmark (default: synthetic CSV)")
+    parser.add_argument("--levels", nargs="+", type=int, default=[1, 3, 6, 9, 19])
+    args = parser.parse_args()
+
+    inputs = [(os.path.basename(path), open(path, "rb").read()) for path in args.files]
+    if not inputs:
+        inputs = [("synthetic.csv", synthetic_csv())]
+
+    print(f"{'file':<30} {'level':>5} {'ratio':>8} {'comp MB/s':>12} {'decomp MB/s':>14}")
+    for name, data in inputs:
+        for level in args.levels:
+            bench(f"{name} ({len(data) / MB:.1f}MB)", data, level)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+Latency and throughput of ZenohFileHandler put/get/list/delete.
+
+Usage (from backend/flask-app):
+    # In-process storage (a queryable + subscriber holding objects in memory)
+    python -m benchmarks.storage_benchmark --backend memory --sizes 1KB 1MB 64MB --concurrency 1 8
+
+    # Real storage nodes, e.g. a local zenohd started with zenoh1/zenoh-fs.json5
+    ZENOH_CONNECT=tcp/localhost:7447 python -m benchmarks.storage_benchmark --backend zenoh \\
+        --sizes 1KB 1MB 1GB --segment-sizes 1MB 4MB 16MB --output results/$(date +%F).json
+
+For every object size, concurrency level and segment size, `--count` objects are put,
+read back, listed and deleted. Reported per operation: p50/p99 latency, MB/s, operations/s
+and peak RSS of the process so far. Results are saved as JSON to compare runs over time.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import platform
+import resource
+import subprocess
+from datetime import datetime, timezone
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+import zenoh
+from utils import zenoh_file_handler
+from utils.zenoh_file_handler import ZenohFileHandler
+from utils.zenoh_session import get_zenoh_session
+from benchmarks.compression_benchmark import synthetic_csv
+
+UNITS = {"KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3}
+BLOCK_SIZE = 1024 * 1024  # Content is generated block by block so multi-GB objects never sit in memory
+
+
+def parse_size(value):
+    value = value.strip().upper()
+    for unit, factor in UNITS.items():
+        if value.endswith(unit):
+            return int(float(value[:-len(unit)]) * factor)
+    return int(value)
+
+
+def format_size(size):
+    for unit in ("GB", "MB", "KB"):
+        if size >= UNITS[unit] and size % UNITS[unit] == 0:
+            return f"{size // UNITS[unit]}{unit}"
+    return f"{size}B"
+
+
+class MemoryStorage:
+    """In-process stand-in for a storage node: answers queries from objects kept in a dict."""
+
+    def __init__(self, session, key_expr):
+        self.objects = {}
+        self._subscriber = session.declare_subscriber(key_expr, self._on_sample)
+        self._queryable = session.declare_queryable(key_expr, self._on_query)
+
+    def _on_sample(self, sample):
+        if sample.kind == zenoh.SampleKind.DELETE():
+            for key in [key for key in self.objects if zenoh.KeyExpr(key).intersects(sample.key_expr)]:
+                del self.objects[key]
+        else:
+            self.objects[str(sample.key_expr)] = sample.payload
+
+    def _on_query(self, query):
+        selector = query.selector.key_expr
+        for key, payload in list(self.objects.items()):
+            if zenoh.KeyExpr(key).intersects(selector):
+                query.reply(zenoh.Sample(key, payload))
+
+    def close(self):
+        self._queryable.undeclare()
+        self._subscriber.undeclare()
+
+
+@lru_cache(maxsize=1)
+def csv_sample():
+    return synthetic_csv(rows=50_000)
+
+
+def content_blocks(size, data):
+    """Yield `size` bytes of random (incompressible) or CSV-like (compressible) content."""
+    position = 0
+    remaining = size
+    while remaining:
+        block_size = min(BLOCK_SIZE, remaining)
+        if data == "csv":
+            source = csv_sample()
+            block = bytearray()
+            while len(block) < block_size:
+                take = min(block_size - len(block), len(source) - position)
+                block += source[position:position + take]
+                position = (position + take) % len(source)
+            yield bytes(block)
+        else:
+            yield os.urandom(block_size)
+        remaining -= block_size
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 / (1024 if sys.platform == "darwin" else 1)
+
+
+def timed_batch(operation, items, concurrency):
+    """Run `operation` over `items` with `concurrency` workers. Returns (latencies, wall time)."""
+    def run(item):
+        start = time.perf_counter()
+        operation(item)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(run, items))
+    return latencies, time.perf_counter() - start
+
+
+def wait_until_listed(prefix, count, timeout=60):
+    """Storages apply puts asynchronously: wait until `count` objects are visible under `prefix`."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if len(ZenohFileHandler.list_objects(f"{prefix}/**")) >= count:
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def result(op, latencies, wall, total_bytes, case):
+    return {
+        **case,
+        "op": op,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "mb_s": round(total_bytes / UNITS["MB"] / wall, 2) if total_bytes else None,
+        "ops_s": round(len(latencies) / wall, 2),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def run_case(prefix, size, concurrency, segment_size, count, data):
+    zenoh_file_handler.SEGMENT_SIZE = segment_size
+    case = {"size": size, "concurrency": concurrency, "segment_size": segment_size, "count": count}
+    case_prefix = f"{prefix}/{format_size(size)}-c{concurrency}-s{format_size(segment_size)}"
+    keys = [f"{case_prefix}/object_{i}.bin" for i in range(count)]
+    results = []
+
+    def put(key):
+        if not ZenohFileHandler.put_stream(key, content_blocks(size, data)):
+            raise RuntimeError(f"Failed to store {key}")
+
+    latencies, wall = timed_batch(put, keys, concurrency)
+    results.append(result("put", latencies, wall, size * count, case))
+    if not wait_until_listed(case_prefix, count):
+        raise RuntimeError(f"Objects under {case_prefix} did not become visible")
+
+    def get(key):
+        stream = ZenohFileHandler.get_stream(key)
+        if stream is None:
+            raise RuntimeError(f"Missing {key}")
+        for _ in stream:
+            pass
+
+    latencies, wall = timed_batch(get, keys, concurrency)
+    results.append(result("get", latencies, wall, size * count, case))
+
+    latencies, wall = timed_batch(lambda _: ZenohFileHandler.list_objects(f"{case_prefix}/**"), range(5), 1)
+    results.append(result("list", latencies, wall, 0, case))
+
+    latencies, wall = timed_batch(ZenohFileHandler.delete_file, keys, concurrency)
+    results.append(result("delete", latencies, wall, 0, case))
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ZenohFileHandler storage benchmark")
+    parser.add_argument("--backend", choices=["memory", "zenoh"], default="memory",
+                        help="memory: in-process storage; zenoh: storage nodes reachable from the session config")
+    parser.add_argument("--prefix", default="projects/benchmark", help="Key prefix, must be served by a storage for --backend zenoh")
+    parser.add_argument("--sizes", nargs="+", default=["1KB", "64KB", "1MB", "16MB"])
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 8])
+    parser.add_argument("--segment-sizes", nargs="+", default=[format_size(zenoh_file_handler.SEGMENT_SIZE)])
+    parser.add_argument("--count", type=int, default=20, help="Objects per case")
+    parser.add_argument("--data", choices=["random", "csv"], default="random", help="Incompressible or CSV-like content")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    session = get_zenoh_session()
+    storage = MemoryStorage(session, f"{args.prefix}/**") if args.backend == "memory" else None
+    if storage:
+        # Index entries live in their own key space
+        index_storage = MemoryStorage(session, f"{zenoh_file_handler.index_key(args.prefix)}/**")
+
+    # Warm up routes and declarations so the first measured case is not penalized
+    ZenohFileHandler.put_file(f"{args.prefix}/warmup", b"warmup")
+    wait_until_listed(args.prefix, 1, timeout=10)
+    ZenohFileHandler.delete_file(f"{args.prefix}/warmup")
+
+    results = []
+    print(f"{'op':<7} {'size':>6} {'conc':>4} {'segment':>7} {'p50 ms':>9} {'p99 ms':>9} {'MB/s':>9} {'ops/s':>9} {'RSS MB':>8}")
+    try:
+        for size in map(parse_size, args.sizes):
+            for concurrency in args.concurrency:
+                for segment_size in map(parse_size, args.segment_sizes):
+                    for row in run_case(args.prefix, size, concurrency, segment_size, args.count, args.data):
+                        results.append(row)
+                        print(
+                            f"{row['op']:<7} {format_size(size):>6} {concurrency:>4} {format_size(segment_size):>7} "
+                            f"{row['p50_ms']:>9} {row['p99_ms']:>9} {row['mb_s'] if row['mb_s'] is not None else '-':>9} "
+                            f"{row['ops_s']:>9} {row['peak_rss_mb']:>8}"
+                        )
+    finally:
+        if storage:
+            storage.close()
+            index_storage.close()
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "commit": git_commit(),
+            "backend": args.backend,
+            "data": args.data,
+            "host": socket.gethostname(),
+            "python": platform.python_version(),
+            "compression": os.getenv("ZENOH_COMPRESSION", "zstd"),
+        },
+        "results": results,
+    }
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Throughput of ZenohFileHandler put/get over TCP vs the same-host transports.
+
+Usage (from backend/flask-app, Linux):
+    python -m benchmarks.transport_benchmark --sizes 100MB 500MB --repeat 3
+
+A storage peer holding objects in memory is started in a separate process, listening on
+both TCP and a Unix socket. Large objects are then put and read back through
+ZenohFileHandler with the session configured for each transport in turn:
+
+    tcp      ZENOH_CONNECT=tcp/...
+    unixsock ZENOH_LOCAL_SOCKET=...
+    shm      ZENOH_LOCAL_SOCKET=... and ZENOH_SHARED_MEMORY=true
+"""
+import os
+import json
+import time
+import argparse
+import tempfile
+import multiprocessing
+from benchmarks.storage_benchmark import parse_size, format_size, content_blocks, wait_until_listed
+
+TRANSPORTS = ("tcp", "unixsock", "shm")
+
+
+def run_storage_peer(prefix, tcp_endpoint, socket_path, ready, stop):
+    """Storage peer for the benchmark, run in its own process."""
+    import zenoh
+    from utils.zenoh_file_handler import index_key
+    from benchmarks.storage_benchmark import MemoryStorage
+
+    config = zenoh.Config()
+    config.insert_json5("mode", json.dumps("peer"))
+    config.insert_json5("listen/endpoints", json.dumps([tcp_endpoint, f"unixsock-stream/{socket_path}"]))
+    config.insert_json5("scouting/multicast/enabled", "false")
+    config.insert_json5("transport/shared_memory/enabled", "true")
+    session = zenoh.open(config)
+    storages = [MemoryStorage(session, f"{prefix}/**"), MemoryStorage(session, f"{index_key(prefix)}/**")]
+    ready.set()
+    stop.wait()
+    for storage in storages:
+        storage.close()
+    os._exit(0)  # Skip interpreter teardown of the Zenoh runtime threads
+
+
+def configure_transport(transport, tcp_endpoint, socket_path):
+    """Point the process-wide session at the storage peer through `transport`."""
+    from utils.zenoh_session import reset_zenoh_session
+
+    os.environ["ZENOH_MODE"] = "client"
+    os.environ["ZENOH_CONNECT"] = tcp_endpoint
+    os.environ.pop("ZENOH_CONFIG_PATH", None)
+    os.environ.pop("ZENOH_LOCAL_SOCKET", None)
+    os.environ.pop("ZENOH_SHARED_MEMORY", None)
+    if transport in ("unixsock", "shm"):
+        os.environ["ZENOH_LOCAL_SOCKET"] = socket_path
+    if transport == "shm":
+        os.environ["ZENOH_SHARED_MEMORY"] = "true"
+    reset_zenoh_session()
+
+
+def run_case(prefix, transport, size, repeat, data):
+    from utils.zenoh_file_handler import ZenohFileHandler
+
+    key = f"{prefix}/{transport}-{format_size(size)}.bin"
+    put_times, get_times = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        if not ZenohFileHandler.put_stream(key, content_blocks(size, data)):
+            raise RuntimeError(f"Failed to store {key}")
+        put_times.append(time.perf_counter() - start)
+        if not wait_until_listed(prefix, 1):
+            raise RuntimeError(f"{key} did not become visible")
+
+        start = time.perf_counter()
+        received = sum(len(block) for block in ZenohFileHandler.get_stream(key))
+        get_times.append(time.perf_counter() - start)
+        if received != size:
+            raise RuntimeError(f"Read {received} bytes of {key}, expected {size}")
+        ZenohFileHandler.delete_file(key)
+
+    mb = size / (1024 * 1024)
+    return {
+        "transport": transport,
+        "size": size,
+        "put_mb_s": round(mb / min(put_times), 1),
+        "get_mb_s": round(mb / min(get_times), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Zenoh transport benchmark for large objects")
+    parser.add_argument("--sizes", nargs="+", default=["100MB", "500MB"])
+    parser.add_argument("--transports", nargs="+", choices=TRANSPORTS, default=list(TRANSPORTS))
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case, the best one is reported")
+    parser.add_argument("--data", choices=["random", "csv"], default="random")
+    parser.add_argument("--port", type=int, default=17470, help="TCP port of the storage peer")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    prefix = "projects/transport-benchmark"
+    tcp_endpoint = f"tcp/127.0.0.1:{args.port}"
+    socket_path = os.path.join(tempfile.mkdtemp(prefix="zenoh-bench-"), "zenoh.sock")
+
+    context = multiprocessing.get_context("spawn")
+    ready, stop = context.Event(), context.Event()
+    peer = context.Process(target=run_storage_peer, args=(prefix, tcp_endpoint, socket_path, ready, stop))
+    peer.start()
+    if not ready.wait(30):
+        raise RuntimeError("Storage peer did not start")
+
+    results = []
+    print(f"{'transport':<9} {'size':>6} {'put MB/s':>9} {'get MB/s':>9}")
+    try:
+        for transport in args.transports:
+            configure_transport(transport, tcp_endpoint, socket_path)
+            for size in map(parse_size, args.sizes):
+                row = run_case(prefix, transport, size, args.repeat, args.data)
+                results.append(row)
+                print(f"{transport:<9} {format_size(size):>6} {row['put_mb_s']:>9} {row['get_mb_s']:>9}")
+    finally:
+        stop.set()
+        peer.join(10)
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump({"results": results}, f, indent=2)
+        print(f"💾 Results saved to {args.output}")
+    os._exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -19,4 +19,7 @@ class Config:
     # Celery configuration
     CELERY_BROKER_URL = "sqla+postgresql://postgres:admin@db:5432/mydatabase"
     CELERY_RESULT_BACKEND = 'sqla+postgresql://postgres:admin@db:5432/mydatabase'
-
+    # Seconds between conditional re-fetches of files ingested from URLs
+    EXTERNAL_REFRESH_INTERVAL = float(os.environ.get('EXTERNAL_REFRESH_INTERVAL', 24 * 60 * 60))
+    # Seconds between storage compaction runs (abandoned uploads, cold tier migration)
+    STORAGE_COMPACTION_INTERVAL = float(os.environ.get('STORAGE_COMPACTION_INTERVAL', 60 * 60))
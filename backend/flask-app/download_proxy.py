@@ -0,0 +1,55 @@
+"""
+Download proxy serving signed URLs straight from the storage nodes.
+
+Runs next to a storage node (see the `download-proxy` service in docker-compose.yaml),
+verifies the URLs issued by `GET /file/<file_id>/download-url` and streams the object
+from Zenoh, so large downloads never pass through the API workers. It needs no database.
+
+The Zenoh REST plugin of the storage nodes cannot serve these downloads on its own: it
+returns stored payloads as they are, and large objects are stored as segments behind a
+manifest, links and possibly compressed.
+
+    gunicorn -k eventlet -w 2 -b 0.0.0.0:5002 download_proxy:app
+"""
+import eventlet
+eventlet.monkey_patch()
+
+import time
+import logging
+from flask import Flask, request
+from flask_cors import CORS
+from utils.zenoh_file_handler import ZenohFileHandler
+from utils.object_response import stored_object_response, download_etag
+from utils.signed_urls import verify_download_url, download_urls_enabled
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+app = Flask(__name__)
+CORS(app, origins="*", expose_headers=["Content-Disposition", "Content-Range", "ETag"])
+
+if not download_urls_enabled():
+    logger.warning("⚠️ DOWNLOAD_URL_SECRET is not set: every download will be refused")
+
+
+@app.route("/download/<path:key>")
+def download(key):
+    if not download_urls_enabled():
+        return {"message": "Signed download URLs are not configured."}, 503
+    filename = request.args.get("filename")
+    expires = request.args.get("expires")
+    if not filename or not verify_download_url(key, filename, expires, request.args.get("signature")):
+        logger.warning(f"⚠️ Rejected download of {key}: invalid or expired signature")
+        return {"message": "Invalid or expired download URL."}, 403
+
+    stored_object = ZenohFileHandler.open(key)
+    if stored_object is None:
+        return {"message": "File not found in Zenoh Storage."}, 404
+    # Browsers may cache the download until the URL expires, not beyond
+    headers = {"Cache-Control": f"private, max-age={max(0, int(expires) - int(time.time()))}"}
+    return stored_object_response(stored_object, filename, download_etag(stored_object), headers)
+
+
+@app.route("/health")
+def health():
+    return "OK\n", 200
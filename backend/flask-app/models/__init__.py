@@ -1,2 +1,5 @@
 # Initialize the models package
-from .file import File
\ No newline at end of file
+from .file import File
+from .blob import Blob, BlobReference
+from .upload_session import UploadSession, UploadChunk
+from .external_source import ExternalSource
\ No newline at end of file
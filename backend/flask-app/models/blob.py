@@ -0,0 +1,29 @@
+from extensions.db import db
+from datetime import datetime, timezone
+
+
+class Blob(db.Model):
+    """Content-addressed object in Zenoh, shared by every file with the same SHA1."""
+    __tablename__ = 'blobs'
+
+    hash = db.Column(db.String(40), primary_key=True)  # SHA1 of the content
+    path = db.Column(db.String(), nullable=False)  # Zenoh key holding the content
+    size = db.Column(db.BigInteger())
+    ref_count = db.Column(db.Integer(), nullable=False, default=0)
+    released = db.Column(db.DateTime)  # When the last reference was dropped; swept after a grace period
+    created = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+
+    def __repr__(self):
+        return f"<Blob {self.hash}, refs={self.ref_count}>"
+
+
+class BlobReference(db.Model):
+    """A file holding a reference on a blob (its uploaded or processed content)."""
+    __tablename__ = 'blob_references'
+
+    file_id = db.Column(db.String(), db.ForeignKey('files.id'), primary_key=True)
+    blob_hash = db.Column(db.String(40), db.ForeignKey('blobs.hash'), primary_key=True)
+    created = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+
+    def __repr__(self):
+        return f"<BlobReference {self.file_id} -> {self.blob_hash}>"
@@ -0,0 +1,19 @@
+from extensions.db import db
+from datetime import datetime, timezone
+
+
+class ExternalSource(db.Model):
+    """A URL files are ingested from, with what is needed to re-fetch it only when it changed."""
+    __tablename__ = 'external_sources'
+
+    url = db.Column(db.String(), primary_key=True)
+    file_id = db.Column(db.String(), db.ForeignKey('files.id'), nullable=True)  # File holding the latest content and processing results
+    etag = db.Column(db.String(), nullable=True)
+    last_modified = db.Column(db.String(), nullable=True)  # Last-Modified header, sent back as is
+    content_hash = db.Column(db.String(40), nullable=True)  # SHA1 of the downloaded content
+    size = db.Column(db.BigInteger(), nullable=True)
+    checked = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    changed = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+
+    def __repr__(self):
+        return f"<ExternalSource {self.url}, {self.content_hash}>"
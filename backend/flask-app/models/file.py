@@ -2,14 +2,11 @@ from extensions.db import db
 from sqlalchemy.dialects.postgresql import JSONB
 from datetime import datetime, timezone
 import uuid
-import zenoh
-import io
 import logging
+from utils.zenoh_file_handler import ZenohFileHandler
 
 logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
-## Should be handled with respect to ABAC
-zenoh_session=zenoh.open()
 
 def generate_uuid():
     return str(uuid.uuid4())
@@ -99,24 +96,5 @@ class File(db.Model):
     @classmethod
     def get_file(cls, file_path):
         """Retrieve a file from Zenoh as a binary stream."""
-        file_content = None  # Initialize content
-        
-        # Get Zenoh responses
-        replies = zenoh_session.get(file_path, zenoh.Queue())
-        for reply in replies:
-            logger.info(f"✅ Zenoh Response Received: {reply}")
-
-            # Ensure it's a successful response
-            if reply.ok:
-                file_content = reply.ok.payload  # Extract actual data
-                logger.debug(f"📂 Received binary data ({len(file_content)} bytes)")
-                break  # Stop after getting valid response
-
-        if file_content:
-            return io.BytesIO(file_content)  # Return as file-like object
-        else:
-            logger.error(f"❌ File not found in Zenoh: {file_path}")
-            return None  # File not retrieved
-        
-
-        
\ No newline at end of file
+        ## Should be handled with respect to ABAC
+        return ZenohFileHandler.get_file(file_path)
@@ -0,0 +1,33 @@
+from extensions.db import db
+from datetime import datetime, timezone
+
+
+class UploadSession(db.Model):
+    """A chunked upload of one file, tracked so clients can resume it."""
+    __tablename__ = 'upload_sessions'
+
+    file_id = db.Column(db.String(), db.ForeignKey('files.id'), primary_key=True)
+    project_id = db.Column(db.String(255), nullable=False)
+    filename = db.Column(db.String(255), nullable=False)  # Final name in Zenoh, e.g. "<file_id>.csv"
+    total_chunks = db.Column(db.Integer(), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='uploading')  # uploading, merging, completed, failed, expired
+    created = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    updated = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc),
+                        onupdate=lambda: datetime.now(timezone.utc), nullable=False)
+
+    def __repr__(self):
+        return f"<UploadSession {self.file_id}, {self.status}>"
+
+
+class UploadChunk(db.Model):
+    """A chunk received for an upload session."""
+    __tablename__ = 'upload_chunks'
+
+    file_id = db.Column(db.String(), db.ForeignKey('upload_sessions.file_id'), primary_key=True)
+    chunk_index = db.Column(db.Integer(), primary_key=True)
+    size = db.Column(db.BigInteger(), nullable=False)
+    checksum = db.Column(db.String(40), nullable=False)  # SHA1 of the chunk content
+    created = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+
+    def __repr__(self):
+        return f"<UploadChunk {self.file_id}#{self.chunk_index}>"
@@ -44,3 +44,70 @@ single_upload_parser.add_argument(
 )
 
 
+
+# Define the upload session parser (opens a chunked upload)
+upload_session_parser = reqparse.RequestParser()
+upload_session_parser.add_argument(
+    'project_id',
+    type=str,
+    required=True,
+    help='Project ID is required for file organization.'
+)
+upload_session_parser.add_argument(
+    'filename',
+    type=str,
+    required=True,
+    help='Name of the file being uploaded.'
+)
+upload_session_parser.add_argument(
+    'total_chunks',
+    type=int,
+    required=True,
+    help='Number of chunks the file is split into.'
+)
+
+# Define the chunk upload parser
+chunk_upload_parser = reqparse.RequestParser()
+chunk_upload_parser.add_argument(
+    'file',
+    location='files',
+    type=FileStorage,
+    required=True,
+    help='The chunk content is required.'
+)
+chunk_upload_parser.add_argument(
+    'project_id',
+    type=str,
+    required=True,
+    help='Project ID is required for file organization.'
+)
+chunk_upload_parser.add_argument(
+    'chunk_index',
+    type=int,
+    required=True,
+    help='Index of the chunk, starting at 0. Chunks can be sent in any order.'
+)
+chunk_upload_parser.add_argument(
+    'total_chunks',
+    type=int,
+    required=False,
+    help='Number of chunks, when the first chunk opens the upload.'
+)
+chunk_upload_parser.add_argument(
+    'file_id',
+    type=str,
+    required=False,
+    help='File ID returned when the upload was opened.'
+)
+chunk_upload_parser.add_argument(
+    'filename',
+    type=str,
+    required=False,
+    help='File Name, when the first chunk opens the upload.'
+)
+chunk_upload_parser.add_argument(
+    'checksum',
+    type=str,
+    required=False,
+    help='SHA1 (hex) of the chunk content, verified by the server.'
+)
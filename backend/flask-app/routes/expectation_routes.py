@@ -2,7 +2,7 @@ from flask import request
 from flask_restx import Namespace, Resource, fields
 from celery import chain
 from tasks.task import build_expectations_task, build_column_descriptions_task
-from utils.zenoh_file_handler import ZenohFileHandler
+from utils.zenoh_file_handler import ZenohFileHandler, HashingStream, read_in_blocks
 from models.expectations import ExpectationSuites
 from utils.file_handler import save_file_record
 from utils.expectations_handler import save_expectation_suite
@@ -84,9 +84,8 @@ class UploadSample(Resource):
             zenoh_path = f"projects/{suite_name}/datasets/{dataset_name}/{uploaded_file.filename}"
 
             with open(temp_path, "rb") as f:
-                file_data = f.read()
-
-            stored = ZenohFileHandler.put_file(zenoh_path, file_data)
+                sample_stream = HashingStream(read_in_blocks(f))
+                stored = ZenohFileHandler.put_stream(zenoh_path, sample_stream)
             if not stored:
                 return {"error": "Failed to store file in Zenoh"}, 500
 
@@ -96,7 +95,7 @@ class UploadSample(Resource):
                 "path": zenoh_path,
                 "file_type": os.path.splitext(uploaded_file.filename)[1].lower().strip("."),  # ✅ extension
                 "file_size": os.path.getsize(temp_path),
-                "file_hash": None,
+                "file_hash": sample_stream.hexdigest(),
                 "user_id": "demo-user-id",
                 "project_id": suite_name,
                 "created": datetime.now(timezone.utc),
@@ -105,7 +104,7 @@ class UploadSample(Resource):
             saved_file = save_file_record(file_record)
 
             task_chain = chain(
-                build_expectations_task.s(zenoh_path),
+                build_expectations_task.s(zenoh_path, file_record["file_hash"]),
                 build_column_descriptions_task.s()
             ).apply_async()
 
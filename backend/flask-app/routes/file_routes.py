@@ -1,15 +1,18 @@
-from flask import request, send_file
+from flask import request
 from flask_restx import Resource, Namespace
 from celery import chain 
 from tasks.task import process_large_file,merge_chunks_task,fetch_file_from_link
-from utils.file_helpers import process_metadata,calculate_file_hash,delete_file_record
-from utils.zenoh_file_handler import ZenohFileHandler
+from utils.file_helpers import process_metadata,delete_file_record
+from utils.zenoh_file_handler import ZenohFileHandler, ChunkIntegrityError, read_in_blocks
+from utils.blob_store import store_file_stream
+from utils.object_response import stored_object_response, download_etag
+from utils.signed_urls import sign_download_url, DownloadUrlsDisabled, DOWNLOAD_URL_TTL, DOWNLOAD_URL_MAX_TTL
 from utils.file_handler import save_file_record,secure_filename,update_file_record_in_db,get_file_record
+from utils.upload_sessions import create_upload_session, get_upload_session, store_chunk, claim_merge, missing_chunks
 from swagger_models.file_upload import get_upload_file_url_model, get_upload_file_url_response_model
 from swagger_models.file_update import get_file_update_model
-from parsers.file_parser import single_upload_parser
+from parsers.file_parser import single_upload_parser, upload_session_parser, chunk_upload_parser
 import json
-import mimetypes
 import logging
 
 CHUNK_SIZE = 2 * 1024 * 1024  # 2MB per chunk
@@ -92,17 +95,8 @@ class SingleFileUploadWithMetadataResource(Resource):
             final_filename = f"{file_id}.{file_extension}"
             file_path = f"projects/{project_id}/files/{file_id}/{final_filename}"
 
-            # Read file content
-            file_content = file.read()
-            file_size = len(file_content)
-
-            # Calculate file hash
-            file_hash = calculate_file_hash(file_content)
-
-            # **Store File in Zenoh**
-            success1 = ZenohFileHandler.put_file(file_path, file_content)
-            if not success1:
-                raise Exception("Failed to store file in Zenoh.")
+            # **Stream File to Zenoh**, hashing block by block (content already stored is dropped)
+            file_hash, file_size, _ = store_file_stream(file_id, file_path, read_in_blocks(file.stream))
 
             logger.info(f"✅ File published to Zenoh at: {file_path}")
 
@@ -212,33 +206,63 @@ class FileResource(Resource):
 @file_ns.route('/<string:file_id>')    
 class FileDownloadResource(Resource):
     @file_ns.doc(
-        description='Download a file by its ID',
+        description='Download a file by its ID. Supports `Range` and `If-Range` headers for partial and resumed downloads.',
         security='apikey',
         responses={
             200: 'File downloaded successfully',
-            404: 'File not found'
+            206: 'Requested byte range downloaded successfully',
+            404: 'File not found',
+            416: 'Requested range not satisfiable'
         }
     )
     def get(self, file_id):
-        """Download a file."""
+        """Download a file, or a byte range of it."""
         file=get_file_record(file_id)
         if not file:
             return {'message': 'File not found.'}, 404
         file_path = file.path
-        file_content = ZenohFileHandler.get_file(file_path)
+        stored_object = ZenohFileHandler.open(file_path)
 
-        if file_content is None:
+        if stored_object is None:
             return {'message': 'File not found in Zenoh Storage.'}, 404  
 
-        # Detect file MIME type (to serve it properly)
         filename = file_path.split('/')[-1]  # ✅ Extract filename from path
-        mime_type, _ = mimetypes.guess_type(filename)  
-        return send_file(
-            file_content,
-            mimetype=mime_type,
-            download_name=filename,  # Extract filename
-            as_attachment=True
-        )
+        return stored_object_response(stored_object, filename, download_etag(stored_object, file.file_hash))
+
+
+@file_ns.route('/<string:file_id>/download-url')
+class FileDownloadUrlResource(Resource):
+    @file_ns.doc(
+        description='Issue a short-lived signed URL downloading the file straight from the download proxy next to '
+                    'the storage nodes, instead of through the API. Supports `Range` requests like `/file/<file_id>`.',
+        security='apikey',
+        params={'expires_in': f'Seconds the URL stays valid (default {DOWNLOAD_URL_TTL}, at most {DOWNLOAD_URL_MAX_TTL})'},
+        responses={
+            200: 'Signed URL issued',
+            400: 'Invalid expires_in',
+            404: 'File not found',
+            503: 'Signed download URLs are not configured, download through /file/<file_id>'
+        }
+    )
+    def get(self, file_id):
+        """Get a signed download URL for a file."""
+        try:
+            expires_in = int(request.args.get('expires_in', DOWNLOAD_URL_TTL))
+        except ValueError:
+            return {'message': 'expires_in must be a number of seconds.'}, 400
+        try:
+            file = get_file_record(file_id)
+        except ValueError:
+            return {'message': 'File not found.'}, 404
+        if file.recdeleted or not file.path:
+            return {'message': 'File not found.'}, 404
+
+        filename = file.path.split('/')[-1]
+        try:
+            url, expires = sign_download_url(file.path, filename, expires_in)
+        except DownloadUrlsDisabled:
+            return {'message': 'Signed download URLs are not configured.'}, 503
+        return {'url': url, 'expires': expires, 'filename': filename, 'size': file.file_size}, 200
 
 
 # File Delete Endpoint
@@ -269,20 +293,114 @@ class FileDeleteResource(Resource):
 
 
 
+def _start_chunk_merge(upload_session):
+    """Point the file record at its final path and start merging the uploaded chunks."""
+    file_id = upload_session.file_id
+    zenoh_file_path = f"projects/{upload_session.project_id}/files/{file_id}/{upload_session.filename}"
+    chunked_file = get_file_record(file_id)
+    if not chunked_file:
+        return {'message': 'An error occurred'}, 500
+    update_file_record_in_db(
+        file_id=chunked_file.id,
+        filename=upload_session.filename,
+        path=zenoh_file_path,
+        file_size=chunked_file.file_size,
+        file_hash=chunked_file.file_hash
+    )
+    # 🔥 **Trigger Celery merge task**
+    chunk_data_chain = chain(
+        merge_chunks_task.s(file_id, upload_session.project_id, upload_session.total_chunks, upload_session.filename),
+        process_large_file.s()
+    ).apply_async()
+
+    return {
+        'message': 'File upload completed and merging started!',
+        'file_id': file_id,
+        'zenoh_file_path': zenoh_file_path,
+        'merge_task_id': chunk_data_chain.parent.id,  # Return Celery Task ID
+        'metadata_task_id': chunk_data_chain.id,
+        'project_id': upload_session.project_id
+    }, 202
+
+
+def _open_upload_session(filename, project_id, total_chunks, user_id):
+    """Create the file record and upload session of a chunked upload. Returns (file_id, error response)."""
+    if not total_chunks or total_chunks < 1:
+        return None, ({'message': 'total_chunks must be at least 1.'}, 400)
+
+    # Secure filename
+    original_filename = secure_filename(filename or '')
+    file_parts = original_filename.rsplit('.', 1)
+    upload_filename = file_parts[0]
+    file_extension = file_parts[1] if len(file_parts) > 1 else ''
+    try:
+        file_data = {
+            "filename": "",
+            "upload_filename": upload_filename,
+            "path": "",
+            "user_id": user_id,
+            "project_id": project_id,
+            "file_metadata": {},
+            "nft_metadata": {},
+            "file_type": file_extension
+        }
+        new_file = save_file_record(file_data)
+        create_upload_session(new_file.id, project_id, f"{new_file.id}.{file_extension}", total_chunks)
+        return new_file.id, None
+    except Exception as e:
+        logger.error(f"Failed to create file record: {str(e)}")
+        return None, ({'message': f'Failed to create file record: {str(e)}'}, 500)
+
+
+@file_ns.route('/upload/async/session')
+class AsyncFileUploadSessionResource(Resource):
+    @file_ns.doc(
+        description="Open a chunked upload. The returned file_id lets the client send the chunks "
+                    "to /file/upload/async in parallel and in any order.",
+        security='apikey',
+        responses={
+            201: 'Upload session opened',
+            400: 'Invalid upload parameters.',
+            500: 'Failed to create file record.'
+        }
+    )
+    @file_ns.expect(upload_session_parser)
+    def post(self):
+        """Open a chunked upload session."""
+        current_user_id = 'current_user_id_placeholder'  # Replace with actual JWT identity
+        args = upload_session_parser.parse_args()
+
+        file_id, error = _open_upload_session(args['filename'], args['project_id'], args['total_chunks'], current_user_id)
+        if error:
+            return error
+        return {
+            'file_id': file_id,
+            'project_id': args['project_id'],
+            'total_chunks': args['total_chunks'],
+            'message': 'Upload session opened.'
+        }, 201
+
+
 @file_ns.route('/upload/async')
 class AsyncFileUploadResource(Resource):
     @file_ns.doc(
-        description="Upload large file asynchronously in chunks and store each chunk directly in Zenoh.",
+        description="Upload large file asynchronously in chunks and store each chunk directly in Zenoh. "
+                    "With a file_id from /file/upload/async/session, chunks can be sent in parallel and in any order; "
+                    "without one, chunk 0 opens the upload. Chunks sent with a checksum (SHA1) are verified, and "
+                    "re-sending a chunk already received with the same content is a no-op. "
+                    "The merge starts once every chunk is in.",
         security='apikey',
         consumes=['multipart/form-data'],
         responses={
             200: 'Chunk uploaded successfully',
             202: 'File upload completed and merging started!',
-            400: 'No file uploaded or invalid metadata.',
+            400: 'No file uploaded, invalid metadata or checksum mismatch.',
+            404: 'Upload session not found.',
+            410: 'Upload session expired.',
             500: 'Failed to save file.'
         }
     )
-    @file_ns.expect(single_upload_parser)
+    @file_ns.expect(chunk_upload_parser)
     def post(self):
         """Upload a file asynchronously in chunks and store directly in Zenoh."""
         current_user_id = 'current_user_id_placeholder'  # Replace with actual JWT identity
@@ -292,83 +410,81 @@ class AsyncFileUploadResource(Resource):
         total_chunks = int(request.form.get('total_chunks', 0))
         filename = request.form.get('filename')
         project_id = request.form.get('project_id')
+        file_id = request.form.get('file_id')
+        checksum = request.form.get('checksum')
 
         if not file:
             return {'message': 'No file uploaded.'}, 400
         if not project_id:
             return {'message': 'Project ID is required.'}, 400
 
-        # Secure filename
-        original_filename = secure_filename(filename)
-        file_parts = original_filename.rsplit('.', 1)
-        upload_filename = file_parts[0]
-        file_extension = file_parts[1] if len(file_parts) > 1 else ''
+        # Without an open session, the first chunk creates the file record and the upload session
+        if not file_id and chunk_index == 0:
+            file_id, error = _open_upload_session(filename, project_id, total_chunks, current_user_id)
+            if error:
+                return error
 
-        # If this is the first chunk, create a file record in DB
-        if chunk_index == 0:
-            try:
-                file_data = {
-                    "filename": "",
-                    "upload_filename": upload_filename,
-                    "path": "",
-                    "user_id": current_user_id,
-                    "project_id": project_id,
-                    "file_metadata": {},
-                    "nft_metadata": {},
-                    "file_type": file_extension
-                }
-                new_file = save_file_record(file_data)
-                file_id = new_file.id
-            except Exception as e:
-                logger.error(f"Failed to create file record: {str(e)}")
-                return {'message': f'Failed to create file record: {str(e)}'}, 500
-        else:
-            file_id = request.form.get('file_id')
-            
         if not file_id:
-            logger.error("❌ file_id is missing before merging.")
-            return {'message': 'Internal Error: file_id is missing.'}, 500
-
-        # Read chunk data
-        chunk_data = file.read()
-
-        # Store chunk in Zenoh
-        zenoh_chunk_path = f"projects/{project_id}/files/{file_id}/chunks/chunk_{chunk_index}"
-        pub_chunk=ZenohFileHandler.put_file(file_path=zenoh_chunk_path,file_content=chunk_data)
-
-
-        # ✅ **If this is the last chunk, trigger Celery to merge**
-        if chunk_index + 1 == total_chunks:
-            final_filename = f"{file_id}.{file_extension}"
-            zenoh_file_path = f"projects/{project_id}/files/{file_id}/{final_filename}"
-            chunked_file=get_file_record(file_id)
-            if chunked_file:
-
-                update_file_record_in_db(
-                    file_id=chunked_file.id,
-                    filename = final_filename,
-                    path=zenoh_file_path,
-                    file_size=chunked_file.file_size,
-                    file_hash=chunked_file.file_hash
-                )
-                # 🔥 **Trigger Celery merge task**
-                chunk_data_chain=chain(
-                    merge_chunks_task.s(file_id, project_id, total_chunks, final_filename),  
-                    process_large_file.s()
-                ).apply_async()
-            else:
-                return {'message': f'An error occured'}, 500
-
-            return {
-                'message': 'File upload completed and merging started!',
-                'file_id': file_id,
-                'zenoh_file_path': zenoh_file_path,
-                'merge_task_id': chunk_data_chain.parent.id,  # Return Celery Task ID
-                'metadata_task_id': chunk_data_chain.id,
-                'project_id': project_id
-            }, 202
-
-        return {'file_id': file_id,'message': f'Chunk {chunk_index + 1}/{total_chunks} uploaded successfully.'}, 200
+            logger.error("❌ file_id is missing for a chunk after the first one.")
+            return {'message': 'file_id is required for chunks after the first one.'}, 400
+
+        upload_session = get_upload_session(file_id)
+        if not upload_session:
+            return {'message': f'No upload session found for file {file_id}.'}, 404
+        if upload_session.status == 'expired':
+            return {'file_id': file_id, 'status': upload_session.status,
+                    'message': 'Upload expired after receiving nothing for too long, start a new one.'}, 410
+        if upload_session.status != 'uploading':
+            return {'file_id': file_id, 'status': upload_session.status,
+                    'message': f'Upload is already {upload_session.status}.'}, 200
+        if not 0 <= chunk_index < upload_session.total_chunks:
+            return {'message': f'chunk_index must be between 0 and {upload_session.total_chunks - 1}.'}, 400
+
+        # Store chunk in Zenoh and record it in the upload manifest
+        try:
+            stored, duplicate = store_chunk(upload_session, chunk_index, file.read(), checksum)
+        except ChunkIntegrityError as e:
+            logger.warning(f"⚠️ {e}")
+            return {'file_id': file_id, 'chunk_index': chunk_index, 'message': str(e)}, 400
+        if not stored:
+            return {'message': f'Failed to store chunk {chunk_index}.'}, 500
+
+        # ✅ **Once every chunk is in, trigger Celery to merge (only one request wins the claim)**
+        if claim_merge(upload_session):
+            return _start_chunk_merge(upload_session)
+
+        return {
+            'file_id': file_id,
+            'duplicate': duplicate,
+            'message': f'Chunk {chunk_index + 1}/{upload_session.total_chunks} uploaded successfully.'
+        }, 200
+
+
+@file_ns.route('/upload/async/<string:file_id>')
+class AsyncFileUploadStatusResource(Resource):
+    @file_ns.doc(
+        description="Status of a chunked upload: which chunks the server holds and which are still missing.",
+        security='apikey',
+        responses={
+            200: 'Upload session status',
+            404: 'Upload session not found.'
+        }
+    )
+    def get(self, file_id):
+        """Get the received and missing chunks of a chunked upload."""
+        upload_session = get_upload_session(file_id)
+        if not upload_session:
+            return {'message': f'No upload session found for file {file_id}.'}, 404
+
+        missing = missing_chunks(upload_session)
+        return {
+            'file_id': file_id,
+            'project_id': upload_session.project_id,
+            'status': upload_session.status,
+            'total_chunks': upload_session.total_chunks,
+            'received_chunks': upload_session.total_chunks - len(missing),
+            'missing_chunks': missing
+        }, 200
 
 
 @file_ns.route("/upload-link")
@@ -1,17 +1,19 @@
-from flask import request, send_file
+from flask import request, Response, stream_with_context
 from flask_restx import Resource, Namespace, fields
-from celery import chain
+from celery import chain, group
 from tasks.task import process_large_file,fetch_file_from_link
 from swagger_models.files_upload import get_upload_file_urls_response_model, get_upload_file_urls_model
 from swagger_models.files_update import get_files_update_model, get_files_update_response_model
 from parsers.files_parser import upload_parser
-from utils.zenoh_file_handler import ZenohFileHandler
-from utils.file_helpers import calculate_file_hash,delete_files_by_ids
-from utils.file_handler import save_file_record,secure_filename,update_file_record_in_db,save_file_record, update_file_record_in_db, get_file_records_by_ids,update_multiple_file_records,secure_filename
+from utils.zenoh_file_handler import ZenohFileHandler, BATCH_CONCURRENCY, SEGMENT_SIZE, read_in_blocks
+from utils.blob_store import store_file_contents, store_file_stream
+from utils.zip_stream import stream_zip
+from utils.file_helpers import calculate_file_hash,delete_files_by_ids,upload_size
+from utils.file_handler import save_file_record, secure_filename, get_file_records_by_ids, update_multiple_file_records, save_file_records, update_file_records_in_db
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import json
-import zipfile
 import os
 
 
@@ -21,6 +23,11 @@ logger = logging.getLogger(__name__)
 # Create a namespace for file operations
 files_ns = Namespace('files',path='/files', description='Multiple File-related operations')
 
+# Files read, hashed and written to Zenoh together by /files/upload
+UPLOAD_BATCH_SIZE = BATCH_CONCURRENCY
+# Files larger than this are streamed to Zenoh block by block instead of read whole
+STREAM_THRESHOLD = SEGMENT_SIZE
+
 
 upload_file_urls_model = get_upload_file_urls_model(files_ns)
 upload_file_urls_response_model = get_upload_file_urls_response_model(files_ns)
@@ -51,7 +58,6 @@ class MultipleFileUploadResource(Resource):
         if not project_id:
             return {'message': 'Project ID is required.'}, 400
 
-        uploaded_files = []
         parsed_metadata = []
 
         # ✅ Handle metadata files (optional)
@@ -64,7 +70,8 @@ class MultipleFileUploadResource(Resource):
                     logger.error(f"❌ Failed to parse metadata file: {str(e)}")
                     return {'message': 'Invalid metadata file format.'}, 400
 
-        # ✅ Process each file
+        files_data = []
+        file_extensions = []
         for i, file in enumerate(files):
             filename = secure_filename(file.filename)
             file_parts = filename.rsplit('.', 1)
@@ -80,71 +87,91 @@ class MultipleFileUploadResource(Resource):
             except json.JSONDecodeError:
                 return {'message': 'Invalid JSON format for use_case'}, 400
 
-            # ✅ Create a new file record in DB
-            try:
-                file_data = {
-                    "filename": "",
-                    "upload_filename": upload_filename,
-                    "description": description,
-                    "path": "",
-                    "user_id": current_user_id,
-                    "project_id": project_id,
-                    "file_metadata": {},
-                    "nft_metadata": {},
-                    "use_case": use_case,
-                    "file_type": file_extension
-                }
-                new_file = save_file_record(file_data)
-                file_id = new_file.id
-                final_filename = f"{file_id}.{file_extension}"
-                zenoh_file_path = f"projects/{project_id}/files/{file_id}/{final_filename}"
-
-                # ✅ Read file content
-                file_content = file.read()
-                file_size = len(file_content)
-
-                # Calculate file hash
-                file_hash = calculate_file_hash(file_content)
-
-                # ✅ Store File in Zenoh
-                success1 = ZenohFileHandler.put_file(zenoh_file_path, file_content)
-                if not success1:
-                    raise Exception("Failed to store file in Zenoh.")
-                logger.info(f"✅ File stored in Zenoh: {zenoh_file_path}")
-
-                # ✅ Store Metadata in Zenoh
-                metadata = parsed_metadata[i] if i < len(parsed_metadata) else {}
-                zenoh_metadata_path = f"projects/{project_id}/files/{file_id}/user_metadata.json"
-                success2 = ZenohFileHandler.put_file(zenoh_metadata_path, json.dumps(metadata).encode('utf-8'))
-                if not success2:
-                    raise Exception("Failed to store metadata in Zenoh.")
-                logger.info(f"✅ Metadata stored in Zenoh: {zenoh_metadata_path}")
+            files_data.append({
+                "filename": "",
+                "upload_filename": upload_filename,
+                "description": description,
+                "path": "",
+                "user_id": current_user_id,
+                "project_id": project_id,
+                "file_metadata": {},
+                "nft_metadata": {},
+                "use_case": use_case,
+                "file_type": file_extension
+            })
+            file_extensions.append(file_extension)
+
+        # ✅ Create all file records in one transaction
+        try:
+            new_files = save_file_records(files_data)
+        except Exception as e:
+            logger.error(f"❌ Error creating file records: {str(e)}")
+            return {'message': 'Failed to update file record.'}, 500
+
+        items = []
+        for i, (file, new_file) in enumerate(zip(files, new_files)):
+            file_id = new_file.id
+            items.append({
+                "file_id": file_id,
+                "upload": file,
+                "path": f"projects/{project_id}/files/{file_id}/{file_id}.{file_extensions[i]}",
+                "metadata_path": f"projects/{project_id}/files/{file_id}/user_metadata.json",
+                "metadata": parsed_metadata[i] if i < len(parsed_metadata) else {},
+                "size": upload_size(file),
+            })
 
-                try:
-                    # ✅ Update DB record
-                    update_file_record_in_db(
-                        file_id=file_id,
-                        path=zenoh_file_path,
-                        file_size=file_size,
-                        file_hash=file_hash,
-                        uploader_metadata=metadata
-                    )
-                except Exception as e:
-                    logger.error(f"❌ Error updating file record: {str(e)}")
-                    return {'message': 'Failed to update file record.'}, 500
+        try:
+            # ✅ Process files in batches so Zenoh writes are pipelined with bounded memory:
+            # at most UPLOAD_BATCH_SIZE small files are held at once, large files are streamed
+            with ThreadPoolExecutor(max_workers=1) as metadata_writer:
+                for batch_start in range(0, len(items), UPLOAD_BATCH_SIZE):
+                    batch = items[batch_start:batch_start + UPLOAD_BATCH_SIZE]
+
+                    # ✅ Store Metadata in Zenoh while the file contents are stored
+                    metadata_stored = metadata_writer.submit(ZenohFileHandler.put_many, [
+                        (item["metadata_path"], json.dumps(item["metadata"]).encode('utf-8')) for item in batch
+                    ])
+
+                    # ✅ Read small files whole, so they are written together; larger ones are streamed
+                    for item in batch:
+                        if item["size"] <= STREAM_THRESHOLD:
+                            item["content"] = item["upload"].read()
+                            item["hash"] = calculate_file_hash(item["content"])
+
+                    # ✅ Store files in Zenoh (content already stored is skipped)
+                    store_file_contents([(item["file_id"], item["path"], item["content"], item["hash"])
+                                         for item in batch if "content" in item])
+                    for item in batch:
+                        if "content" in item:
+                            del item["content"]
+                        else:
+                            item["hash"], item["size"], _ = store_file_stream(
+                                item["file_id"], item["path"], read_in_blocks(item["upload"].stream)
+                            )
+
+                    if not all(metadata_stored.result().values()):
+                        raise Exception("Failed to store metadata in Zenoh.")
+                    logger.info(f"✅ Stored {len(batch)} file(s) and their metadata in Zenoh")
 
-                # ✅ Start Metadata Processing Task
-                metadata_task = process_large_file.delay(file_id)
-                metadata_task_id = metadata_task.id
+            # ✅ Update all DB records in one commit
+            updated_files = update_file_records_in_db([{
+                "file_id": item["file_id"],
+                "path": item["path"],
+                "file_size": item["size"],
+                "file_hash": item["hash"],
+                "uploader_metadata": item["metadata"],
+            } for item in items])
 
-                uploaded_files.append({
-                    **new_file.to_json(),
-                    "metadata_task_id": metadata_task_id  # ✅ Include task ID for polling
-                })
+        except Exception as e:
+            logger.error(f"❌ Error updating file record: {str(e)}")
+            return {'message': 'Failed to update file record.'}, 500
 
-            except Exception as e:
-                logger.error(f"❌ Error updating file record: {str(e)}")
-                return {'message': 'Failed to update file record.'}, 500
+        # ✅ Start Metadata Processing Tasks as one group
+        metadata_tasks = group(process_large_file.s(item["file_id"]) for item in items).apply_async()
+        uploaded_files = [
+            {**file.to_json(), "metadata_task_id": task.id}  # ✅ Include task ID for polling
+            for file, task in zip(updated_files, metadata_tasks.results)
+        ]
 
         return {'message': f'{len(files)} file(s) uploaded successfully!', 'files': uploaded_files}, 200
 
@@ -161,8 +188,7 @@ class MultipleFileDownloadResource(Resource):
         responses={
             200: 'Files downloaded successfully as a ZIP archive',
             400: 'No file IDs provided.',
-            404: 'One or more files not found in Zenoh.',
-            500: 'Failed to create ZIP file.'
+            404: 'One or more files not found in Zenoh.'
         }
     )
     def post(self):
@@ -176,30 +202,15 @@ class MultipleFileDownloadResource(Resource):
         if error:
             return {'message': error}, 404
 
-        # ✅ Generate a temporary ZIP file path
         zip_filename = f"files_{datetime.now().strftime('%Y%m%d%H%M%S')}.zip"
-        zip_temp_path = os.path.join("/tmp", zip_filename) 
-
-        try:
-            with zipfile.ZipFile(zip_temp_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                for file in files:
-                    file_path = file.path  # Zenoh key
-                    file_content = ZenohFileHandler.get_file(file_path)  # 🔥 Fetch from Zenoh
-                    
-                    if file_content is None:
-                        logger.error(f"❌ File not found in Zenoh: {file_path}")
-                        continue  # Skip missing files instead of failing
-
-                    # ✅ Convert to in-memory file and add to ZIP
-                    with zipf.open(os.path.basename(file_path), 'w') as f:
-                        f.write(file_content.read())  # Write binary data to ZIP
-
-            # ✅ Return the ZIP file for download
-            return send_file(zip_temp_path, as_attachment=True, download_name=zip_filename, mimetype="application/zip")
+        entries = [(os.path.basename(file.path), file.path) for file in files]  # Zenoh keys
 
-        except Exception as e:
-            logger.error(f"❌ Failed to create ZIP file: {str(e)}")
-            return {'message': 'Failed to download files.'}, 500
+        # ✅ Stream the ZIP while files are fetched from Zenoh
+        return Response(
+            stream_with_context(stream_zip(entries)),
+            mimetype="application/zip",
+            headers={'Content-Disposition': f'attachment; filename="{zip_filename}"'}
+        )
 
 
 
@@ -287,6 +298,8 @@ class UploadFilesFromLinks(Resource):
             return {"message": "files array and project_id are required!"}, 400
 
         response_data = []
+        pending_links = []
+        metadata_files = {}
 
         try:
             for file_info in files:
@@ -325,10 +338,15 @@ class UploadFilesFromLinks(Resource):
                 zenoh_file_path = f"projects/{project_id}/files/{file_id}/{final_filename}"
                 if metadata:
                     zenoh_metadata_path = f"projects/{project_id}/files/{file_id}/user_metadata.json"
-                    success = ZenohFileHandler.put_file(zenoh_metadata_path, json.dumps(metadata).encode('utf-8'))
-                    if not success:
-                        raise Exception("Failed to store metadata in Zenoh.")
+                    metadata_files[zenoh_metadata_path] = json.dumps(metadata).encode('utf-8')
+                pending_links.append((file_url, file_id, zenoh_file_path))
+
+            # ✅ Store all metadata in one pipelined batch
+            stored = ZenohFileHandler.put_many(metadata_files)
+            if not all(stored.values()):
+                raise Exception("Failed to store metadata in Zenoh.")
 
+            for file_url, file_id, zenoh_file_path in pending_links:
                 # 🔥 Start Celery Chain:
                 task_chain = chain(
                     fetch_file_from_link.s(file_url, file_id, zenoh_file_path),
@@ -1,11 +1,10 @@
-from flask import request, send_file, Response
+from flask import request, Response, stream_with_context
 from flask_restx import Resource, Namespace, fields
 from utils.zenoh_file_handler import ZenohFileHandler
 from utils.file_handler import get_file_record, get_file_records_by_ids
 from utils.file_helpers import delete_uploader_metadata_from_zenoh, add_or_update_uploader_metadata
-import zipfile
+from utils.zip_stream import stream_zip
 import datetime
-import os
 import logging
 
 logger = logging.getLogger(__name__)  # Get a named logger
@@ -116,9 +115,9 @@ class MultipleFileMetadataResource(Resource):
         """Retrieve metadata for multiple files by their IDs."""
         data = request.json
         file_ids = data.get('file_ids', [])
-        files = get_file_records_by_ids(file_ids)
-        if not files:
-            return {'message': 'No files found for the given IDs'}, 404
+        files, error = get_file_records_by_ids(file_ids)
+        if error:
+            return {'message': error}, 404
         metadata_list = {file.id: file.file_metadata for file in files}
         return {'metadata': metadata_list}, 200
     
@@ -134,33 +133,23 @@ class FileReportsDownloadResource(Resource):
         """Retrieve HTML reports for multiple files from Zenoh."""
         data = request.json
         file_ids = data.get('file_ids', [])
-        files = get_file_records_by_ids(file_ids)
-        if not files:
-            return {'message': 'No files found for the given IDs'}, 404
+        files, error = get_file_records_by_ids(file_ids)
+        if error:
+            return {'message': error}, 404
 
         zip_filename = f"reports_{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}.zip"
-        zip_temp_path = os.path.join("/tmp", zip_filename)  # ✅ Use /tmp for safe storage
-
-        try:
-            with zipfile.ZipFile(zip_temp_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                for file in files:
-
-                    zenoh_report_path = f"projects/{file.project_id}/files/{file.id}/{file.id}_profile_report.html"
-                    file_content = ZenohFileHandler.get_file(zenoh_report_path)
+        entries = [
+            (f"{file.upload_filename}_profile_report.html",
+             f"projects/{file.project_id}/files/{file.id}/{file.id}_profile_report.html")
+            for file in files
+        ]
 
-                    if file_content is None:
-                        logger.warning(f"⚠️ Report not found in Zenoh: {zenoh_report_path}")
-                        continue  # Skip missing reports
-
-                    # ✅ Store report in ZIP
-                    with zipf.open(f"{file.upload_filename}_profile_report.html", 'w') as report_file:
-                        report_file.write(file_content.read())
-
-            return send_file(zip_temp_path, as_attachment=True, download_name=zip_filename, mimetype="application/zip")
-
-        except Exception as e:
-            logger.error(f"❌ Failed to create ZIP file for reports: {str(e)}")
-            return {'message': 'Failed to download reports.'}, 500
+        # ✅ Stream the ZIP while reports are fetched from Zenoh (missing reports are skipped)
+        return Response(
+            stream_with_context(stream_zip(entries)),
+            mimetype="application/zip",
+            headers={'Content-Disposition': f'attachment; filename="{zip_filename}"'}
+        )
 
 
 @file_metadata_ns.route('/report/<string:file_id>')
@@ -183,13 +172,13 @@ class SingleFileReportResource(Resource):
 
         try:
             zenoh_report_path = f"projects/{file.project_id}/files/{file.id}/{file.id}_profile_report.html"
-            file_content = ZenohFileHandler.get_file(zenoh_report_path)
+            report_stream = ZenohFileHandler.get_stream(zenoh_report_path)
 
-            if file_content is None:
+            if report_stream is None:
                 return {'message': 'Report not found in Zenoh'}, 404
 
             # ✅ Return as raw HTML string response
-            return Response(file_content, mimetype='text/html')
+            return Response(stream_with_context(report_stream), mimetype='text/html')
 
         except Exception as e:
             logger.error(f"❌ Error retrieving HTML report: {str(e)}")
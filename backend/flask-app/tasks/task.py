@@ -1,12 +1,17 @@
 
 import eventlet
 eventlet.monkey_patch()
-from celery import shared_task 
+from celery import shared_task, chain
 from extensions.db import db
 from extensions.llm import llm
-from utils.zenoh_file_handler import ZenohFileHandler,merge_file_chunks_from_zenoh,download_file_from_zenoh,save_processed_file
+from utils.zenoh_file_handler import ZenohFileHandler,merge_file_chunks_from_zenoh,file_cache,ChunkIntegrityError,HashingStream
+from utils.blob_store import store_file_stream, register_staged_blob, staging_path, save_processed_file, sweep_unreferenced_blobs, reuse_blob, release_superseded_blobs, linked_blob_hash
+from utils.upload_sessions import get_upload_session, chunk_checksums, reopen_upload_session, complete_upload_session, expire_upload_sessions
+from utils.tiering import migrate_cold_objects, release_hot_segments, sweep_cold_copies
 from utils.file_df_loader import load_dataframe 
-from utils.file_helpers import  cleanup_files,load_dataframe_or_image, compute_file_hash, download_file_from_url
+from utils.url_fetcher import fetch_url_blocks, probe
+from utils.external_sources import get_external_source, reuse_external_source, mark_source_checked, record_external_source, refreshable_sources, artifact_path, PROCESSING_ARTIFACTS
+from utils.file_helpers import  cleanup_files,load_dataframe_or_image
 from utils.file_handler import get_file_record,update_file_record_in_db, store_file_metadata_in_db
 from utils.expectations_handler import save_validation_result, get_expectation_suite
 from services.expectation_engine import run_expectation_suite, build_expectations_grouped,build_metadata
@@ -40,14 +45,20 @@ def process_large_file(file_id_or_result):
     if not file_id:
         return {"status": "error", "message": "Missing file_id"}
 
+    if isinstance(file_id_or_result, dict) and file_id_or_result.get("unchanged"):
+        # Same content as a previous ingestion, whose results were copied over
+        file_record = get_file_record(file_id)
+        report = ZenohFileHandler.get_file(artifact_path(file_record, PROCESSING_ARTIFACTS[1]))
+        db.session.remove()
+        return {"message": "File unchanged, previous results reused",
+                "profile_html": report.getvalue().decode("utf-8") if report else None}
+
     try:
         file_record = get_file_record(file_id)
         file_path = file_record.path
-        local_path = f"/tmp/{file_id}{os.path.splitext(file_path)[-1]}"
-        download_file_from_zenoh(file_path, local_path)
-
-        logger.info(f"✅ File downloaded locally to {local_path}")
-        df = load_dataframe_or_image(local_path, file_record)
+        with file_cache.local_copy(file_path, file_record.file_hash) as local_path:
+            logger.info(f"✅ File available locally at {local_path}")
+            df = load_dataframe_or_image(local_path, file_record)
         if not isinstance(df, pd.DataFrame):
             return df  # Early exit if it was image or error
 
@@ -62,8 +73,9 @@ def process_large_file(file_id_or_result):
         profile_html = generate_profile_report(df, file_id, file_record.project_id)
 
         # Save processed back to Zenoh
-        processed_path = save_processed_file(df, file_path, os.path.splitext(file_path)[-1])
-        cleanup_files([local_path, processed_path])
+        processed_path = save_processed_file(df, file_id, file_path, os.path.splitext(file_path)[-1])
+        file_cache.invalidate(file_path)  # Cached copy holds the unprocessed content
+        cleanup_files([processed_path])
 
         return {"message": "File processed successfully", "profile_html": profile_html}
 
@@ -79,48 +91,83 @@ def process_large_file(file_id_or_result):
 @shared_task(ignore_result=False)
 def merge_chunks_task(file_id, project_id, total_chunks, final_filename):
     """Merge file chunks stored in Zenoh and store the final file."""
+    staged_path = staging_path(file_id)
+    upload_session = get_upload_session(file_id)
+    registered = False  # Set once the merged content is a blob and the staged copy is gone
+    completed = False  # Set once the upload session is closed and its chunk manifest is gone
     try:
-        merged_content, error = merge_file_chunks_from_zenoh(file_id, project_id, total_chunks)
+        # Chunks are fetched in parallel, verified against the upload manifest, then hashed and stored in order
+        checksums = chunk_checksums(file_id) if upload_session else None
+        merged_stream = HashingStream(merge_file_chunks_from_zenoh(file_id, project_id, total_chunks, checksums=checksums))
 
-        if error:
-            return {'status': 'error', 'message': f'Failed to merge file: {error}'}
-
-        file_bytes = merged_content.getvalue()
-        file_hash = compute_file_hash(file_bytes)
-
-        # Save final file to Zenoh
+        # Save final file to Zenoh, staged until its hash is known
         zenoh_file_path = f"projects/{project_id}/files/{file_id}/{final_filename}"
-        success = ZenohFileHandler.put_file(zenoh_file_path, file_bytes)
+        success = ZenohFileHandler.put_stream(staged_path, merged_stream)
         if not success:
             raise Exception("Failed to store merged file in Zenoh.")
+        file_hash = merged_stream.hexdigest()
+        register_staged_blob(file_id, zenoh_file_path, staged_path, file_hash, merged_stream.size)
+        registered = True
+
+        # Update database record
+        update_file_record_in_db(file_id, zenoh_file_path, merged_stream.size, file_hash)
+        if upload_session:
+            complete_upload_session(file_id)
+        completed = True
 
-        # Cleanup chunks
+        # Cleanup chunks, last: until the file is recorded a failed merge can be retried from them
         ZenohFileHandler.delete_file(f"projects/{project_id}/files/{file_id}/chunks/**")
         logger.info("🧹 Deleted chunk data from Zenoh")
 
-        # Update database record
-        update_file_record_in_db(file_id, zenoh_file_path, len(file_bytes), file_hash)
-
         db.session.remove()
         logger.info(f"✅ File merge complete and saved at: {zenoh_file_path}")
         return {'status': 'success', 'file_id': file_id}
 
+    except ChunkIntegrityError as e:
+        # Drop the bad chunk so the status endpoint asks the client to send it again
+        logger.error(f"❌ Failed to merge chunks: {str(e)}")
+        ZenohFileHandler.delete_file(staged_path)
+        if upload_session:
+            reopen_upload_session(file_id, e.chunk_index)
+        return {'status': 'error', 'message': f'Failed to merge file: {str(e)}', 'chunk_index': e.chunk_index}
+
     except Exception as e:
         logger.error(f"❌ Failed to merge chunks: {str(e)}")
+        db.session.rollback()
+        if not registered:
+            ZenohFileHandler.delete_file(staged_path)
+        if upload_session and not completed:
+            reopen_upload_session(file_id)
         return {'status': 'error', 'message': f'Failed to merge file: {str(e)}'}
 
 
 @shared_task(ignore_result=False)
 def fetch_file_from_link(file_url, file_id, zenoh_file_path):
-    """Fetches a file from a link and stores it in Zenoh."""
+    """Fetches a file from a link and stores it in Zenoh, reusing the previous ingestion if it did not change."""
     try:
-        file_data = download_file_from_url(file_url)
-        file_hash = compute_file_hash(file_data)
-
-        if not ZenohFileHandler.put_file(zenoh_file_path, file_data):
-            raise Exception(f"Failed to store file in Zenoh at {zenoh_file_path}")
-
-        store_file_metadata_in_db(file_id, zenoh_file_path, len(file_data), file_hash)
+        # Conditional request with the validators of the previous ingestion of this URL
+        source = get_external_source(file_url)
+        remote = probe(file_url, source.etag, source.last_modified) if source else probe(file_url)
+        if remote.not_modified and reuse_external_source(source, file_id, zenoh_file_path):
+            release_superseded_blobs(file_id, linked_blob_hash(zenoh_file_path))
+            mark_source_checked(source, remote)
+            return {"file_id": file_id, "zenoh_path": zenoh_file_path, "unchanged": True}
+
+        # Streamed to Zenoh as it downloads, over parallel ranges when the server allows it.
+        # Linked once it is known to differ, so a refresh keeps the processed content otherwise
+        file_hash, file_size, _ = store_file_stream(file_id, None, fetch_url_blocks(file_url, remote=remote))
+
+        # New validators but the same content (e.g. a re-deployed static file)
+        if source and source.content_hash == file_hash and reuse_external_source(source, file_id, zenoh_file_path):
+            release_superseded_blobs(file_id, linked_blob_hash(zenoh_file_path))  # Including the copy just stored
+            mark_source_checked(source, remote)
+            return {"file_id": file_id, "zenoh_path": zenoh_file_path, "unchanged": True}
+        if not reuse_blob(file_id, zenoh_file_path, file_hash):
+            raise Exception(f"Stored content {file_hash} not found")
+        release_superseded_blobs(file_id, file_hash)  # Previous raw and processed content
+
+        store_file_metadata_in_db(file_id, zenoh_file_path, file_size, file_hash)
+        record_external_source(file_url, remote, file_hash, file_size, file_id)
 
         logger.info(f"✅ File successfully retrieved and stored: {zenoh_file_path}")
         return {"file_id": file_id, "zenoh_path": zenoh_file_path}
@@ -132,20 +179,42 @@ def fetch_file_from_link(file_url, file_id, zenoh_file_path):
         logger.error(f"❌ Unexpected error: {e}")
         return {"error": str(e)}
 
-    
 
-@shared_task(bind=True, ignore_result=False)
-def build_expectations_task(self, zenoh_file_path):
-    local_path = os.path.join("/uploads", zenoh_file_path)
+@shared_task(name='tasks.refresh_external_sources')
+def refresh_external_sources():
+    """Re-ingest every file linked from a URL; unchanged URLs cost one conditional request."""
+    sources = refreshable_sources()
+    for source, file_record in sources:
+        chain(
+            fetch_file_from_link.s(source.url, file_record.id, file_record.path),
+            process_large_file.s(),
+        ).apply_async()
+    logger.info(f"🔄 Scheduled refresh of {len(sources)} external source(s)")
+    db.session.remove()
+    return {"refreshed": len(sources)}
+
+
+@shared_task(name='tasks.compact_storage')
+def compact_storage():
+    """
+    Delete abandoned upload chunks and unreferenced blobs, and move objects no longer read
+    to the cold tier, in rate-limited batches.
+    """
+    expired = expire_upload_sessions()
+    blobs_deleted = sweep_unreferenced_blobs()
+    db.session.remove()
+    moved, moved_bytes = migrate_cold_objects()
+    released = release_hot_segments()
+    swept = sweep_cold_copies()
+    return {"expired_uploads": expired, "blobs_deleted": blobs_deleted, "moved": moved, "moved_bytes": moved_bytes,
+            "hot_segments_released": released, "swept": swept}
 
+    
+@shared_task(bind=True, ignore_result=False)
+def build_expectations_task(self, zenoh_file_path, file_hash=None):
     try:
-        raw_data = ZenohFileHandler.get_file(zenoh_file_path)
-
-        os.makedirs(os.path.dirname(local_path), exist_ok=True)
-        with open(local_path, "wb") as f:
-            f.write(raw_data.read())
-
-        df_or_error = load_dataframe(local_path)
+        with file_cache.local_copy(zenoh_file_path, file_hash) as local_path:
+            df_or_error = load_dataframe(local_path)
         if isinstance(df_or_error, pd.DataFrame):
             df=df_or_error
         else:
@@ -162,9 +231,6 @@ def build_expectations_task(self, zenoh_file_path):
 
     except Exception as e:
         self.retry(exc=e, countdown=5, max_retries=3)
-    finally:
-        if os.path.exists(local_path):
-            os.remove(local_path)
 
 
 @shared_task(bind=True, ignore_result=False)
@@ -173,23 +239,16 @@ def run_expectation_suites_task(self, file_id, suite_ids):
         file_record = get_file_record(file_id)
         if not file_record:
             return {"error": "Invalid file_id"}
-        path=file_record.path
         project_id = file_record.project_id
-        local_path = os.path.join("/uploads", path)
-        os.makedirs(os.path.dirname(local_path), exist_ok=True)
 
-        # ✅ Read raw data directly from Zenoh
-        raw_data = ZenohFileHandler.get_file(file_record.path)
-        if not raw_data:
+        # ✅ Read the file through the worker-local cache (downloaded once per worker)
+        try:
+            with file_cache.local_copy(file_record.path, file_record.file_hash) as local_path:
+                logger.info(f"✅ File available locally at {local_path}")
+                df_or_error = load_dataframe(local_path)
+        except FileNotFoundError:
             return {"error": "File not found in Zenoh"}
 
-        # ✅ Write raw data to local file
-        with open(local_path, "wb") as f:
-            f.write(raw_data.read() if hasattr(raw_data, "read") else raw_data)
-
-        print(f"✅ Downloaded file to: {local_path}")
-
-        df_or_error = load_dataframe(local_path)
         if not isinstance(df_or_error, pd.DataFrame):
             print(f"❌ load_dataframe failed: {df_or_error}")
             return {"error": "Invalid file format or load error."}
@@ -225,10 +284,6 @@ def run_expectation_suites_task(self, file_id, suite_ids):
         traceback.print_exc()
         return {"error": str(e)}
 
-    finally:
-        if os.path.exists(local_path):
-            os.remove(local_path)
-
 
 @shared_task(bind=True, ignore_result=False)
 def build_column_descriptions_task(self, previous_result):
@@ -0,0 +1,352 @@
+"""
+asyncio-native counterpart of `ZenohFileHandler`, sharing its session, key layout,
+segmenting, compression and key index.
+
+Reads are bridged from Zenoh reply callbacks to asyncio futures, so awaiting a get
+does not hold a thread. Writes reuse the synchronous storage helpers in a worker
+thread, since compressing a segment and a congested put can both block.
+"""
+import io
+import json
+import asyncio
+import logging
+from collections import deque
+from utils.compression import decode_payload, ZSTD_MAGIC
+from utils.zenoh_session import with_zenoh_session
+from utils.zenoh_file_handler import (
+    ZenohFileHandler, StoredObject, HashingStream, SEGMENT_SIZE, INDEX_PREFIX, FETCH_CONCURRENCY, BATCH_CONCURRENCY,
+    segment_key, index_key, _store_payload, _index_object, _stored_segments, _trim_segments, _parse_manifest, _encode_manifest,
+    _note_access, _schedule_promotion,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _set_result(future, value):
+    if not future.done():
+        future.set_result(value)
+
+
+async def _decode(payload):
+    # Decompressing a multi-MB segment would stall the event loop
+    if payload is not None and bytes(payload[:len(ZSTD_MAGIC)]) == ZSTD_MAGIC:
+        return await asyncio.to_thread(decode_payload, payload)
+    return payload
+
+
+async def _get_payload(key):
+    """Return the payload stored under `key`, decompressed, or None if no storage answered."""
+    loop = asyncio.get_running_loop()
+    result = loop.create_future()
+
+    def on_reply(reply):
+        if reply.ok:
+            loop.call_soon_threadsafe(_set_result, result, reply.ok.payload)
+
+    def on_done():
+        loop.call_soon_threadsafe(_set_result, result, None)
+
+    with_zenoh_session(lambda session: session.get(key, (on_reply, on_done)))
+    return await _decode(await result)
+
+
+async def _iter_replies(selector):
+    """Yield (key, payload) for every reply to `selector` as it arrives."""
+    loop = asyncio.get_running_loop()
+    replies = asyncio.Queue()
+    done = object()
+
+    def on_reply(reply):
+        if reply.ok:
+            loop.call_soon_threadsafe(replies.put_nowait, (str(reply.ok.key_expr), reply.ok.payload))
+
+    def on_done():
+        loop.call_soon_threadsafe(replies.put_nowait, done)
+
+    with_zenoh_session(lambda session: session.get(selector, (on_reply, on_done)))
+    while (item := await replies.get()) is not done:
+        yield item
+
+
+async def prefetch_ordered_async(fetch, items, window=FETCH_CONCURRENCY):
+    """
+    Await `fetch(item)` for `items` with at most `window` in flight and yield
+    the results in the order of `items`.
+    """
+    pending = deque()
+    try:
+        for item in items:
+            pending.append(asyncio.ensure_future(fetch(item)))
+            if len(pending) >= window:
+                yield await pending.popleft()
+        while pending:
+            yield await pending.popleft()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def gather_bounded(coroutines, limit=BATCH_CONCURRENCY):
+    """`asyncio.gather` with at most `limit` of `coroutines` running at once."""
+    semaphore = asyncio.Semaphore(limit)
+
+    async def bounded(coroutine):
+        async with semaphore:
+            return await coroutine
+
+    return await asyncio.gather(*(bounded(coroutine) for coroutine in coroutines))
+
+
+class AsyncStoredObject(StoredObject):
+    """A `StoredObject` whose segments are fetched asynchronously, `window` at a time."""
+
+    def __aiter__(self):
+        return self.aiter_range(0, self.size)
+
+    async def aiter_range(self, offset, length, window=FETCH_CONCURRENCY):
+        """Yield the bytes in [offset, offset + length), prefetching up to `window` segments."""
+        end = min(offset + length, self.size)
+        if offset >= end:
+            return
+        if self.manifest is None:
+            yield bytes(self._payload[offset:end])
+            return
+
+        segment_size = self.manifest["segment_size"]
+        indices = range(offset // segment_size, (end - 1) // segment_size + 1)
+        segments = prefetch_ordered_async(lambda i: _get_payload(segment_key(self.key, i)), indices, window)
+        i = indices.start
+        async for segment in segments:
+            if segment is None:
+                raise FileNotFoundError(f"Missing segment {i} of {self.key}")
+            start = i * segment_size
+            yield bytes(segment[max(offset - start, 0):end - start])
+            i += 1
+
+
+class AsyncZenohFileHandler:
+    """Handles file storage and retrieval in Zenoh from asyncio code."""
+
+    @staticmethod
+    async def put_file(file_path, file_content):
+        """
+        Store a file in Zenoh.
+
+        :param file_path: The Zenoh key (e.g., "projects/1/files/myfile.txt").
+        :param file_content: File content as bytes or str.
+        :return: True if stored, False otherwise.
+        """
+        return await asyncio.to_thread(ZenohFileHandler.put_file, file_path, file_content)
+
+    @staticmethod
+    async def put_stream(file_path, chunks, window=FETCH_CONCURRENCY):
+        """
+        Store a file in Zenoh from a sync or async iterable of byte blocks, with up to
+        `window` segment writes in flight. Same layout as `ZenohFileHandler.put_stream`.
+
+        :return: True if stored, False otherwise.
+        """
+        previous = await asyncio.to_thread(_stored_segments, file_path)
+        buffer = bytearray()
+        writes = []
+        semaphore = asyncio.Semaphore(window)
+
+        async def store(key, payload):
+            try:
+                return await asyncio.to_thread(_store_payload, key, payload)
+            finally:
+                semaphore.release()
+
+        async def schedule(payload):
+            await semaphore.acquire()  # Backpressure: stop reading while `window` writes are pending
+            writes.append(asyncio.ensure_future(store(segment_key(file_path, len(writes)), payload)))
+
+        async def blocks():
+            if hasattr(chunks, "__aiter__"):
+                async for chunk in chunks:
+                    yield chunk
+            else:
+                for chunk in chunks:
+                    yield chunk
+
+        try:
+            stream = HashingStream(blocks())
+            async for chunk in stream:
+                buffer.extend(chunk)
+                while len(buffer) > SEGMENT_SIZE or (writes and len(buffer) == SEGMENT_SIZE):
+                    await schedule(bytes(buffer[:SEGMENT_SIZE]))
+                    del buffer[:SEGMENT_SIZE]
+
+            if not writes:
+                if not await asyncio.to_thread(_store_payload, file_path, bytes(buffer)):
+                    return False
+            else:
+                if buffer:
+                    await schedule(bytes(buffer))
+                if not all(await asyncio.gather(*writes)):
+                    return False
+                manifest = {"type": "segments", "size": stream.size, "segment_size": SEGMENT_SIZE, "segments": len(writes)}
+                if not await asyncio.to_thread(_store_payload, file_path, _encode_manifest(manifest)):
+                    return False
+        finally:
+            for write in writes:
+                write.cancel()
+
+        await asyncio.to_thread(_index_object, file_path, stream.size, stream.hexdigest(), segments=len(writes))
+        await asyncio.to_thread(_trim_segments, file_path, previous, len(writes))
+        logger.info(f"✅ File stored in Zenoh ({stream.size} bytes): {file_path}")
+        return True
+
+    @staticmethod
+    async def open(file_path, record_access=True):
+        """
+        Resolve a Zenoh key to an `AsyncStoredObject`, following links and cold tier stubs
+        like `ZenohFileHandler.open`, including the background promotion of cold objects.
+
+        :param record_access: Count this as a read for tiering; False for maintenance reads.
+        :return: AsyncStoredObject or None if not found.
+        """
+        payload = await _get_payload(file_path)
+        if payload is None:
+            logger.error(f"❌ File not found in Zenoh: {file_path}")
+            return None
+        if record_access:
+            _note_access(file_path)
+
+        manifest = _parse_manifest(payload)
+        if manifest is not None and manifest["type"] == "cold":
+            cold_object = await AsyncZenohFileHandler.open(manifest["target"], record_access=False)
+            if cold_object is not None:
+                if record_access:
+                    _schedule_promotion(file_path)
+                return cold_object
+            # Promoted back since the stub was read: read the key again
+            payload = await _get_payload(file_path)
+            manifest = _parse_manifest(payload)
+            if payload is None or (manifest is not None and manifest["type"] == "cold"):
+                logger.error(f"❌ Cold tier copy of {file_path} not found in Zenoh")
+                return None
+        if manifest is not None and manifest["type"] == "link":
+            return await AsyncZenohFileHandler.open(manifest["target"], record_access)
+        return AsyncStoredObject(file_path, manifest, payload)
+
+    @staticmethod
+    async def get_stream(file_path):
+        """
+        Retrieve a file from Zenoh as an async iterator of byte blocks.
+
+        :return: Async iterator of bytes or None if not found.
+        """
+        stored_object = await AsyncZenohFileHandler.open(file_path)
+        return stored_object.__aiter__() if stored_object else None
+
+    @staticmethod
+    async def get_range(file_path, offset, length):
+        """
+        Retrieve `length` bytes starting at `offset`, fetching only the segments that overlap the range.
+
+        :return: bytes or None if not found.
+        """
+        stored_object = await AsyncZenohFileHandler.open(file_path)
+        if stored_object is None:
+            return None
+        return b"".join([block async for block in stored_object.aiter_range(offset, length)])
+
+    @staticmethod
+    async def get_file(file_path):
+        """
+        Retrieve a file from Zenoh as a binary stream.
+
+        :return: BytesIO stream of file content or None if not found.
+        """
+        stream = await AsyncZenohFileHandler.get_stream(file_path)
+        if stream is None:
+            return None
+        try:
+            return io.BytesIO(b"".join([block async for block in stream]))
+        except FileNotFoundError as e:
+            logger.error(f"❌ {e}")
+            return None
+
+    @staticmethod
+    async def list_objects(folder_path):
+        """
+        List the objects stored in a Zenoh folder from the key index.
+
+        :param folder_path: The Zenoh key prefix (e.g., "projects/1/files/**").
+        :return: List of {"key", "size", "sha1", "modified"} dicts sorted by key.
+        """
+        objects = {}
+        async for key, payload in _iter_replies(index_key(folder_path)):
+            key = key[len(INDEX_PREFIX):]
+            objects[key] = {"key": key, **json.loads(bytes(decode_payload(payload)).decode("utf-8"))}
+        logger.info(f"📂 Found {len(objects)} files in {folder_path}")
+        return [objects[key] for key in sorted(objects)]
+
+    @staticmethod
+    async def list_files(folder_path):
+        """
+        List all files stored in a Zenoh folder.
+
+        :return: List of file paths.
+        """
+        return [entry["key"] for entry in await AsyncZenohFileHandler.list_objects(folder_path)]
+
+    @staticmethod
+    async def delete_file(file_path):
+        """
+        Delete a file from Zenoh, including its segments and index entry.
+
+        :return: True if deleted, False otherwise.
+        """
+        return await asyncio.to_thread(ZenohFileHandler.delete_file, file_path)
+
+    @staticmethod
+    async def put_many(files, concurrency=BATCH_CONCURRENCY):
+        """
+        Store many files with up to `concurrency` writes in flight.
+
+        :param files: Dict or iterable of (Zenoh key, file content) pairs.
+        :return: Dict of Zenoh key -> True if stored, False otherwise.
+        """
+        items = list(files.items() if isinstance(files, dict) else files)
+        results = await gather_bounded((AsyncZenohFileHandler.put_file(*item) for item in items), concurrency)
+        return dict(zip([key for key, _ in items], results))
+
+    @staticmethod
+    async def get_many(file_paths, concurrency=BATCH_CONCURRENCY):
+        """
+        Retrieve many files with up to `concurrency` reads in flight.
+
+        :return: Dict of Zenoh key -> BytesIO stream of file content, or None if not found.
+        """
+        file_paths = list(file_paths)
+        results = await gather_bounded((AsyncZenohFileHandler.get_file(path) for path in file_paths), concurrency)
+        return dict(zip(file_paths, results))
+
+    @staticmethod
+    async def delete_many(file_paths, concurrency=BATCH_CONCURRENCY):
+        """
+        Delete many files with up to `concurrency` deletions in flight.
+
+        :return: Dict of Zenoh key -> True if deleted, False otherwise.
+        """
+        file_paths = list(file_paths)
+        results = await gather_bounded((AsyncZenohFileHandler.delete_file(path) for path in file_paths), concurrency)
+        return dict(zip(file_paths, results))
+
+
+async def merge_file_chunks_from_zenoh_async(file_id, project_id, total_chunks, concurrency=FETCH_CONCURRENCY):
+    """
+    Yield uploaded chunks in order, fetching up to `concurrency` chunks from Zenoh at once.
+
+    :raises FileNotFoundError: If a chunk is missing.
+    """
+    async def fetch(i):
+        chunk = await AsyncZenohFileHandler.get_file(f"projects/{project_id}/files/{file_id}/chunks/chunk_{i}")
+        if chunk is None:
+            raise FileNotFoundError(f"Missing chunk {i}")
+        return chunk.getvalue()
+
+    async for chunk in prefetch_ordered_async(fetch, range(total_chunks), concurrency):
+        yield chunk
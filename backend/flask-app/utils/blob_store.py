@@ -0,0 +1,333 @@
+"""
+Content-addressed storage for file content.
+
+Each distinct content is stored once in Zenoh under `blobs/<sha1>` and tracked by a
+`Blob` row with a reference count. A file's own Zenoh path only holds a small link to
+the blob, so duplicate uploads skip the content write entirely.
+
+Blob keys are written once and never rewritten: content streamed in before its hash is
+known is copied from its staging key to `blobs/<sha1>` when registered. Blobs that lose
+their last reference are deleted by `sweep_unreferenced_blobs` after a grace period.
+"""
+from extensions.db import db
+from models.blob import Blob, BlobReference
+from utils.zenoh_file_handler import ZenohFileHandler, HashingStream, read_in_blocks, prefetch_ordered, BATCH_CONCURRENCY
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime, timedelta, timezone
+import hashlib
+import logging
+import uuid
+import os
+
+logger = logging.getLogger(__name__)
+
+# Unreferenced blobs are kept this long, so downloads in progress and re-uploads can still use them
+BLOB_SWEEP_GRACE = timedelta(hours=float(os.getenv("BLOB_SWEEP_GRACE_HOURS", 6)))
+
+
+def blob_path(file_hash):
+    return f"blobs/{file_hash}"
+
+
+def staging_path(file_id):
+    """New Zenoh key for content streamed in before its hash is known, unique to each attempt."""
+    return f"blobs/staging/{file_id}/{uuid.uuid4().hex}"
+
+
+def _acquire_blob(file_id, file_hash):
+    """Add a reference from `file_id` to an existing blob. Returns the blob or None if it does not exist."""
+    if BlobReference.query.get((file_id, file_hash)):
+        return Blob.query.get(file_hash)
+    updated = Blob.query.filter_by(hash=file_hash).update({Blob.ref_count: Blob.ref_count + 1, Blob.released: None})
+    if not updated:
+        return None
+    db.session.add(BlobReference(file_id=file_id, blob_hash=file_hash))
+    db.session.commit()
+    return Blob.query.get(file_hash)
+
+
+def _create_blob(file_id, file_hash, path, size):
+    """Register newly stored content. Returns the blob, or None if another upload registered it first."""
+    try:
+        blob = Blob(hash=file_hash, path=path, size=size, ref_count=1)
+        db.session.add(blob)
+        db.session.flush()
+        db.session.add(BlobReference(file_id=file_id, blob_hash=file_hash))
+        db.session.commit()
+        return blob
+    except IntegrityError:
+        db.session.rollback()
+        return None
+
+
+def _link(file_path, blob):
+    if not ZenohFileHandler.put_link(file_path, blob.path):
+        raise Exception(f"Failed to link {file_path} to blob {blob.hash}")
+
+
+def store_file_content(file_id, file_path, file_content, file_hash=None):
+    """
+    Store in-memory file content under `file_path`, reusing an existing blob with the same hash.
+
+    :return: (file_hash, deduplicated)
+    """
+    file_hash = file_hash or hashlib.sha1(file_content).hexdigest()
+    blob = _acquire_blob(file_id, file_hash)
+    if blob:
+        logger.info(f"♻️ Content {file_hash} already stored, skipping Zenoh write for {file_path}")
+        _link(file_path, blob)
+        return file_hash, True
+
+    path = blob_path(file_hash)
+    if not ZenohFileHandler.put_file(path, file_content):
+        raise Exception("Failed to store file in Zenoh.")
+    blob = _create_blob(file_id, file_hash, path, len(file_content)) or _acquire_blob(file_id, file_hash)
+    _link(file_path, blob)
+    return file_hash, False
+
+
+def _acquire_blobs(file_hashes):
+    """
+    Add references to existing blobs for many files in one commit.
+
+    :param file_hashes: Dict of file_id -> content hash.
+    :return: Dict of file_id -> blob, for the files whose content already exists.
+    """
+    existing = {(reference.file_id, reference.blob_hash) for reference in
+                BlobReference.query.filter(BlobReference.file_id.in_(file_hashes)).all()}
+    blobs = {blob.hash: blob for blob in Blob.query.filter(Blob.hash.in_(set(file_hashes.values()))).all()}
+
+    acquired = {}
+    for file_hash, blob in blobs.items():
+        file_ids = [file_id for file_id, h in file_hashes.items() if h == file_hash]
+        new_refs = [file_id for file_id in file_ids if (file_id, file_hash) not in existing]
+        if new_refs:
+            updated = Blob.query.filter_by(hash=file_hash).update(
+                {Blob.ref_count: Blob.ref_count + len(new_refs), Blob.released: None})
+            if not updated:
+                continue  # Released since it was read: the content has to be stored again
+            db.session.add_all(BlobReference(file_id=file_id, blob_hash=file_hash) for file_id in new_refs)
+        acquired.update((file_id, blob) for file_id in file_ids)
+    db.session.commit()
+    return acquired
+
+
+def _create_blobs(new_blobs, file_hashes):
+    """
+    Register newly stored contents for many files in one commit, falling back to one
+    file at a time if another upload registered some of the same contents first.
+
+    :param new_blobs: Dict of content hash -> size.
+    :param file_hashes: Dict of file_id -> content hash, for the files holding `new_blobs`.
+    :return: Dict of file_id -> blob.
+    """
+    try:
+        blobs = {}
+        for file_hash, size in new_blobs.items():
+            ref_count = sum(1 for h in file_hashes.values() if h == file_hash)
+            blobs[file_hash] = Blob(hash=file_hash, path=blob_path(file_hash), size=size, ref_count=ref_count)
+        db.session.add_all(blobs.values())
+        db.session.flush()
+        db.session.add_all(BlobReference(file_id=file_id, blob_hash=h) for file_id, h in file_hashes.items())
+        db.session.commit()
+        return {file_id: blobs[h] for file_id, h in file_hashes.items()}
+    except IntegrityError:
+        db.session.rollback()
+        return {file_id: (_create_blob(file_id, h, blob_path(h), new_blobs[h]) or _acquire_blob(file_id, h))
+                for file_id, h in file_hashes.items()}
+
+
+def reuse_blob(file_id, file_path, file_hash):
+    """
+    Point `file_path` at an already stored blob without sending any content.
+
+    :return: True if the blob exists and was linked, False otherwise.
+    """
+    blob = _acquire_blob(file_id, file_hash)
+    if not blob:
+        return False
+    _link(file_path, blob)
+    logger.info(f"♻️ Reusing content {file_hash} for {file_path}")
+    return True
+
+
+def linked_blob_hash(file_path):
+    """Hash of the blob `file_path` links to, which is its processed content once processed, or None."""
+    entry = next(iter(ZenohFileHandler.list_objects(file_path)), None)
+    target = (entry or {}).get("target") or ""
+    return target[len(blob_path("")):] if target.startswith(blob_path("")) else None
+
+
+def store_file_contents(files):
+    """
+    Store many in-memory files like `store_file_content`, sending new content and links
+    to Zenoh in pipelined batches and recording blob references in two commits.
+    Content repeated within the batch is written once.
+
+    :param files: List of (file_id, file_path, file_content, file_hash) tuples.
+    :return: Dict of file_id -> (file_hash, deduplicated)
+    :raises Exception: If any content or link could not be stored.
+    """
+    if not files:
+        return {}
+    blobs = _acquire_blobs({file_id: file_hash for file_id, _, _, file_hash in files})
+
+    new_contents = {}
+    for file_id, _, file_content, file_hash in files:
+        if file_id not in blobs:
+            new_contents.setdefault(file_hash, file_content)
+
+    stored = ZenohFileHandler.put_many({blob_path(h): content for h, content in new_contents.items()})
+    failed = [path for path, ok in stored.items() if not ok]
+    if failed:
+        raise Exception(f"Failed to store {len(failed)} file(s) in Zenoh: {', '.join(failed)}")
+
+    if new_contents:
+        blobs.update(_create_blobs(
+            {h: len(content) for h, content in new_contents.items()},
+            {file_id: file_hash for file_id, _, _, file_hash in files if file_id not in blobs}
+        ))
+    results = {file_id: (file_hash, file_hash not in new_contents) for file_id, _, _, file_hash in files}
+
+    links = [(file_path, blobs[file_id].path) for file_id, file_path, _, _ in files]
+    linked = prefetch_ordered(lambda link: ZenohFileHandler.put_link(*link), links, BATCH_CONCURRENCY)
+    failed = [file_path for (file_path, _), ok in zip(links, linked) if not ok]
+    if failed:
+        raise Exception(f"Failed to link {len(failed)} file(s) to their blobs: {', '.join(failed)}")
+
+    logger.info(f"📦 Stored {len(files)} file(s), {len(files) - len(new_contents)} deduplicated")
+    return results
+
+
+def store_local_file(file_id, file_path, local_path):
+    """
+    Store a local file under `file_path`, hashing it first so duplicate content is never sent to Zenoh.
+
+    :return: (file_hash, deduplicated)
+    """
+    with open(local_path, "rb") as f:
+        file_hash = HashingStream(read_in_blocks(f)).consume()
+
+    blob = _acquire_blob(file_id, file_hash)
+    if blob:
+        logger.info(f"♻️ Content {file_hash} already stored, skipping Zenoh write for {file_path}")
+        _link(file_path, blob)
+        return file_hash, True
+
+    path = blob_path(file_hash)
+    with open(local_path, "rb") as f:
+        if not ZenohFileHandler.put_stream(path, read_in_blocks(f)):
+            raise Exception("Failed to store file in Zenoh.")
+    blob = _create_blob(file_id, file_hash, path, os.path.getsize(local_path)) or _acquire_blob(file_id, file_hash)
+    _link(file_path, blob)
+    return file_hash, False
+
+
+def store_file_stream(file_id, file_path, blocks):
+    """
+    Store content read block by block under `file_path` with bounded memory.
+    The content is hashed as it streams to a staging key, then registered as a blob,
+    or dropped in favour of an existing blob with the same hash.
+
+    :param file_path: Zenoh key to link to the content, or None to only store it (see `reuse_blob`).
+    :param blocks: Iterable of bytes-like blocks, e.g. `read_in_blocks(upload.stream)`.
+    :return: (file_hash, size, deduplicated)
+    """
+    stream = HashingStream(blocks)
+    staged_path = staging_path(file_id)
+    try:
+        stored = ZenohFileHandler.put_stream(staged_path, stream)
+    except Exception:
+        ZenohFileHandler.delete_file(staged_path)
+        raise
+    if not stored:
+        ZenohFileHandler.delete_file(staged_path)
+        raise Exception("Failed to store file in Zenoh.")
+
+    file_hash = stream.hexdigest()
+    deduplicated = register_staged_blob(file_id, file_path, staged_path, file_hash, stream.size)
+    return file_hash, stream.size, deduplicated
+
+
+def register_staged_blob(file_id, file_path, staged_path, file_hash, size):
+    """
+    Turn content already streamed to `staged_path` into a blob, copying it to `blobs/<sha1>`,
+    or drop it if the same content exists. The staged copy is deleted either way.
+
+    :param file_path: Zenoh key to link to the content, or None to leave it unlinked.
+    :return: True if the content was a duplicate of an existing blob.
+    """
+    blob = _acquire_blob(file_id, file_hash)
+    deduplicated = blob is not None
+    if deduplicated:
+        logger.info(f"♻️ Content {file_hash} already stored, dropping staged copy {staged_path}")
+    else:
+        path = blob_path(file_hash)
+        if not ZenohFileHandler.copy_file(staged_path, path):
+            raise Exception(f"Failed to store content {file_hash} in Zenoh.")
+        blob = _create_blob(file_id, file_hash, path, size) or _acquire_blob(file_id, file_hash)
+    ZenohFileHandler.delete_file(staged_path)
+    if file_path is not None:
+        _link(file_path, blob)
+    return deduplicated
+
+
+def release_file_blobs(file_id):
+    """Drop every blob reference held by a file. Blobs left unreferenced are deleted later by `sweep_unreferenced_blobs`."""
+    return _release_references(BlobReference.query.filter_by(file_id=file_id).all())
+
+
+def release_superseded_blobs(file_id, file_hash):
+    """
+    Drop the blob references a file holds besides `file_hash`, the content its path links to now,
+    e.g. its raw content once the processed content replaced it.
+    """
+    if not file_hash:
+        return 0
+    return _release_references(
+        BlobReference.query.filter(BlobReference.file_id == file_id, BlobReference.blob_hash != file_hash).all()
+    )
+
+
+def _release_references(references):
+    released = datetime.now(timezone.utc)
+    for reference in references:
+        db.session.delete(reference)
+        Blob.query.filter_by(hash=reference.blob_hash).update({Blob.ref_count: Blob.ref_count - 1})
+        Blob.query.filter(Blob.hash == reference.blob_hash, Blob.ref_count <= 0).update({Blob.released: released})
+    db.session.commit()
+    return len(references)
+
+
+def sweep_unreferenced_blobs(grace=BLOB_SWEEP_GRACE):
+    """
+    Delete blobs unreferenced for longer than `grace`. Each blob row stays locked until its
+    content is deleted, so an upload of the same content either takes a reference first or
+    finds no blob and stores the content again.
+
+    :return: Number of blobs deleted.
+    """
+    cutoff = datetime.now(timezone.utc) - grace
+    hashes = [file_hash for file_hash, in
+              db.session.query(Blob.hash).filter(Blob.ref_count <= 0, Blob.released < cutoff).all()]
+    deleted = 0
+    for file_hash in hashes:
+        blob = Blob.query.filter_by(hash=file_hash).with_for_update().first()
+        if blob is not None and blob.ref_count <= 0 and ZenohFileHandler.delete_file(blob.path):
+            db.session.delete(blob)
+            deleted += 1
+            logger.info(f"🗑️ Deleted unreferenced blob: {blob.path}")
+        db.session.commit()
+    return deleted
+
+
+def save_processed_file(df, file_id, file_path, ext):
+    """Write a processed DataFrame back to `file_path` through the blob store."""
+    temp_path = f"/tmp/{os.path.basename(file_path)}_processed{ext}"
+    if ext != ".parquet":
+        df.to_csv(temp_path, index=False)
+    else:
+        df.to_parquet(temp_path)
+    file_hash, _ = store_local_file(file_id, file_path, temp_path)
+    release_superseded_blobs(file_id, file_hash)  # The raw content is no longer linked
+    return temp_path
@@ -0,0 +1,100 @@
+import os
+import re
+import logging
+import threading
+
+try:
+    import zstandard
+except ImportError:  # Compression is optional: without zstandard payloads are stored as-is
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# "zstd" compresses payloads at rest, "none" stores them as-is
+COMPRESSION = os.getenv("ZENOH_COMPRESSION", "zstd").lower()
+COMPRESSION_LEVEL = int(os.getenv("ZENOH_COMPRESSION_LEVEL", 3))
+# Objects moved to the cold tier are rarely read, so they are worth a slower, stronger level
+COLD_COMPRESSION_LEVEL = int(os.getenv("ZENOH_COLD_COMPRESSION_LEVEL", 15))
+# Payloads smaller than this are not worth a compressed frame
+COMPRESSION_MIN_SIZE = int(os.getenv("ZENOH_COMPRESSION_MIN_SIZE", 1024))
+# Keep the compressed payload only if it is at most this fraction of the original
+COMPRESSION_MAX_RATIO = float(os.getenv("ZENOH_COMPRESSION_MAX_RATIO", 0.9))
+
+# Header flag of a zstd-compressed payload, followed by a single zstd frame
+ZSTD_MAGIC = b"\x00DDM-ZSTD\x00"
+
+# Formats that are already compressed, by extension...
+COMPRESSED_EXTENSIONS = {
+    ".zip", ".gz", ".tgz", ".bz2", ".xz", ".zst", ".7z", ".rar",
+    ".parquet", ".orc", ".feather",
+    ".png", ".jpg", ".jpeg", ".gif", ".webp",
+    ".mp3", ".mp4", ".mkv", ".mov", ".avi", ".webm", ".ogg", ".flac", ".m4a",
+    ".xlsx", ".docx",
+}
+# ...and by leading bytes, for keys without an extension such as `blobs/<sha1>`
+COMPRESSED_SIGNATURES = (
+    b"PK\x03\x04",          # zip, xlsx, docx
+    b"\x1f\x8b",            # gzip
+    b"\x28\xb5\x2f\xfd",    # zstd
+    b"BZh",                 # bzip2
+    b"\xfd7zXZ\x00",        # xz
+    b"7z\xbc\xaf\x27\x1c",  # 7z
+    b"PAR1",                # parquet
+    b"\x89PNG",             # png
+    b"\xff\xd8\xff",        # jpeg
+    b"GIF8",                # gif
+)
+
+_SEGMENT_SUFFIX = re.compile(r"\.seg/\d+$")
+_codecs = threading.local()  # zstd (de)compressors are not safe to share between threads
+
+
+def compression_enabled():
+    return COMPRESSION == "zstd" and zstandard is not None
+
+
+def _compressor(level):
+    if getattr(_codecs, "compressors", None) is None:
+        _codecs.compressors = {}
+    if level not in _codecs.compressors:
+        _codecs.compressors[level] = zstandard.ZstdCompressor(level=level)
+    return _codecs.compressors[level]
+
+
+def _decompressor():
+    if getattr(_codecs, "decompressor", None) is None:
+        _codecs.decompressor = zstandard.ZstdDecompressor()
+    return _codecs.decompressor
+
+
+def is_precompressed(key, payload):
+    """True if `payload` stored under `key` is in a format that is already compressed."""
+    ext = os.path.splitext(_SEGMENT_SUFFIX.sub("", key))[1].lower()
+    return ext in COMPRESSED_EXTENSIONS or bytes(payload[:8]).startswith(COMPRESSED_SIGNATURES)
+
+
+def encode_payload(key, payload, level=COMPRESSION_LEVEL):
+    """
+    Compress `payload` for storage under `key` when compression is enabled and pays off.
+
+    :return: The payload to store: `ZSTD_MAGIC` followed by a zstd frame, or `payload` unchanged.
+    """
+    if not compression_enabled() or len(payload) < COMPRESSION_MIN_SIZE or is_precompressed(key, payload):
+        return payload
+    compressed = _compressor(level).compress(payload)
+    if len(ZSTD_MAGIC) + len(compressed) > len(payload) * COMPRESSION_MAX_RATIO:
+        return payload
+    return ZSTD_MAGIC + compressed
+
+
+def decode_payload(payload):
+    """
+    Return the original content of a stored payload, decompressing it if it carries the zstd flag.
+
+    :raises RuntimeError: If the payload is compressed and zstandard is not installed.
+    """
+    if payload is None or bytes(payload[:len(ZSTD_MAGIC)]) != ZSTD_MAGIC:
+        return payload
+    if zstandard is None:
+        raise RuntimeError("❌ Payload is zstd-compressed but the zstandard package is not installed")
+    return _decompressor().decompress(bytes(payload[len(ZSTD_MAGIC):]))
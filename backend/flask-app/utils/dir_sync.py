@@ -0,0 +1,256 @@
+"""
+Differential sync between a local directory and a Zenoh key prefix.
+
+Files are compared by size and SHA1 against the key index, and only changed files are
+transferred, streaming segment by segment with several workers. Local hashes and partial
+downloads are tracked in a state file at the root of the local directory, so an
+interrupted sync resumes where it stopped.
+"""
+import os
+import sys
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from utils.zenoh_file_handler import ZenohFileHandler, HashingStream, read_in_blocks
+
+logger = logging.getLogger(__name__)
+
+STATE_FILE = ".zenoh-sync.json"
+PART_SUFFIX = ".part"
+SYNC_WORKERS = int(os.getenv("ZENOH_SYNC_WORKERS", 4))
+STATE_SAVE_EVERY = 50  # Files completed between state file writes
+
+
+def _file_sha1(path):
+    with open(path, "rb") as f:
+        return HashingStream(read_in_blocks(f)).consume()
+
+
+def _prefix(zenoh_prefix):
+    """Normalize "projects/1/files/**" or "projects/1/files/" to "projects/1/files"."""
+    zenoh_prefix = zenoh_prefix.rstrip("/")
+    if zenoh_prefix.endswith("/**"):
+        zenoh_prefix = zenoh_prefix[:-3]
+    return zenoh_prefix.rstrip("/")
+
+
+class SyncState:
+    """Per-directory sync state: hashes of local files and the remote version of partial downloads."""
+
+    def __init__(self, root):
+        self.path = os.path.join(root, STATE_FILE)
+        self._lock = threading.Lock()
+        self._unsaved = 0
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except (FileNotFoundError, ValueError):
+            state = {}
+        self.files = state.get("files", {})
+        self.partials = state.get("partials", {})
+
+    def local_hash(self, rel_path, path):
+        """SHA1 of a local file, reused from the state while its size and mtime are unchanged."""
+        stat = os.stat(path)
+        with self._lock:
+            entry = self.files.get(rel_path)
+        if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+            return entry["sha1"]
+        sha1 = _file_sha1(path)
+        self.record(rel_path, path, sha1)
+        return sha1
+
+    def record(self, rel_path, path, sha1):
+        stat = os.stat(path)
+        with self._lock:
+            self.files[rel_path] = {"size": stat.st_size, "mtime": stat.st_mtime, "sha1": sha1}
+            self.partials.pop(rel_path, None)
+            self._unsaved += 1
+            if self._unsaved < STATE_SAVE_EVERY:
+                return
+        self.save()
+
+    def start_partial(self, rel_path, sha1):
+        """Remember which remote version a partial download belongs to. Returns False if it is a different one."""
+        with self._lock:
+            resumable = sha1 is not None and self.partials.get(rel_path) == sha1
+            self.partials[rel_path] = sha1
+        if not resumable:
+            self.save()
+        return resumable
+
+    def save(self):
+        with self._lock:
+            state = json.dumps({"files": self.files, "partials": self.partials})
+            self._unsaved = 0
+            temp_path = f"{self.path}.{threading.get_ident()}.tmp"
+            with open(temp_path, "w") as f:
+                f.write(state)
+            os.replace(temp_path, self.path)
+
+
+class Progress:
+    """Single-line transfer progress on stderr."""
+
+    def __init__(self, total_files, total_bytes):
+        self.total_files = total_files
+        self.total_bytes = total_bytes
+        self.files = 0
+        self.bytes = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+
+    def add_bytes(self, count):
+        with self._lock:
+            self.bytes += count
+            self._render()
+
+    def file_done(self, ok):
+        with self._lock:
+            self.files += 1
+            self.failed += 0 if ok else 1
+            self._render()
+
+    def track(self, blocks):
+        for block in blocks:
+            self.add_bytes(len(block))
+            yield block
+
+    def _render(self):
+        mb = 1024 * 1024
+        sys.stderr.write(
+            f"\r📦 {self.files}/{self.total_files} files, "
+            f"{self.bytes / mb:.1f}/{self.total_bytes / mb:.1f} MB"
+            + (f", {self.failed} failed" if self.failed else "")
+        )
+        sys.stderr.flush()
+
+    def close(self):
+        if self.total_files:
+            sys.stderr.write("\n")
+
+
+def _run(transfer, plan, progress, workers):
+    def run(item):
+        try:
+            ok = transfer(item)
+        except Exception as e:
+            logger.error(f"❌ Failed to transfer {item[0]}: {e}")
+            ok = False
+        progress.file_done(ok)
+        return ok
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(run, plan))
+    finally:
+        progress.close()
+    return sum(results), len(results) - sum(results)
+
+
+def sync_up(local_dir, zenoh_prefix, workers=SYNC_WORKERS):
+    """
+    Upload files under `local_dir` that are missing or different under `zenoh_prefix`.
+
+    :return: (transferred, skipped, failed) file counts.
+    """
+    prefix = _prefix(zenoh_prefix)
+    remote = {entry["key"]: entry for entry in ZenohFileHandler.list_objects(f"{prefix}/**")}
+    state = SyncState(local_dir)
+
+    plan = []
+    skipped = 0
+    for root, _, files in os.walk(local_dir):
+        for name in files:
+            path = os.path.join(root, name)
+            rel_path = os.path.relpath(path, local_dir).replace(os.sep, "/")
+            if rel_path == STATE_FILE or name.endswith(PART_SUFFIX):
+                continue
+            key = f"{prefix}/{rel_path}"
+            size = os.path.getsize(path)
+            entry = remote.get(key)
+            if entry and entry["size"] == size and entry.get("sha1") == state.local_hash(rel_path, path):
+                skipped += 1
+                continue
+            plan.append((rel_path, path, key, size))
+
+    logger.info(f"🔼 {len(plan)} file(s) to upload to {prefix}, {skipped} unchanged")
+    progress = Progress(len(plan), sum(size for *_, size in plan))
+
+    def upload(item):
+        rel_path, path, key, _ = item
+        with open(path, "rb") as f:
+            stream = HashingStream(progress.track(read_in_blocks(f)))
+            if not ZenohFileHandler.put_stream(key, stream):
+                return False
+        state.record(rel_path, path, stream.hexdigest())
+        return True
+
+    try:
+        transferred, failed = _run(upload, plan, progress, workers)
+    finally:
+        state.save()
+    return transferred, skipped, failed
+
+
+def sync_down(zenoh_prefix, local_dir, workers=SYNC_WORKERS):
+    """
+    Download objects under `zenoh_prefix` that are missing or different in `local_dir`.
+    Interrupted downloads resume from their partial file when the remote object is unchanged.
+
+    :return: (transferred, skipped, failed) file counts.
+    """
+    prefix = _prefix(zenoh_prefix)
+    os.makedirs(local_dir, exist_ok=True)
+    root = os.path.realpath(local_dir)
+    state = SyncState(local_dir)
+
+    plan = []
+    skipped = 0
+    for entry in ZenohFileHandler.list_objects(f"{prefix}/**"):
+        rel_path = entry["key"][len(prefix) + 1:]
+        path = os.path.realpath(os.path.join(root, rel_path))
+        if not path.startswith(root + os.sep) or rel_path == STATE_FILE:
+            logger.warning(f"⚠️ Skipping key outside the target directory: {entry['key']}")
+            continue
+        if (os.path.exists(path) and os.path.getsize(path) == entry["size"]
+                and entry.get("sha1") and entry["sha1"] == state.local_hash(rel_path, path)):
+            skipped += 1
+            continue
+        plan.append((rel_path, path, entry))
+
+    logger.info(f"🔽 {len(plan)} file(s) to download from {prefix}, {skipped} unchanged")
+    progress = Progress(len(plan), sum(entry["size"] or 0 for *_, entry in plan))
+
+    def download(item):
+        rel_path, path, entry = item
+        stored_object = ZenohFileHandler.open(entry["key"])
+        if stored_object is None:
+            return False
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        part_path = f"{path}{PART_SUFFIX}"
+        offset = 0
+        if state.start_partial(rel_path, entry.get("sha1")) and os.path.exists(part_path):
+            offset = min(os.path.getsize(part_path), stored_object.size)
+            progress.add_bytes(offset)
+        with open(part_path, "ab" if offset else "wb") as f:
+            f.truncate(offset)
+            for block in progress.track(stored_object.iter_range(offset, stored_object.size - offset)):
+                f.write(block)
+
+        sha1 = _file_sha1(part_path)
+        if entry.get("sha1") and sha1 != entry["sha1"]:
+            os.remove(part_path)  # Changed while downloading: start over on the next sync
+            logger.error(f"❌ Checksum mismatch for {entry['key']}")
+            return False
+        os.replace(part_path, path)
+        state.record(rel_path, path, sha1)
+        return True
+
+    try:
+        transferred, failed = _run(download, plan, progress, workers)
+    finally:
+        state.save()
+    return transferred, skipped, failed
@@ -0,0 +1,98 @@
+"""
+Conditional re-fetching of files ingested from URLs.
+
+The ETag, Last-Modified and content hash of every ingested URL are kept, so a repeat
+ingestion or a scheduled refresh asks the server whether the file changed and, when it
+did not, reuses the stored blob and processing results of the previous ingestion.
+"""
+from extensions.db import db
+from models.file import File
+from models.external_source import ExternalSource
+from utils.blob_store import reuse_blob, linked_blob_hash
+from utils.zenoh_file_handler import ZenohFileHandler
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime, timezone
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Results of `process_large_file` stored next to each file
+PROCESSING_ARTIFACTS = ("{file_id}_file_metadata.json", "{file_id}_profile_report.html")
+
+
+def artifact_path(file_record, artifact):
+    return f"projects/{file_record.project_id}/files/{file_record.id}/{artifact.format(file_id=file_record.id)}"
+
+
+def get_external_source(url):
+    return ExternalSource.query.get(url)
+
+
+def reuse_external_source(source, file_id, file_path):
+    """
+    Give `file_id` the content and processing results of the file last ingested from `source`.
+
+    :return: True if reused, False if that file or its content no longer exists.
+    """
+    previous = File.query.get(source.file_id) if source.file_id else None
+    if not previous or previous.recdeleted or not previous.file_hash:
+        return False
+    if previous.id == file_id:
+        return True  # Refreshing the same file: its processed content and results are already in place
+    # Link to the content the previous file holds now, processed like the results copied below
+    if not reuse_blob(file_id, file_path, linked_blob_hash(previous.path) or previous.file_hash):
+        return False
+
+    file_record = File.query.get(file_id)
+    artifacts = {artifact_path(previous, artifact): artifact_path(file_record, artifact) for artifact in PROCESSING_ARTIFACTS}
+    contents = ZenohFileHandler.get_many(artifacts)
+    ZenohFileHandler.put_many(
+        (artifacts[path], content.getvalue()) for path, content in contents.items() if content is not None
+    )
+
+    file_record.path = file_path
+    file_record.file_size = previous.file_size
+    file_record.file_hash = previous.file_hash
+    file_record.file_metadata = previous.file_metadata
+    db.session.commit()
+    logger.info(f"♻️ {source.url} unchanged, reused the content and results of file {previous.id}")
+    return True
+
+
+def mark_source_checked(source, remote):
+    """Record that `source` was found unchanged, keeping any new validators the server sent."""
+    source.etag = remote.etag or source.etag
+    source.last_modified = remote.last_modified or source.last_modified
+    source.checked = datetime.now(timezone.utc)
+    db.session.commit()
+
+
+def record_external_source(url, remote, content_hash, size, file_id):
+    """Remember the version of `url` just ingested into `file_id`."""
+    now = datetime.now(timezone.utc)
+    source = get_external_source(url)
+    if source is None:
+        source = ExternalSource(url=url)
+        db.session.add(source)
+    if source.content_hash != content_hash:
+        source.changed = now
+    source.file_id = file_id
+    source.etag = remote.etag
+    source.last_modified = remote.last_modified
+    source.content_hash = content_hash
+    source.size = size
+    source.checked = now
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Ingested concurrently: the other ingestion recorded the same URL
+        db.session.rollback()
+        logger.warning(f"⚠️ {url} was recorded by a concurrent ingestion")
+
+
+def refreshable_sources():
+    """External sources whose latest file still exists, with that file."""
+    return (db.session.query(ExternalSource, File)
+            .join(File, File.id == ExternalSource.file_id)
+            .filter(File.recdeleted.isnot(True))
+            .all())
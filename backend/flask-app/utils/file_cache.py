@@ -0,0 +1,225 @@
+import os
+import time
+import uuid
+import fcntl
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.getenv("ZENOH_CACHE_DIR", "/tmp/zenoh-cache")
+CACHE_MAX_BYTES = int(os.getenv("ZENOH_CACHE_MAX_BYTES", 10 * 1024 * 1024 * 1024))  # 10GB
+LOCK_POLL_INTERVAL = 0.05  # Seconds between non-blocking lock attempts (keeps green threads cooperative)
+
+
+@contextmanager
+def _file_lock(lock_path, exclusive=True, blocking=True):
+    """
+    Hold an flock on `lock_path`. Works across processes and across green threads of
+    one process, since every holder opens its own file description.
+    Yields the locked file descriptor, or None instead of waiting when `blocking` is False
+    and the lock is busy.
+    Lock files may be removed by eviction, so a lock taken on a file that was unlinked
+    meanwhile is dropped and taken again on the current one.
+    """
+    mode = (fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH) | fcntl.LOCK_NB
+    while True:
+        fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            try:
+                fcntl.flock(fd, mode)
+            except BlockingIOError:
+                if not blocking:
+                    yield None
+                    return
+                time.sleep(LOCK_POLL_INTERVAL)
+                continue
+            try:
+                if not _is_current(fd, lock_path):
+                    continue
+                yield fd
+                return
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+
+def _is_current(fd, lock_path):
+    """Whether `fd` is still the file at `lock_path`, i.e. it was not unlinked since opened."""
+    try:
+        return os.fstat(fd).st_ino == os.stat(lock_path).st_ino
+    except FileNotFoundError:
+        return False
+
+
+class LocalFileCache:
+    """
+    Worker-local read-through disk cache of Zenoh objects, keyed by (zenoh path, file hash).
+
+    Entries live at `<cache_dir>/<sha1(path)>/<file_hash><ext>`. Population downloads to a
+    temporary file and renames it into place under an exclusive lock, so concurrent tasks
+    download an object once. Readers hold a shared lock while using an entry, and the least
+    recently used unlocked entries are evicted once the cache grows past `max_bytes`.
+    """
+
+    def __init__(self, fetch_stream, cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        """
+        :param fetch_stream: Callable returning an iterator of bytes for a Zenoh key, or None if missing.
+        """
+        self.fetch_stream = fetch_stream
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._counter_lock = threading.Lock()
+
+    def _entry_dir(self, file_path):
+        return os.path.join(self.cache_dir, hashlib.sha1(file_path.encode("utf-8")).hexdigest())
+
+    def entry_path(self, file_path, file_hash):
+        return os.path.join(self._entry_dir(file_path), f"{file_hash}{os.path.splitext(file_path)[-1]}")
+
+    def _count(self, counter):
+        with self._counter_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    @contextmanager
+    def _populated(self, file_path, entry):
+        """
+        Download `file_path` into `entry` unless another worker already did, then keep a
+        shared lock on it. Yields True if the entry is in place.
+        """
+        with _file_lock(f"{entry}.lock") as fd:
+            if os.path.exists(entry):
+                self._count("hits")
+            else:
+                self._download(file_path, entry)
+            # Downgrade without unlocking, so the entry cannot be evicted before it is read.
+            # flock may release the lock while converting it, hence the re-check.
+            fcntl.flock(fd, fcntl.LOCK_SH)
+            yield os.path.exists(entry)
+
+    def _download(self, file_path, entry):
+        self._count("misses")
+        stream = self.fetch_stream(file_path)
+        if stream is None:
+            raise FileNotFoundError(f"❌ File not found in Zenoh: {file_path}")
+
+        temp_path = f"{entry}.{uuid.uuid4().hex}.part"
+        try:
+            with open(temp_path, "wb") as f:
+                for block in stream:
+                    f.write(block)
+            os.replace(temp_path, entry)  # Atomic: readers never see a partial entry
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        logger.info(f"📥 Cached {file_path} at {entry}")
+
+    @contextmanager
+    def local_copy(self, file_path, file_hash):
+        """
+        Yield a local path holding the content of `file_path`, downloading it on a miss.
+        The entry cannot be evicted until the block exits.
+        """
+        if not file_hash:
+            # Without a hash a cached copy cannot be validated: use a private, uncached download
+            yield from self._uncached_copy(file_path)
+            return
+
+        entry = self.entry_path(file_path, file_hash)
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+
+        with _file_lock(f"{entry}.lock", exclusive=False):
+            if os.path.exists(entry):
+                self._count("hits")
+                os.utime(entry)  # Mark as recently used
+                yield entry
+                return
+
+        while True:
+            with self._populated(file_path, entry) as present:
+                if present:
+                    self.evict(keep=entry)
+                    yield entry
+                    return
+            logger.warning(f"⚠️ {entry} was evicted while being locked, downloading it again")
+
+    def _uncached_copy(self, file_path):
+        self._count("misses")
+        stream = self.fetch_stream(file_path)
+        if stream is None:
+            raise FileNotFoundError(f"❌ File not found in Zenoh: {file_path}")
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temp_path = os.path.join(self.cache_dir, f"{uuid.uuid4().hex}{os.path.splitext(file_path)[-1]}.part")
+        try:
+            with open(temp_path, "wb") as f:
+                for block in stream:
+                    f.write(block)
+            yield temp_path
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def invalidate(self, file_path):
+        """
+        Drop every cached version of `file_path`, e.g. after it was rewritten.
+        Waits for the readers of each version, and leaves the lock files to eviction.
+        """
+        entry_dir = self._entry_dir(file_path)
+        try:
+            names = os.listdir(entry_dir)
+        except FileNotFoundError:
+            return
+        for name in names:
+            if name.endswith((".lock", ".part")):
+                continue
+            path = os.path.join(entry_dir, name)
+            with _file_lock(f"{path}.lock"):
+                if os.path.exists(path):
+                    os.remove(path)
+            logger.info(f"🧹 Invalidated {path} in the local cache")
+
+    def evict(self, keep=None):
+        """Remove least recently used entries, except `keep`, until the cache fits in `max_bytes`."""
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                if name.endswith(".lock") and name[:-len(".lock")] not in files:
+                    self._remove_stale_lock(path)
+                if name.endswith((".lock", ".part")):
+                    continue
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                total += stat.st_size
+                if path != keep:
+                    entries.append((stat.st_mtime, stat.st_size, path))
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            with _file_lock(f"{path}.lock", blocking=False) as fd:
+                if fd is None:
+                    continue  # In use by a reader or being populated
+                os.remove(path)
+            total -= size
+            self._count("evictions")
+            logger.info(f"🧹 Evicted {path} from the local cache")
+
+    @staticmethod
+    def _remove_stale_lock(lock_path):
+        """Unlink the lock file of an entry that no longer exists, unless someone holds it."""
+        with _file_lock(lock_path, blocking=False) as fd:
+            if fd is not None and not os.path.exists(lock_path[:-len(".lock")]):
+                os.remove(lock_path)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
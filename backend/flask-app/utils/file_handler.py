@@ -1,6 +1,6 @@
 from werkzeug.utils import secure_filename
 from extensions.db import db
-from models.file import File
+from models.file import File, generate_uuid
 import logging
 from sqlalchemy.exc import SQLAlchemyError
 from werkzeug.utils import secure_filename
@@ -50,6 +50,20 @@ def save_file_record(file_data):
         raise  # or return None / False if you'd rather handle it that way
 
 
+def save_file_records(files_data):
+    """Create and save many file records in a single transaction."""
+    try:
+        # IDs are assigned up front so reading them back does not reload every row
+        new_files = [File(**{"id": generate_uuid(), **file_data}) for file_data in files_data]
+        db.session.add_all(new_files)
+        db.session.commit()
+        return new_files
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        logger.error(f"❌ Failed to save {len(files_data)} file records: {str(e)}")
+        raise
+
+
 def update_file_record_in_db(file_id, path, file_size, file_hash, uploader_metadata=None, filename=None, description=None):
     """Update file record with storage info."""
     try:
@@ -76,6 +90,39 @@ def update_file_record_in_db(file_id, path, file_size, file_hash, uploader_metad
         raise  # You can re-raise or return False if you prefer
 
 
+def update_file_records_in_db(updates):
+    """
+    Update many file records with storage info in a single commit.
+
+    :param updates: List of dicts with `file_id` and any of the `update_file_record_in_db` fields.
+    :return: The updated records, in the order of `updates`.
+    """
+    fields = ("path", "file_size", "file_hash", "uploader_metadata", "filename", "description")
+    try:
+        file_ids = [update["file_id"] for update in updates]
+        records = {record.id: record for record in File.query.filter(File.id.in_(file_ids)).all()}
+        missing = [file_id for file_id in file_ids if file_id not in records]
+        if missing:
+            db.session.rollback()  # Leave the session usable for the rest of the request
+            raise ValueError(f"File IDs not found in database: {', '.join(missing)}")
+
+        for update in updates:
+            record = records[update["file_id"]]
+            for field in fields:
+                if update.get(field) is not None:
+                    setattr(record, field, update[field])
+
+        db.session.commit()
+        # One query reloads every record expired by the commit
+        records = {record.id: record for record in File.query.filter(File.id.in_(file_ids)).all()}
+        return [records[file_id] for file_id in file_ids]
+
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        logger.error(f"❌ DB commit failed for {len(updates)} files: {str(e)}")
+        raise
+
+
 def update_multiple_file_records(file_updates):
     updated_files = []
     errors = []
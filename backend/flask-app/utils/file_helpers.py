@@ -7,10 +7,10 @@ from PIL import Image
 import json
 from extensions.db import db
 import hashlib
-import requests
 from utils.zenoh_file_handler import *
 from sqlalchemy.exc import SQLAlchemyError
 from utils.file_handler import get_file_records_by_ids 
+from utils.blob_store import release_file_blobs
 
 SUPPORTED_TEXT_FORMATS = [".csv", ".txt", ".parquet"]
 SUPPORTED_IMAGE_FORMATS = [".jpg", ".jpeg", ".png", ".tiff", ".bmp", ".gif"]
@@ -40,14 +40,16 @@ def delete_file_record(file):
         zenoh_metadata_path = f"projects/{file.project_id}/files/{file_id}/user_metadata.json"
 
         # ✅ Delete from Zenoh
-        file_deleted = ZenohFileHandler.delete_file(zenoh_file_path)
-        metadata_deleted = ZenohFileHandler.delete_file(zenoh_metadata_path)
+        deleted = ZenohFileHandler.delete_many([zenoh_file_path, zenoh_metadata_path])
 
-        if not (file_deleted and metadata_deleted):
+        if not all(deleted.values()):
             logger.warning(f"⚠️ One or more Zenoh entries missing: {zenoh_file_path}, {zenoh_metadata_path}")
         else:
             logger.info(f"✅ Zenoh cleaned: {zenoh_file_path}, {zenoh_metadata_path}")
 
+        # ✅ Release the stored content (deleted once no other file references it)
+        release_file_blobs(file_id)
+
         # ✅ Update DB
         file.uploader_metadata = None
         file.recdeleted = True
@@ -63,34 +65,28 @@ def delete_file_record(file):
 
 
 def delete_files_by_ids(file_ids):
-    files=get_file_records_by_ids(file_ids)
-
-    if not files or len(files) < len(file_ids):
-        return None, "One or more files not found."
-
-    deleted_count = 0
+    files, error = get_file_records_by_ids(file_ids)
+    if error:
+        return None, error
 
-    for file in files:
+    # Zenoh file and metadata deletion, pipelined across all files
+    zenoh_paths = []
+    for file in list(files):
         if not file.path:
             logger.warning(f"⚠️ File {file.id} has no valid path, skipping...")
+            files.remove(file)
             continue
-
-        zenoh_file_path = file.path
-        zenoh_metadata_path = f"projects/{file.project_id}/files/{file.id}/user_metadata.json"
-
-        # Zenoh file deletion
-        file_deleted = ZenohFileHandler.delete_file(zenoh_file_path)
-        if file_deleted:
-            logger.info(f"✅ File deleted from Zenoh: {zenoh_file_path}")
+        zenoh_paths.append(file.path)
+        zenoh_paths.append(f"projects/{file.project_id}/files/{file.id}/user_metadata.json")
+    for zenoh_path, deleted in ZenohFileHandler.delete_many(zenoh_paths).items():
+        if deleted:
+            logger.info(f"✅ Deleted from Zenoh: {zenoh_path}")
         else:
-            logger.warning(f"⚠️ File not found in Zenoh: {zenoh_file_path}")
+            logger.warning(f"⚠️ Not found in Zenoh: {zenoh_path}")
 
-        # Zenoh metadata deletion
-        metadata_deleted = ZenohFileHandler.delete_file(zenoh_metadata_path)
-        if metadata_deleted:
-            logger.info(f"✅ Metadata deleted from Zenoh: {zenoh_metadata_path}")
-        else:
-            logger.warning(f"⚠️ Metadata not found in Zenoh: {zenoh_metadata_path}")
+    deleted_count = 0
+    for file in files:
+        release_file_blobs(file.id)
 
         # Soft delete in DB
         file.uploader_metadata = None
@@ -132,7 +128,7 @@ def add_or_update_uploader_metadata(file, uploader_metadata):
             return False, "Uploader metadata must be a valid JSON object."
 
         zenoh_metadata_path = f"projects/{file.project_id}/files/{file.id}/user_metadata.json"
-        success = ZenohFileHandler.put_file(zenoh_metadata_path, json.dumps(uploader_metadata).encode('utf-8'))
+        success = ZenohFileHandler.put_file(zenoh_metadata_path, json.dumps(uploader_metadata).encode('utf-8'), keep_publisher=True)
 
         if not success:
             return False, "Failed to store metadata in Zenoh."
@@ -200,14 +196,18 @@ def process_image_file(file_path, file_record):
 
 
 
-def compute_file_hash(data: bytes) -> str:
-    return hashlib.sha1(data).hexdigest()
+def upload_size(file_storage):
+    """Size of an uploaded file, measured by seeking its (spooled) stream without reading it."""
+    stream = file_storage.stream
+    position = stream.tell()
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(position)
+    return size
 
 
-def download_file_from_url(url: str, timeout: int = 15) -> bytes:
-    response = requests.get(url, stream=True, timeout=timeout)
-    response.raise_for_status()
-    return response.content
+def compute_file_hash(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
 
 
 def calculate_file_hash(file_content):
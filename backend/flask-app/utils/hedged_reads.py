@@ -0,0 +1,131 @@
+"""
+Hedged reads across the storage replicas (zenoh1, zenoh4) holding the same keys.
+
+A read first queries the best matching storage only, so a single replica sends the
+payload. If no reply arrives within the recent p95 latency while that query is still
+pending, a hedge query goes to every replica and the first reply wins. A query that
+completes without a reply is a miss: it is not hedged, so missing keys cost one query. Replies
+arriving after the winner are ignored, and every query is bounded by `READ_TIMEOUT`.
+
+Latencies are tracked separately for segments and whole objects, since a 4MB segment
+and a small JSON document have very different budgets. Choosing the nearest replica is
+left to Zenoh routing (best matching target): the replier id of 0.11 replies does not
+identify the storage node, so replicas cannot be ranked individually.
+"""
+import os
+import time
+import logging
+import threading
+import zenoh
+from collections import deque
+from utils.zenoh_session import with_zenoh_session, run_blocking
+
+logger = logging.getLogger(__name__)
+
+READ_STRATEGY = os.getenv("ZENOH_READ_STRATEGY", "hedged")  # hedged, or single: best matching replica only
+READ_TIMEOUT = float(os.getenv("ZENOH_READ_TIMEOUT", 20))  # Seconds, for each query
+HEDGE_PERCENTILE = float(os.getenv("ZENOH_HEDGE_PERCENTILE", 0.95))
+HEDGE_INITIAL_DELAY = float(os.getenv("ZENOH_HEDGE_INITIAL_DELAY", 0.5))  # Budget until enough latencies are known
+HEDGE_MIN_DELAY = float(os.getenv("ZENOH_HEDGE_MIN_DELAY", 0.02))
+LATENCY_WINDOW = 256  # Recent reads kept per kind
+LATENCY_MIN_SAMPLES = 20
+
+
+class ReadLatency:
+    """Recent first-reply latencies per kind of key, and how often reads were hedged."""
+
+    def __init__(self):
+        self._samples = {}
+        self._counters = {"reads": 0, "hedges": 0, "hedge_wins": 0}
+        self._lock = threading.Lock()
+
+    def observe(self, kind, seconds, hedge_won):
+        with self._lock:
+            self._samples.setdefault(kind, deque(maxlen=LATENCY_WINDOW)).append(seconds)
+            self._counters["reads"] += 1
+            self._counters["hedge_wins"] += 1 if hedge_won else 0
+
+    def hedged(self):
+        with self._lock:
+            self._counters["hedges"] += 1
+
+    def budget(self, kind):
+        """Seconds to wait for the first query before hedging."""
+        with self._lock:
+            samples = sorted(self._samples.get(kind, ()))
+        if len(samples) < LATENCY_MIN_SAMPLES:
+            return HEDGE_INITIAL_DELAY
+        return min(max(_percentile(samples, HEDGE_PERCENTILE), HEDGE_MIN_DELAY), READ_TIMEOUT)
+
+    def stats(self):
+        """Counters and p50/p95 latency (ms) per kind of key."""
+        with self._lock:
+            samples = {kind: sorted(values) for kind, values in self._samples.items()}
+            stats = dict(self._counters)
+        for kind, values in samples.items():
+            stats[kind] = {"p50_ms": round(_percentile(values, 0.50) * 1000, 1),
+                           "p95_ms": round(_percentile(values, 0.95) * 1000, 1)}
+        return stats
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+read_latency = ReadLatency()
+
+
+def _kind(key):
+    return "segment" if ".seg/" in key else "object"
+
+
+def _query(key, replies, tag, target):
+    # Replies of every query land in one queue, tagged with the query they answer; None marks its end.
+    # A Closure is called directly on Zenoh's threads: bare callbacks get a Python thread of their
+    # own per query, which under eventlet is a green thread blocking the hub on a native queue.
+    with_zenoh_session(lambda session: session.get(
+        key,
+        zenoh.Closure((lambda reply: replies.put((tag, reply)), lambda: replies.put((tag, None)))),
+        target=target,
+        consolidation=zenoh.QueryConsolidation.MONOTONIC(),  # Deliver the first reply without waiting for the others
+        timeout=READ_TIMEOUT,
+    ))
+
+
+def hedged_get(key):
+    """
+    Return the raw payload stored under `key` from the first replica to answer, or None.
+    """
+    replies = zenoh.Queue()
+    kind = _kind(key)
+    start = time.monotonic()
+    hedge_at = start + read_latency.budget(kind)
+    _query(key, replies, "primary", zenoh.QueryTarget.BEST_MATCHING())
+    pending = 1
+    hedged = READ_STRATEGY != "hedged"
+
+    while pending:
+        timeout = None if hedged else max(hedge_at - time.monotonic(), 0.001)
+        try:
+            tag, reply = run_blocking(replies.get, timeout)
+        except TimeoutError:
+            tag, reply = None, None
+
+        if reply is not None:
+            if reply.ok:
+                elapsed = time.monotonic() - start
+                read_latency.observe(kind, elapsed, tag == "hedge")
+                if tag == "hedge":
+                    logger.debug(f"⚡ Hedged read of {key} answered after {elapsed * 1000:.0f} ms")
+                return reply.ok.payload
+            continue  # Error reply: wait for the others
+
+        if tag is not None:
+            pending -= 1  # Finished, with no reply if nothing was returned yet
+        elif not hedged:
+            # The best matching replica is too slow: ask every replica
+            _query(key, replies, "hedge", zenoh.QueryTarget.ALL())
+            read_latency.hedged()
+            pending += 1
+            hedged = True
+    return None
@@ -0,0 +1,55 @@
+from flask import request, Response, stream_with_context
+from utils.zenoh_file_handler import COLD_PREFIX
+import mimetypes
+
+
+def download_etag(stored_object, file_hash=None):
+    """Blobs are immutable, so the key holding the content identifies it; fall back to the upload hash."""
+    key = stored_object.key[len(COLD_PREFIX):] if stored_object.key.startswith(COLD_PREFIX) else stored_object.key
+    if key.startswith("blobs/"):
+        return key.rsplit("/", 1)[-1]
+    return file_hash
+
+
+def stored_object_response(stored_object, filename, etag=None, headers=None):
+    """
+    Stream a `StoredObject` as a download, or the single byte range asked for with
+    `Range` (unless `If-Range` says the client's copy is outdated).
+
+    :param headers: Extra response headers, e.g. Cache-Control.
+    :return: Flask Response (200, 206 or 416).
+    """
+    mime_type, _ = mimetypes.guess_type(filename)
+    size = stored_object.size
+    headers = {
+        'Content-Disposition': f'attachment; filename="{filename}"',
+        'Accept-Ranges': 'bytes',
+        **(headers or {}),
+    }
+    if etag:
+        headers['ETag'] = f'"{etag}"'
+
+    byte_range = request.range
+    if_range = request.if_range
+    range_is_current = not (if_range.etag or if_range.date) or (etag is not None and if_range.etag == etag)
+    if byte_range and range_is_current:
+        span = byte_range.range_for_length(size)
+        if span is None:
+            return Response(status=416, headers={'Content-Range': f'bytes */{size}'})
+        start, stop = span
+        headers['Content-Range'] = f'bytes {start}-{stop - 1}/{size}'
+        headers['Content-Length'] = str(stop - start)
+        return Response(
+            stream_with_context(stored_object.iter_range(start, stop - start)),
+            status=206,
+            mimetype=mime_type or 'application/octet-stream',
+            headers=headers
+        )
+
+    # Segments are streamed to the client as they are fetched from Zenoh
+    headers['Content-Length'] = str(size)
+    return Response(
+        stream_with_context(iter(stored_object)),
+        mimetype=mime_type or 'application/octet-stream',
+        headers=headers
+    )
@@ -0,0 +1,208 @@
+"""
+Consistent-hash sharding of file content across storage nodes.
+
+File content lives in the content-addressed key spaces `blobs/<sha1>` and
+`blobs/staging/<file_id>/<attempt>`, whose keys start with hex digits spread uniformly. Each space
+is split into partitions by key prefix (`blobs/a$*/**`, ...), and partitions are placed
+on a consistent-hash ring of storage nodes with `replicas` copies each. Adding a node
+only moves the partitions it takes over. Small metadata (`projects/**`, `index/**`) stays
+on every node, so listings and links resolve anywhere. Cold tier copies of blobs are
+sharded the same way under `cold/`.
+
+Clients need no changes: Zenoh routes puts and queries to the storages whose key
+expressions match, so each node's storage config is all there is to a shard layout.
+
+Ring file (JSON):
+    {"nodes": ["zenoh1", "zenoh4", "zenoh5"], "replicas": 2, "prefix_length": 1}
+"""
+import json
+import bisect
+import hashlib
+import logging
+import zenoh
+from utils.compression import decode_payload
+from utils.zenoh_session import with_zenoh_session, run_blocking, iter_replies
+from utils.zenoh_file_handler import ZenohFileHandler, _parse_manifest, segment_key, prefetch_ordered, BATCH_CONCURRENCY
+
+logger = logging.getLogger(__name__)
+
+VIRTUAL_NODES = 64  # Ring points per node, so partitions spread evenly over few nodes
+HEX_DIGITS = "0123456789abcdef"
+
+# Sharded key spaces: name -> key prefix, also stripped from file names by the fs volume
+SHARDED_SPACES = {
+    "blobs": "blobs",
+    "staging": "blobs/staging",
+    "cold_blobs": "cold/blobs",  # Cold tier copies (see utils/tiering.py)
+    "cold_staging": "cold/blobs/staging",
+}
+
+# Storages kept whole on every node (names and directories as in zenoh1/zenoh-fs.json5)
+REPLICATED_STORAGES = {
+    "demo_fs": {"key_expr": "demo/example/**", "strip_prefix": "demo/example", "dir": "example"},
+    "demo_fs_machines": {"key_expr": "machines/**", "strip_prefix": "machines", "dir": "machines"},
+    "fs_projects": {"key_expr": "projects/**", "strip_prefix": "projects", "dir": "projects"},
+    "fs_index": {"key_expr": "index/**", "strip_prefix": "index", "dir": "index"},
+    "fs_access": {"key_expr": "access/**", "strip_prefix": "access", "dir": "access"},
+    "fs_cold_projects": {"key_expr": "cold/projects/**", "strip_prefix": "cold/projects", "dir": "cold/projects"},
+}
+
+
+def _point(value):
+    return int(hashlib.sha1(value.encode("utf-8")).hexdigest()[:16], 16)
+
+
+def partition_key_expr(space, partition):
+    """Key expression of the keys of `space` starting with `partition`, segments included."""
+    return f"{SHARDED_SPACES[space]}/{partition}$*/**"
+
+
+class HashRing:
+    """Placement of the partitions of every sharded space on storage nodes."""
+
+    def __init__(self, nodes, replicas=2, prefix_length=1, vnodes=VIRTUAL_NODES):
+        if not nodes:
+            raise ValueError("A ring needs at least one node")
+        if len(set(nodes)) != len(nodes):
+            raise ValueError(f"Duplicate nodes in {nodes}")
+        self.nodes = list(nodes)
+        self.replicas = min(replicas, len(nodes))
+        self.prefix_length = prefix_length
+        self.vnodes = vnodes
+        self._points = sorted((_point(f"{node}#{i}"), node) for node in nodes for i in range(vnodes))
+        self._keys = [point for point, _ in self._points]
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            ring = json.load(f)
+        return cls(ring["nodes"], ring.get("replicas", 2), ring.get("prefix_length", 1), ring.get("vnodes", VIRTUAL_NODES))
+
+    def partitions(self):
+        """Every key prefix of `prefix_length` hex digits."""
+        partitions = [""]
+        for _ in range(self.prefix_length):
+            partitions = [prefix + digit for prefix in partitions for digit in HEX_DIGITS]
+        return partitions
+
+    def owners(self, space, partition):
+        """Nodes holding `partition` of `space`: the first `replicas` distinct nodes clockwise from its hash."""
+        owners = []
+        start = bisect.bisect(self._keys, _point(f"{space}/{partition}"))
+        for i in range(len(self._points)):
+            node = self._points[(start + i) % len(self._points)][1]
+            if node not in owners:
+                owners.append(node)
+                if len(owners) == self.replicas:
+                    break
+        return owners
+
+    def placement(self):
+        """{(space, partition): [owner nodes]} for every partition."""
+        return {(space, partition): self.owners(space, partition)
+                for space in SHARDED_SPACES for partition in self.partitions()}
+
+
+def node_partitions(ring, previous=None):
+    """
+    {node: sorted [(space, partition)]} held by each node. With the `previous` ring, nodes
+    also keep the partitions they held before, so nothing becomes unreadable while data moves.
+    """
+    if previous is not None and previous.prefix_length != ring.prefix_length:
+        raise ValueError("Rings with different prefix lengths cannot be combined")
+    held = {}
+    for current in filter(None, (ring, previous)):
+        for shard, owners in current.placement().items():
+            for node in owners:
+                held.setdefault(node, set()).add(shard)
+    return {node: sorted(shards) for node, shards in held.items()}
+
+
+def rebalance_plan(previous, ring):
+    """
+    Partitions to copy and to drop when going from the `previous` ring to `ring`.
+
+    :return: (moves, drops) where moves is a list of (space, partition, source nodes, gaining nodes)
+             and drops a list of (node, space, partition) that may be removed once copied.
+    """
+    if previous.prefix_length != ring.prefix_length:
+        raise ValueError("Rings with different prefix lengths cannot be combined")
+    old, new = previous.placement(), ring.placement()
+    moves, drops = [], []
+    for shard, owners in new.items():
+        sources = old.get(shard, [])
+        gained = [node for node in owners if node not in sources]
+        if gained:
+            moves.append((*shard, sources, gained))
+        drops.extend((node, *shard) for node in sources if node not in owners)
+    return moves, drops
+
+
+def storage_name(space, partition):
+    return f"fs_{space}_{partition}"
+
+
+def storage_dir(space, partition):
+    return f"shards/{space}-{partition}"
+
+
+def node_config(shards):
+    """Zenoh storage node config holding the replicated storages and the given partitions."""
+    storages = {
+        name: {"key_expr": storage["key_expr"], "strip_prefix": storage["strip_prefix"],
+               "volume": {"id": "fs", "dir": storage["dir"]}}
+        for name, storage in REPLICATED_STORAGES.items()
+    }
+    for space, partition in shards:
+        storages[storage_name(space, partition)] = {
+            "key_expr": partition_key_expr(space, partition),
+            "strip_prefix": SHARDED_SPACES[space],
+            "volume": {"id": "fs", "dir": storage_dir(space, partition)},
+        }
+    return {
+        "mode": "peer",
+        "listen": {"endpoints": ["tcp/[::]:7447", "unixsock-stream//root/.zenoh/run/zenoh.sock"]},
+        "transport": {"shared_memory": {"enabled": True}},
+        "scouting": {"gossip": {"enabled": True, "multihop": False, "autoconnect": {"peer": "router|peer"}}},
+        "queries_default_timeout": 20000,
+        "plugins": {
+            "storage_manager": {"volumes": {"fs": {}}, "storages": storages},
+            "rest": {"http_port": 8000},
+        },
+    }
+
+
+def _copy_key(key):
+    """Re-put the stored payload of `key` as is (already encoded), so every storage matching it holds a copy."""
+    replies = with_zenoh_session(lambda session: session.get(key, zenoh.Queue(), target=zenoh.QueryTarget.ALL()))
+    for reply in iter_replies(replies):
+        if reply.ok:
+            payload = reply.ok.payload
+            with_zenoh_session(lambda session: run_blocking(session.put, key, payload))
+            return payload
+    raise FileNotFoundError(f"No storage holds {key}")
+
+
+def _copy_object(key):
+    try:
+        manifest = _parse_manifest(decode_payload(_copy_key(key)))
+        if manifest is not None and manifest["type"] == "segments":
+            for index in range(manifest["segments"]):
+                _copy_key(segment_key(key, index))
+        return True
+    except Exception as e:
+        logger.error(f"❌ Failed to copy {key}: {e}")
+        return False
+
+
+def copy_partition(space, partition, concurrency=BATCH_CONCURRENCY):
+    """
+    Copy every object of a partition (listed from the key index) to the storages now matching it.
+    Objects stored before the index existed must be indexed first (`zenoh_cli.py reindex`).
+
+    :return: (copied, failed) object counts.
+    """
+    keys = ZenohFileHandler.list_files(partition_key_expr(space, partition))
+    copied = sum(1 for copied in prefetch_ordered(_copy_object, keys, concurrency) if copied)
+    logger.info(f"📦 Copied {copied}/{len(keys)} objects of {partition_key_expr(space, partition)}")
+    return copied, len(keys) - copied
@@ -0,0 +1,60 @@
+"""
+Short-lived signed URLs for downloading stored objects without going through the API.
+
+A URL names the Zenoh key, the file name to download it as and an expiry time, signed
+with HMAC-SHA256. The download proxy (`download_proxy.py`) runs next to a storage node,
+checks the signature and streams the object, so the API only issues URLs.
+
+Without a `DOWNLOAD_URL_SECRET` no URL is signed or accepted: downloads go through the API.
+"""
+import os
+import hmac
+import time
+import hashlib
+from urllib.parse import quote, urlencode
+
+DOWNLOAD_URL_SECRET = os.getenv("DOWNLOAD_URL_SECRET", "")
+DOWNLOAD_BASE_URL = os.getenv("DOWNLOAD_BASE_URL", "http://localhost:5002").rstrip("/")
+DOWNLOAD_URL_TTL = int(os.getenv("DOWNLOAD_URL_TTL", 300))  # Seconds a URL stays valid by default
+DOWNLOAD_URL_MAX_TTL = int(os.getenv("DOWNLOAD_URL_MAX_TTL", 3600))
+
+
+class DownloadUrlsDisabled(Exception):
+    """Raised when a URL is asked for but no `DOWNLOAD_URL_SECRET` is configured."""
+
+
+def download_urls_enabled():
+    return bool(DOWNLOAD_URL_SECRET)
+
+
+def _signature(key, filename, expires):
+    message = f"{key}\n{filename}\n{expires}".encode("utf-8")
+    return hmac.new(DOWNLOAD_URL_SECRET.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+
+def sign_download_url(key, filename, expires_in=DOWNLOAD_URL_TTL):
+    """
+    Build a signed URL downloading the object at `key` as `filename`.
+
+    :param expires_in: Seconds the URL stays valid, capped at `DOWNLOAD_URL_MAX_TTL`.
+    :return: (url, expires) with expires as a Unix timestamp.
+    :raises DownloadUrlsDisabled: If no secret is configured.
+    """
+    if not download_urls_enabled():
+        raise DownloadUrlsDisabled("DOWNLOAD_URL_SECRET is not set")
+    expires = int(time.time()) + max(1, min(expires_in, DOWNLOAD_URL_MAX_TTL))
+    query = urlencode({"filename": filename, "expires": expires, "signature": _signature(key, filename, expires)})
+    return f"{DOWNLOAD_BASE_URL}/download/{quote(key)}?{query}", expires
+
+
+def verify_download_url(key, filename, expires, signature):
+    """Return True if the signature matches and the URL has not expired."""
+    if not download_urls_enabled():
+        return False
+    try:
+        expires = int(expires)
+    except (TypeError, ValueError):
+        return False
+    if expires < time.time() or not signature:
+        return False
+    return hmac.compare_digest(_signature(key, filename, expires), signature)
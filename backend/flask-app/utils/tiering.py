@@ -0,0 +1,129 @@
+"""
+Hot/cold tiering of stored objects.
+
+The storage layer records when each object was last read (`access/<key>`). Objects
+neither read nor written for `TIERING_COLD_AFTER_DAYS` are moved to the cold tier
+(`cold/<key>`, compressed at `ZENOH_COLD_COMPRESSION_LEVEL`, held by its own storage
+volume), least recently used first, in batches capped by count and by bytes per second.
+Reading a cold object is transparent and promotes it back to the hot tier.
+
+Nothing a reader may still be streaming is deleted right away: the hot segments of a
+moved object and the cold copy of a promoted one are deleted by later compaction runs,
+once `COLD_SWEEP_GRACE` has passed.
+
+Objects under `blobs/` never change once written. A key rewritten while it is being
+promoted can get its previous content back, so `TIERING_PREFIXES` should only list
+prefixes whose objects are rarely rewritten (reports, processed copies, uploads).
+"""
+from utils.zenoh_file_handler import ZenohFileHandler, cold_key, COLD_PREFIX
+from datetime import datetime, timedelta, timezone
+import os
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+TIERING_PREFIXES = [prefix.strip() for prefix in os.getenv("TIERING_PREFIXES", "blobs/**,projects/**").split(",") if prefix.strip()]
+TIERING_COLD_AFTER_DAYS = float(os.getenv("TIERING_COLD_AFTER_DAYS", 30))
+TIERING_MIN_SIZE = int(os.getenv("TIERING_MIN_SIZE", 64 * 1024))  # Smaller objects are not worth a stub
+TIERING_BATCH_SIZE = int(os.getenv("TIERING_BATCH_SIZE", 100))  # Objects moved per run
+TIERING_MAX_RATE = float(os.getenv("TIERING_MAX_RATE", 32 * 1024 * 1024))  # Bytes per second moved to the cold tier
+# Hot segments and cold copies no longer used are deleted once released for this long,
+# so reads and copies in progress finish first
+COLD_SWEEP_GRACE = timedelta(hours=6)
+
+
+def _parse_time(value):
+    timestamp = datetime.fromisoformat(value)
+    return timestamp if timestamp.tzinfo else timestamp.replace(tzinfo=timezone.utc)
+
+
+def cold_candidates(prefixes, cutoff, min_size=TIERING_MIN_SIZE):
+    """
+    Hot objects under `prefixes` neither read nor written since `cutoff`.
+
+    :return: List of (last used, key, size), least recently used first.
+    """
+    candidates = []
+    for prefix in prefixes:
+        cold = set(ZenohFileHandler.list_files(cold_key(prefix)))
+        accessed = ZenohFileHandler.last_accessed(prefix)
+        for entry in ZenohFileHandler.list_objects(prefix):
+            key = entry["key"]
+            if entry.get("target") or cold_key(key) in cold or (entry.get("size") or 0) < min_size:
+                continue  # Links, objects already cold and small objects stay where they are
+            last_used = max(_parse_time(value) for value in (entry["modified"], accessed.get(key)) if value)
+            if last_used < cutoff:
+                candidates.append((last_used, key, entry["size"]))
+    return sorted(candidates)
+
+
+def migrate_cold_objects(prefixes=TIERING_PREFIXES, cold_after_days=TIERING_COLD_AFTER_DAYS,
+                         batch_size=TIERING_BATCH_SIZE, max_rate=TIERING_MAX_RATE, min_size=TIERING_MIN_SIZE):
+    """
+    Move up to `batch_size` cold objects to the cold tier, at most `max_rate` bytes per second.
+
+    :return: (objects moved, bytes moved)
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(days=cold_after_days)
+    moved, moved_bytes = 0, 0
+    start = time.monotonic()
+    for _, key, _ in cold_candidates(prefixes, cutoff, min_size)[:batch_size]:
+        try:
+            size = ZenohFileHandler.move_to_cold(key)
+        except Exception as e:
+            logger.error(f"❌ Failed to move {key} to the cold tier: {e}")
+            continue
+        if size:
+            moved += 1
+            moved_bytes += size
+        ahead = moved_bytes / max_rate - (time.monotonic() - start)
+        if ahead > 0:
+            time.sleep(ahead)
+
+    logger.info(f"🧊 Moved {moved} objects ({moved_bytes} bytes) to the cold tier")
+    return moved, moved_bytes
+
+
+def release_hot_segments(prefixes=TIERING_PREFIXES):
+    """
+    Delete the hot segments left behind by objects moved to the cold tier, once they have
+    been unused for `COLD_SWEEP_GRACE` (see `ZenohFileHandler.release_hot_segments`).
+
+    :return: Number of objects whose hot segments are gone.
+    """
+    cutoff = datetime.now(timezone.utc) - COLD_SWEEP_GRACE
+    released = sum(
+        1 for prefix in prefixes for entry in ZenohFileHandler.list_objects(cold_key(prefix))
+        if entry.get("hot_segments") and ZenohFileHandler.release_hot_segments(entry["key"][len(COLD_PREFIX):], cutoff)
+    )
+    if released:
+        logger.info(f"🧹 Released the hot segments of {released} cold objects")
+    return released
+
+
+def sweep_cold_copies(prefixes=TIERING_PREFIXES):
+    """
+    Delete cold copies no stub points to anymore, because their object was promoted or
+    rewritten, once released (or moved, if never released) for `COLD_SWEEP_GRACE`.
+    A copy is only deleted once its key was read and holds something else than a stub.
+
+    :return: Number of copies deleted.
+    """
+    cutoff = datetime.now(timezone.utc) - COLD_SWEEP_GRACE
+    orphaned = []
+    for prefix in prefixes:
+        for entry in ZenohFileHandler.list_objects(cold_key(prefix)):
+            if _parse_time(entry.get("released") or entry["modified"]) >= cutoff:
+                continue
+            file_path = entry["key"][len(COLD_PREFIX):]
+            stored_type = ZenohFileHandler.stored_type(file_path)
+            if stored_type is None:
+                # Missing, or no storage answered: a stub may still point here, keep the copy
+                logger.warning(f"⚠️ Could not read {file_path}, keeping its cold tier copy")
+            elif stored_type != "cold":
+                orphaned.append(entry["key"])
+    deleted = sum(1 for done in ZenohFileHandler.delete_many(orphaned).values() if done)
+    if deleted:
+        logger.info(f"🧹 Deleted {deleted} orphaned cold tier copies")
+    return deleted
@@ -0,0 +1,138 @@
+"""
+Chunk manifests for resumable uploads.
+
+Every received chunk is recorded with its size and SHA1, so clients can ask which
+chunks are missing, re-sending a chunk is a no-op, and the merge only starts once
+every chunk is present and is verified against the recorded checksums.
+"""
+from extensions.db import db
+from models.upload_session import UploadSession, UploadChunk
+from utils.zenoh_file_handler import ZenohFileHandler, ChunkIntegrityError
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime, timedelta, timezone
+import hashlib
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Uploads without a new chunk for this long are abandoned, and their chunks deleted
+UPLOAD_SESSION_TTL = timedelta(hours=float(os.getenv("UPLOAD_SESSION_TTL_HOURS", 48)))
+
+
+def chunk_path(project_id, file_id, chunk_index):
+    return f"projects/{project_id}/files/{file_id}/chunks/chunk_{chunk_index}"
+
+
+def create_upload_session(file_id, project_id, filename, total_chunks):
+    session = UploadSession(file_id=file_id, project_id=project_id, filename=filename, total_chunks=total_chunks)
+    db.session.add(session)
+    db.session.commit()
+    return session
+
+
+def get_upload_session(file_id):
+    return UploadSession.query.get(file_id)
+
+
+def store_chunk(session, chunk_index, chunk_data, expected_checksum=None):
+    """
+    Store a chunk in Zenoh and record it in the session's manifest.
+    A chunk already received with the same content is not written again.
+
+    :param expected_checksum: SHA1 (hex) sent by the client, verified before storing.
+    :return: (stored, duplicate)
+    :raises ChunkIntegrityError: If the content does not match `expected_checksum`.
+    """
+    checksum = hashlib.sha1(chunk_data).hexdigest()
+    if expected_checksum and checksum != expected_checksum.strip().lower():
+        raise ChunkIntegrityError(chunk_index, f"Checksum mismatch for chunk {chunk_index}: expected {expected_checksum}, got {checksum}")
+    existing = UploadChunk.query.get((session.file_id, chunk_index))
+    if existing and existing.checksum == checksum and existing.size == len(chunk_data):
+        logger.info(f"♻️ Chunk {chunk_index} of {session.file_id} already received")
+        return True, True
+
+    if not ZenohFileHandler.put_file(chunk_path(session.project_id, session.file_id, chunk_index), chunk_data):
+        return False, False
+
+    if existing:
+        existing.checksum = checksum
+        existing.size = len(chunk_data)
+    else:
+        db.session.add(UploadChunk(file_id=session.file_id, chunk_index=chunk_index,
+                                   size=len(chunk_data), checksum=checksum))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # The same chunk was recorded concurrently; the last write in Zenoh wins either way
+        db.session.rollback()
+    return True, False
+
+
+def received_chunks(session):
+    """Recorded chunks of `session`, ordered by index."""
+    return UploadChunk.query.filter_by(file_id=session.file_id).order_by(UploadChunk.chunk_index).all()
+
+
+def missing_chunks(session):
+    received = {chunk.chunk_index for chunk in received_chunks(session)}
+    return [i for i in range(session.total_chunks) if i not in received]
+
+
+def claim_merge(session):
+    """
+    Move a complete session from "uploading" to "merging".
+    Returns False if chunks are missing or another request already claimed the merge.
+    """
+    if missing_chunks(session):
+        return False
+    claimed = UploadSession.query.filter_by(file_id=session.file_id, status='uploading').update({'status': 'merging'})
+    db.session.commit()
+    return bool(claimed)
+
+
+def chunk_checksums(file_id):
+    """Recorded SHA1 of every chunk, indexed by chunk index."""
+    chunks = UploadChunk.query.filter_by(file_id=file_id).order_by(UploadChunk.chunk_index).all()
+    return [chunk.checksum for chunk in chunks]
+
+
+def reopen_upload_session(file_id, chunk_index=None):
+    """Put a session back in "uploading", dropping a chunk that failed verification so the client re-sends it."""
+    if chunk_index is not None:
+        UploadChunk.query.filter_by(file_id=file_id, chunk_index=chunk_index).delete()
+    UploadSession.query.filter_by(file_id=file_id).update({'status': 'uploading'})
+    db.session.commit()
+
+
+def complete_upload_session(file_id):
+    """Mark a session merged and drop its chunk manifest."""
+    UploadChunk.query.filter_by(file_id=file_id).delete()
+    UploadSession.query.filter_by(file_id=file_id).update({'status': 'completed'})
+    db.session.commit()
+
+
+def expire_upload_sessions(ttl=UPLOAD_SESSION_TTL):
+    """
+    Delete the chunks of uploads that received nothing for `ttl` and mark them "expired".
+
+    :return: Number of sessions expired.
+    """
+    cutoff = datetime.now(timezone.utc) - ttl
+    latest_chunks = (db.session.query(UploadChunk.file_id, func.max(UploadChunk.created).label("latest"))
+                     .group_by(UploadChunk.file_id).subquery())
+    sessions = (db.session.query(UploadSession)
+                .outerjoin(latest_chunks, latest_chunks.c.file_id == UploadSession.file_id)
+                .filter(UploadSession.status == 'uploading',
+                        UploadSession.updated < cutoff,
+                        (latest_chunks.c.latest.is_(None)) | (latest_chunks.c.latest < cutoff))
+                .all())
+    for session in sessions:
+        ZenohFileHandler.delete_file(f"projects/{session.project_id}/files/{session.file_id}/chunks/**")
+        UploadChunk.query.filter_by(file_id=session.file_id).delete()
+        session.status = 'expired'
+    db.session.commit()
+    if sessions:
+        logger.info(f"🧹 Expired {len(sessions)} abandoned upload session(s)")
+    return len(sessions)
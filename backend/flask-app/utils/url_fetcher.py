@@ -0,0 +1,172 @@
+"""
+Streaming HTTP(S) downloads for link ingestion.
+
+Connections are pooled per host and reused across downloads. Content is yielded
+block by block so it can be written to Zenoh as it arrives. When the server supports
+range requests, large files are fetched as several ranges in parallel and yielded in
+order, keeping at most `URL_FETCH_CONCURRENCY` ranges in memory.
+"""
+import os
+import re
+import logging
+import threading
+import requests
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from utils.zenoh_file_handler import prefetch_ordered, SEGMENT_SIZE
+
+logger = logging.getLogger(__name__)
+
+URL_FETCH_CONCURRENCY = int(os.getenv("URL_FETCH_CONCURRENCY", 4))  # Parallel ranges per download
+URL_RANGE_SIZE = int(os.getenv("URL_RANGE_SIZE", 2 * SEGMENT_SIZE))  # Bytes per range request
+URL_RANGE_THRESHOLD = int(os.getenv("URL_RANGE_THRESHOLD", 2 * URL_RANGE_SIZE))  # Smaller files use one request
+URL_CONNECT_TIMEOUT = float(os.getenv("URL_CONNECT_TIMEOUT", 10))
+URL_READ_TIMEOUT = float(os.getenv("URL_READ_TIMEOUT", 60))  # Between bytes, not for the whole download
+
+CONTENT_RANGE = re.compile(r"bytes\s+(\d+)-(\d+)/(\d+|\*)")
+
+
+class RemoteFile:
+    """What a server reports about a URL before downloading it."""
+
+    def __init__(self, url, size, accepts_ranges, etag=None, last_modified=None, not_modified=False):
+        self.url = url
+        self.size = size  # None if unknown (chunked responses)
+        self.accepts_ranges = accepts_ranges
+        self.etag = etag
+        self.last_modified = last_modified
+        self.not_modified = not_modified  # The server answered 304 to a conditional probe
+
+    @property
+    def validator(self):
+        """Value for If-Range, so a file changed mid-download is not stitched from two versions."""
+        return self.etag or self.last_modified
+
+
+class SessionPool:
+    """One `requests.Session` per scheme and host, with a connection pool sized for parallel ranges."""
+
+    def __init__(self, pool_size):
+        self._pool_size = pool_size
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def get(self, url):
+        parts = urlsplit(url)
+        host = (parts.scheme, parts.netloc)
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=self._pool_size,
+                    max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=(502, 503, 504),
+                                      allowed_methods=("GET", "HEAD")),
+                )
+                session.mount(f"{parts.scheme}://", adapter)
+                self._sessions[host] = session
+            return session
+
+    def clear(self):
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
+
+    def forget(self):
+        """Drop sessions inherited from a parent process without closing the parent's sockets."""
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+
+session_pool = SessionPool(URL_FETCH_CONCURRENCY)
+os.register_at_fork(after_in_child=session_pool.forget)
+
+
+def _timeout():
+    return URL_CONNECT_TIMEOUT, URL_READ_TIMEOUT
+
+
+def probe(url, etag=None, last_modified=None):
+    """
+    Ask the server for the first byte of `url` to learn its size and whether it serves ranges.
+    With the `etag` or `last_modified` of a previous download, the request is conditional
+    and an unchanged file is reported as `not_modified` without transferring anything.
+
+    :return: RemoteFile
+    :raises requests.exceptions.RequestException: If the server cannot be reached or answers with an error.
+    """
+    headers = {"Range": "bytes=0-0"}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+
+    session = session_pool.get(url)
+    with session.get(url, headers=headers, stream=True, timeout=_timeout()) as response:
+        if response.status_code == 304:
+            return RemoteFile(response.url, None, False, response.headers.get("ETag", etag),
+                              response.headers.get("Last-Modified", last_modified), not_modified=True)
+        response.raise_for_status()
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        match = CONTENT_RANGE.match(response.headers.get("Content-Range", ""))
+        if response.status_code == 206 and match and match.group(3) != "*":
+            return RemoteFile(response.url, int(match.group(3)), True, etag, last_modified)
+
+        length = response.headers.get("Content-Length")
+        encoded = response.headers.get("Content-Encoding", "identity") != "identity"
+        size = int(length) if length and not encoded else None
+        return RemoteFile(response.url, size, False, etag, last_modified)
+
+
+def _fetch_range(remote, start, end):
+    """Fetch bytes [start, end] of `remote`, failing if the server sent anything else."""
+    headers = {"Range": f"bytes={start}-{end}"}
+    if remote.validator:
+        headers["If-Range"] = remote.validator
+    # Streamed so a server ignoring the range is caught before its whole body is read
+    with session_pool.get(remote.url).get(remote.url, headers=headers, stream=True, timeout=_timeout()) as response:
+        response.raise_for_status()
+        match = CONTENT_RANGE.match(response.headers.get("Content-Range", ""))
+        if response.status_code != 206 or not match or (int(match.group(1)), int(match.group(2))) != (start, end):
+            raise requests.exceptions.RequestException(
+                f"Range {start}-{end} of {remote.url} was not served (status {response.status_code}); "
+                f"the file may have changed during the download"
+            )
+        content = response.content
+    if len(content) != end - start + 1:
+        raise requests.exceptions.RequestException(f"Range {start}-{end} of {remote.url} was cut short")
+    return content
+
+
+def _iter_ranges(remote, concurrency):
+    ranges = [(start, min(start + URL_RANGE_SIZE, remote.size) - 1) for start in range(0, remote.size, URL_RANGE_SIZE)]
+    logger.info(f"⚡ Downloading {remote.url} ({remote.size} bytes) as {len(ranges)} ranges, {concurrency} at a time")
+    yield from prefetch_ordered(lambda byte_range: _fetch_range(remote, *byte_range), ranges, concurrency)
+
+
+def _iter_response(remote, block_size):
+    with session_pool.get(remote.url).get(remote.url, stream=True, timeout=_timeout()) as response:
+        response.raise_for_status()
+        for block in response.iter_content(chunk_size=block_size):
+            if block:
+                yield block
+
+
+def fetch_url_blocks(url, concurrency=URL_FETCH_CONCURRENCY, block_size=SEGMENT_SIZE, remote=None):
+    """
+    Download `url` as an iterator of byte blocks, in order.
+
+    :param concurrency: Parallel range requests for large files on servers that accept ranges.
+    :param remote: Result of an unconditional `probe(url)`, to skip probing again.
+    :raises requests.exceptions.RequestException: If the download fails.
+    """
+    if remote is None or remote.not_modified:
+        remote = probe(url)
+    if remote.accepts_ranges and remote.size >= URL_RANGE_THRESHOLD and concurrency > 1:
+        return _iter_ranges(remote, concurrency)
+    return _iter_response(remote, block_size)
@@ -1,60 +1,583 @@
 import io
+import json
+import time
+import atexit
 import logging
+import threading
 import zenoh
 import os
+import shutil
+import hashlib
+from datetime import datetime, timezone
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from utils.file_cache import LocalFileCache
+from utils.compression import encode_payload, decode_payload, COMPRESSION_LEVEL, COLD_COMPRESSION_LEVEL
+from utils.zenoh_session import get_zenoh_session, on_session_reset, with_zenoh_session, run_blocking, iter_replies
+from utils.hedged_reads import hedged_get
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-# Initialize Zenoh session
-zenoh_session = zenoh.open()
+# Objects larger than this are stored as fixed-size segments behind a small manifest
+SEGMENT_SIZE = int(os.getenv("ZENOH_SEGMENT_SIZE", 4 * 1024 * 1024))  # 4MB per segment
+MANIFEST_MAGIC = b"\x00DDM-MANIFEST\x00"
+# Sidecar key space with one small {size, sha1, modified} entry per object, so listings skip payloads
+INDEX_PREFIX = "index/"
+# Last read time of each object, recorded at most once per `ACCESS_RESOLUTION` seconds per process
+ACCESS_PREFIX = "access/"
+ACCESS_RESOLUTION = int(os.getenv("ZENOH_ACCESS_RESOLUTION", 3600))
+ACCESS_TRACKER_SIZE = 65536  # Keys whose last recorded access is remembered
+# Cold tier: objects not read for a while are moved under this prefix, strongly compressed,
+# and their key holds a small stub pointing there until they are read again
+COLD_PREFIX = "cold/"
+PUBLISHER_POOL_SIZE = int(os.getenv("ZENOH_PUBLISHER_POOL_SIZE", 64))
+FETCH_CONCURRENCY = int(os.getenv("ZENOH_FETCH_CONCURRENCY", 4))  # Objects fetched in parallel
+BATCH_CONCURRENCY = int(os.getenv("ZENOH_BATCH_CONCURRENCY", 16))  # Operations in flight for put/get/delete_many
+
+
+class PublisherPool:
+    """Bounded LRU cache of declared Zenoh publishers, keyed by key expression."""
+
+    def __init__(self, max_size=PUBLISHER_POOL_SIZE):
+        self.max_size = max_size
+        self._publishers = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the publisher for `key`, declaring it and evicting the least recently used one if needed."""
+        with self._lock:
+            pub = self._publishers.get(key)
+            if pub is not None:
+                self._publishers.move_to_end(key)
+                return pub
+
+            pub = get_zenoh_session().declare_publisher(key)
+            self._publishers[key] = pub
+            while len(self._publishers) > self.max_size:
+                evicted_key, evicted = self._publishers.popitem(last=False)
+                self._undeclare(evicted_key, evicted)
+            return pub
+
+    def discard(self, key):
+        with self._lock:
+            pub = self._publishers.pop(key, None)
+        if pub is not None:
+            self._undeclare(key, pub)
+
+    def clear(self):
+        with self._lock:
+            publishers = list(self._publishers.items())
+            self._publishers.clear()
+        for key, pub in publishers:
+            self._undeclare(key, pub)
+
+    def forget(self):
+        """Drop publishers inherited across fork without undeclaring them on the parent's session."""
+        self._publishers = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._publishers)
+
+    @staticmethod
+    def _undeclare(key, pub):
+        try:
+            pub.undeclare()
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to undeclare publisher for {key}: {e}")
+
+
+publisher_pool = PublisherPool()
+atexit.register(publisher_pool.clear)
+on_session_reset(publisher_pool.clear)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=publisher_pool.forget)
+
+
+def segment_key(file_path, index):
+    """Zenoh key of a single segment of a segmented object."""
+    return f"{file_path}.seg/{index}"
+
+
+def cold_key(file_path):
+    """Zenoh key of the cold tier copy of the object at `file_path`."""
+    return f"{COLD_PREFIX}{file_path}"
+
+
+def _put_payload(key, payload, keep_publisher=False):
+    level = COLD_COMPRESSION_LEVEL if key.startswith(COLD_PREFIX) else COMPRESSION_LEVEL
+    payload = encode_payload(key, payload, level)  # Compressed at rest when it pays off
+    if keep_publisher:
+        run_blocking(publisher_pool.get(key).put, payload)
+    else:
+        with_zenoh_session(lambda session: run_blocking(session.put, key, payload))  # One-shot write, no publisher declaration
+
+
+def _store_payload(key, payload):
+    try:
+        _put_payload(key, payload)
+        return True
+    except Exception as e:
+        logger.error(f"❌ Failed to store {key} in Zenoh: {e}")
+        return False
+
+
+def _get_payload(key):
+    """Return the payload stored under `key`, decompressed, or None if no storage answered."""
+    payload = hedged_get(key)
+    if payload is None:
+        return None
+    logger.debug(f"📂 Received {key} ({len(payload)} bytes)")
+    return decode_payload(payload)
+
+
+def _copy_payload(key, target):
+    """Store the payload of `key` under `target` as it is stored (already encoded). Returns it decoded."""
+    payload = hedged_get(key)
+    if payload is None:
+        raise FileNotFoundError(f"{key} not found in Zenoh")
+    with_zenoh_session(lambda session: run_blocking(session.put, target, payload))
+    return decode_payload(payload)
+
+
+def _delete_key(key):
+    with_zenoh_session(lambda session: run_blocking(session.delete, key))
+    if "*" not in key:
+        publisher_pool.discard(key)
+
+
+def index_key(file_path):
+    """Zenoh key of the index entry describing the object at `file_path`."""
+    return f"{INDEX_PREFIX}{file_path}"
+
+
+def _write_index(file_path, entry):
+    if not _store_payload(index_key(file_path), json.dumps(entry).encode("utf-8")):
+        logger.warning(f"⚠️ Index entry not updated for {file_path}")
+
+
+def _index_object(file_path, size, sha1=None, **extra):
+    _write_index(file_path, {"size": size, "sha1": sha1, "modified": datetime.now(timezone.utc).isoformat(), **extra})
+
+
+def _read_index(file_path):
+    payload = _get_payload(index_key(file_path))
+    return json.loads(bytes(payload).decode("utf-8")) if payload is not None else None
+
+
+def _parse_manifest(payload):
+    """Return the manifest dict if `payload` is a manifest, None for plain object content."""
+    if payload is None or bytes(payload[:len(MANIFEST_MAGIC)]) != MANIFEST_MAGIC:
+        return None
+    return json.loads(bytes(payload[len(MANIFEST_MAGIC):]).decode("utf-8"))
+
+
+def _encode_manifest(manifest):
+    return MANIFEST_MAGIC + json.dumps(manifest).encode("utf-8")
+
+
+def _stored_segments(file_path):
+    """Number of segments the object currently stored at `file_path` has, read before rewriting it."""
+    entry = _read_index(file_path)
+    if entry is not None and "segments" in entry:
+        return entry["segments"]
+    # Entries written before segment counts were indexed, links and copies: ask the head
+    manifest = _parse_manifest(_get_payload(file_path))
+    if manifest is None or manifest["type"] == "link":
+        return 0
+    if manifest["type"] == "cold":
+        manifest = manifest.get("hot", {})
+    return manifest.get("segments", 0)
+
+
+def _trim_segments(file_path, previous, segments):
+    """Delete the segments of the previous, larger version of `file_path` that the new one does not overwrite."""
+    for index in range(segments, previous):
+        _delete_key(segment_key(file_path, index))
+    if previous > segments:
+        logger.info(f"🧹 Deleted {previous - segments} stale segments of {file_path}")
+
+
+def access_key(file_path):
+    """Zenoh key of the last access time of the object at `file_path`."""
+    return f"{ACCESS_PREFIX}{file_path}"
+
+
+class AccessTracker:
+    """Decides when a read is worth recording: once per key every `resolution` seconds."""
+
+    def __init__(self, resolution=ACCESS_RESOLUTION, max_keys=ACCESS_TRACKER_SIZE):
+        self.resolution = resolution
+        self.max_keys = max_keys
+        self._recorded = OrderedDict()
+        self._lock = threading.Lock()
+
+    def due(self, key):
+        now = time.monotonic()
+        with self._lock:
+            last = self._recorded.get(key)
+            if last is not None and now - last < self.resolution:
+                return False
+            self._recorded[key] = now
+            self._recorded.move_to_end(key)
+            while len(self._recorded) > self.max_keys:
+                self._recorded.popitem(last=False)
+            return True
+
+    def forget(self):
+        self._recorded = OrderedDict()
+        self._lock = threading.Lock()
+
+
+access_tracker = AccessTracker()
+_background = None
+_background_lock = threading.Lock()
+_promotions = set()  # Keys being promoted back to the hot tier by this process
+
+
+def _in_background(operation, *args):
+    """Run `operation(*args)` on a small worker pool, so reads do not wait for bookkeeping."""
+    global _background
+    with _background_lock:
+        if _background is None:
+            _background = ThreadPoolExecutor(max_workers=2, thread_name_prefix="zenoh-background")
+        executor = _background
+
+    def run():
+        try:
+            operation(*args)
+        except Exception as e:
+            logger.warning(f"⚠️ Background {operation.__name__} failed for {args}: {e}")
+
+    executor.submit(run)
+
+
+def _forget_background_after_fork():
+    global _background, _background_lock, _promotions
+    _background = None
+    _background_lock = threading.Lock()
+    _promotions = set()
+    access_tracker.forget()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_background_after_fork)
+
+
+def _record_access(file_path):
+    entry = {"accessed": datetime.now(timezone.utc).isoformat()}
+    _store_payload(access_key(file_path), json.dumps(entry).encode("utf-8"))
+
+
+def _note_access(file_path):
+    if access_tracker.due(file_path):
+        _in_background(_record_access, file_path)
+
+
+def _promote_once(file_path):
+    try:
+        ZenohFileHandler.promote(file_path)
+    finally:
+        with _background_lock:
+            _promotions.discard(file_path)
+
+
+def _schedule_promotion(file_path):
+    with _background_lock:
+        if file_path in _promotions:
+            return
+        _promotions.add(file_path)
+    _in_background(_promote_once, file_path)
+
+
+def prefetch_ordered(fetch, items, window=FETCH_CONCURRENCY):
+    """
+    Apply `fetch` to `items` with at most `window` calls in flight and yield
+    the results in the order of `items`.
+    Under eventlet the workers are green threads: they overlap because the Zenoh calls
+    they wait on go through `run_blocking`.
+    """
+    with ThreadPoolExecutor(max_workers=window) as executor:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(fetch, item))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def read_in_blocks(file_obj, block_size=SEGMENT_SIZE):
+    """Yield successive blocks from a binary file-like object."""
+    while True:
+        block = file_obj.read(block_size)
+        if not block:
+            break
+        yield block
+
+
+class HashingStream:
+    """Pass byte blocks, sync or async, through while computing their SHA1 hash and total size."""
+
+    def __init__(self, blocks):
+        self._blocks = blocks
+        self._hasher = hashlib.sha1()
+        self.size = 0
+
+    def __iter__(self):
+        for block in self._blocks:
+            self._hasher.update(block)
+            self.size += len(block)
+            yield block
+
+    async def __aiter__(self):
+        async for block in self._blocks:
+            self._hasher.update(block)
+            self.size += len(block)
+            yield block
+
+    def hexdigest(self):
+        return self._hasher.hexdigest()
+
+    def consume(self):
+        """Read the remaining blocks without keeping them, and return the hash."""
+        for _ in self:
+            pass
+        return self.hexdigest()
+
 
 class ZenohFileHandler:
     """Handles file storage and retrieval in Zenoh."""
 
     @staticmethod
-    def put_file(file_path, file_content):
+    def put_file(file_path, file_content, keep_publisher=False):
         """
         Store a file in Zenoh.
 
         :param file_path: The Zenoh key (e.g., "projects/1/files/myfile.txt").
         :param file_content: File content as bytes.
+        :param keep_publisher: Keep a pooled publisher for keys that are rewritten often.
         """
+        if isinstance(file_content, str):
+            file_content = file_content.encode("utf-8")
+        if len(file_content) > SEGMENT_SIZE:
+            view = memoryview(file_content)
+            return ZenohFileHandler.put_stream(
+                file_path, (view[i:i + SEGMENT_SIZE] for i in range(0, len(view), SEGMENT_SIZE))
+            )
         try:
-            pub = zenoh_session.declare_publisher(file_path)
-            pub.put(file_content)
+            previous = _stored_segments(file_path)
+            _put_payload(file_path, file_content, keep_publisher)
+            _index_object(file_path, len(file_content), hashlib.sha1(file_content).hexdigest(), segments=0)
+            _trim_segments(file_path, previous, 0)
             logger.info(f"✅ File stored in Zenoh: {file_path}")
             return True
         except Exception as e:
             logger.error(f"❌ Failed to store file in Zenoh: {e}")
             return False
-        
+
+    @staticmethod
+    def put_stream(file_path, chunks):
+        """
+        Store a file in Zenoh from an iterable of byte blocks with bounded memory.
+
+        Content that fits in a single segment is stored inline under `file_path`.
+        Larger content is written as `SEGMENT_SIZE` segments under `<file_path>.seg/<n>`
+        followed by a manifest under `file_path`, so readers never see a partial object.
+        Segments of a previous, larger version are deleted once the new head is stored.
+
+        :param file_path: The Zenoh key (e.g., "projects/1/files/myfile.txt").
+        :param chunks: Iterable of bytes-like blocks of any size.
+        :return: True if stored, False otherwise.
+        """
+        previous = _stored_segments(file_path)
+        buffer = bytearray()
+        stream = HashingStream(chunks)
+        segments = 0
+        # Errors raised while reading `chunks` propagate to the caller
+        for chunk in stream:
+            buffer.extend(chunk)
+            while len(buffer) > SEGMENT_SIZE or (segments and len(buffer) == SEGMENT_SIZE):
+                if not _store_payload(segment_key(file_path, segments), bytes(buffer[:SEGMENT_SIZE])):
+                    return False
+                del buffer[:SEGMENT_SIZE]
+                segments += 1
+
+        if not segments:
+            stored = _store_payload(file_path, bytes(buffer))
+            if stored:
+                _index_object(file_path, stream.size, stream.hexdigest(), segments=0)
+                _trim_segments(file_path, previous, 0)
+                logger.info(f"✅ File stored in Zenoh: {file_path}")
+            return stored
+
+        if buffer:
+            if not _store_payload(segment_key(file_path, segments), bytes(buffer)):
+                return False
+            segments += 1
+        stored = _store_payload(file_path, _encode_manifest({
+            "type": "segments",
+            "size": stream.size,
+            "segment_size": SEGMENT_SIZE,
+            "segments": segments,
+        }))
+        if stored:
+            _index_object(file_path, stream.size, stream.hexdigest(), segments=segments)
+            _trim_segments(file_path, previous, segments)
+            logger.info(f"✅ File stored in Zenoh as {segments} segments ({stream.size} bytes): {file_path}")
+        return stored
+
+    @staticmethod
+    def put_link(file_path, target_path):
+        """
+        Store a small link under `file_path` that resolves to the object at `target_path` on read.
+
+        :param file_path: The Zenoh key of the link (e.g., "projects/1/files/myfile.txt").
+        :param target_path: The Zenoh key of the linked object (e.g., "blobs/<sha1>").
+        :return: True if stored, False otherwise.
+        """
+        previous = _stored_segments(file_path)
+        stored = _store_payload(file_path, _encode_manifest({"type": "link", "target": target_path}))
+        if stored:
+            target = _read_index(target_path) or {}
+            _index_object(file_path, target.get("size"), target.get("sha1"), target=target_path, segments=0)
+            _trim_segments(file_path, previous, 0)
+            logger.info(f"🔗 Linked {file_path} -> {target_path}")
+        return stored
+
+    @staticmethod
+    def copy_file(file_path, target_path):
+        """
+        Copy the object at `file_path` to `target_path`: segments first, then its head, so
+        readers of `target_path` never see a partial object. Payloads are copied as stored.
+
+        :param file_path: The Zenoh key to copy (e.g., "blobs/staging/<file_id>/<attempt>").
+        :param target_path: The Zenoh key of the copy (e.g., "blobs/<sha1>").
+        :return: True if copied, False otherwise.
+        """
+        try:
+            payload = _get_payload(file_path)
+            manifest = _parse_manifest(payload)
+            if payload is None or (manifest is not None and manifest["type"] != "segments"):
+                # Links and cold tier stubs are copied as the content they resolve to
+                stored_object = ZenohFileHandler.open(file_path, record_access=False)
+                return stored_object is not None and ZenohFileHandler.put_stream(target_path, iter(stored_object))
+            if manifest is not None:
+                keys = [(segment_key(file_path, i), segment_key(target_path, i)) for i in range(manifest["segments"])]
+                for _ in prefetch_ordered(lambda pair: _copy_payload(*pair), keys, BATCH_CONCURRENCY):
+                    pass
+            _copy_payload(file_path, target_path)
+            entry = _read_index(file_path) or {}
+            _index_object(target_path, entry.get("size", StoredObject(file_path, manifest, payload).size), entry.get("sha1"))
+            logger.info(f"📋 Copied {file_path} to {target_path}")
+            return True
+        except Exception as e:
+            logger.error(f"❌ Failed to copy {file_path} to {target_path}: {e}")
+            return False
+
+    @staticmethod
+    def open(file_path, record_access=True):
+        """
+        Resolve a Zenoh key to a `StoredObject`, following links and cold tier stubs.
+
+        Only the object's head is fetched: the inline content of a small object or the
+        manifest of a segmented one. An object read from the cold tier is promoted back
+        to the hot tier in the background.
+
+        :param file_path: The Zenoh key (e.g., "projects/1/files/myfile.txt").
+        :param record_access: Count this as a read for tiering; False for maintenance reads.
+        :return: StoredObject or None if not found.
+        """
+        payload = _get_payload(file_path)
+        if payload is None:
+            logger.error(f"❌ File not found in Zenoh: {file_path}")
+            return None
+        if record_access:
+            _note_access(file_path)
+
+        manifest = _parse_manifest(payload)
+        if manifest is not None and manifest["type"] == "cold":
+            cold_object = ZenohFileHandler.open(manifest["target"], record_access=False)
+            if cold_object is not None:
+                if record_access:
+                    _schedule_promotion(file_path)
+                return cold_object
+            # Promoted back since the stub was read: read the key again
+            payload = _get_payload(file_path)
+            manifest = _parse_manifest(payload)
+            if payload is None or (manifest is not None and manifest["type"] == "cold"):
+                logger.error(f"❌ Cold tier copy of {file_path} not found in Zenoh")
+                return None
+        if manifest is not None and manifest["type"] == "link":
+            return ZenohFileHandler.open(manifest["target"], record_access)
+        return StoredObject(file_path, manifest, payload)
+
+    @staticmethod
+    def get_stream(file_path):
+        """
+        Retrieve a file from Zenoh as an iterator of byte blocks.
+
+        Segments of large objects are fetched lazily, one at a time, as the iterator
+        is consumed.
+
+        :param file_path: The Zenoh key (e.g., "projects/1/files/myfile.txt").
+        :return: Iterator of bytes or None if not found.
+        """
+        stored_object = ZenohFileHandler.open(file_path)
+        return iter(stored_object) if stored_object else None
+
+    @staticmethod
+    def get_range(file_path, offset, length):
+        """
+        Retrieve `length` bytes starting at `offset`, fetching only the segments that overlap the range.
+
+        :param file_path: The Zenoh key (e.g., "projects/1/files/myfile.txt").
+        :return: bytes (shorter than `length` at the end of the object) or None if not found.
+        """
+        stored_object = ZenohFileHandler.open(file_path)
+        if stored_object is None:
+            return None
+        return b"".join(stored_object.iter_range(offset, length))
 
     @staticmethod
     def get_file(file_path):
         """
         Retrieve a file from Zenoh as a binary stream.
 
+        Loads the whole object in memory; prefer `get_stream` for large files.
+
         :param file_path: The Zenoh key (e.g., "projects/1/files/myfile.txt").
         :return: BytesIO stream of file content or None if not found.
         """
-        file_content = None  # Initialize content
-        
-        replies = zenoh_session.get(file_path, zenoh.Queue())
-        for reply in replies:
-            logger.info(f"✅ Zenoh Response Received: {reply}")
+        stream = ZenohFileHandler.get_stream(file_path)
+        if stream is None:
+            return None
+        try:
+            return io.BytesIO(b"".join(stream))  # Return as file-like object
+        except FileNotFoundError as e:
+            logger.error(f"❌ {e}")
+            return None
+
+    @staticmethod
+    def list_objects(folder_path):
+        """
+        List the objects stored in a Zenoh folder from the key index, without transferring their content.
 
+        :param folder_path: The Zenoh key prefix (e.g., "projects/1/files/**").
+        :return: List of {"key", "size", "sha1", "modified"} dicts sorted by key.
+        """
+        objects = {}
+        replies = with_zenoh_session(lambda session: session.get(index_key(folder_path), zenoh.Queue()))
+        for reply in iter_replies(replies):
             if reply.ok:
-                file_content = reply.ok.payload
-                logger.debug(f"📂 Received binary data ({len(file_content)} bytes)")
-                break  # Stop after getting valid response
+                key = str(reply.ok.key_expr)[len(INDEX_PREFIX):]
+                entry = json.loads(bytes(decode_payload(reply.ok.payload)).decode("utf-8"))
+                objects[key] = {"key": key, **entry}  # Replicas answer with the same entries
 
-        if file_content:
-            return io.BytesIO(file_content)  # Return as file-like object
-        else:
-            logger.error(f"❌ File not found in Zenoh: {file_path}")
-            return None
+        logger.info(f"📂 Found {len(objects)} files in {folder_path}")
+        return [objects[key] for key in sorted(objects)]
 
     @staticmethod
     def list_files(folder_path):
@@ -64,71 +587,327 @@ class ZenohFileHandler:
         :param folder_path: The Zenoh key prefix (e.g., "projects/1/files/**").
         :return: List of file paths.
         """
-        file_list = []
+        return [entry["key"] for entry in ZenohFileHandler.list_objects(folder_path)]
+
+    @staticmethod
+    def reindex(folder_path):
+        """
+        Rebuild index entries for the objects in a Zenoh folder, e.g. objects stored before the index existed.
+        This fetches every object in the folder once.
 
-        replies = zenoh_session.get(folder_path, zenoh.Queue())
-        for reply in replies:
+        :param folder_path: The Zenoh key prefix (e.g., "projects/1/files/**").
+        :return: Number of objects indexed.
+        """
+        indexed = 0
+        replies = with_zenoh_session(lambda session: session.get(folder_path, zenoh.Queue()))
+        for reply in iter_replies(replies):
+            if not reply.ok or ".seg/" in str(reply.ok.key_expr):
+                continue
+            key = str(reply.ok.key_expr)
+            payload = decode_payload(reply.ok.payload)
+            manifest = _parse_manifest(payload)
+            stored_object = StoredObject(key, None, payload) if manifest is None else ZenohFileHandler.open(key, record_access=False)
+            if stored_object is None:
+                continue
+            try:
+                sha1 = HashingStream(stored_object).consume()
+            except FileNotFoundError as e:
+                logger.warning(f"⚠️ Not indexing incomplete object {key}: {e}")
+                continue
+            _index_object(key, stored_object.size, sha1)
+            indexed += 1
+
+        logger.info(f"📇 Indexed {indexed} files in {folder_path}")
+        return indexed
+
+    @staticmethod
+    def last_accessed(folder_path):
+        """
+        Last recorded read of the objects in a Zenoh folder.
+
+        :param folder_path: The Zenoh key prefix (e.g., "blobs/**").
+        :return: Dict of Zenoh key -> ISO 8601 timestamp. Objects never read since tracking started are absent.
+        """
+        accessed = {}
+        replies = with_zenoh_session(lambda session: session.get(access_key(folder_path), zenoh.Queue()))
+        for reply in iter_replies(replies):
             if reply.ok:
-                file_list.append(reply.ok.key_expr)
-        
-        logger.info(f"📂 Found {len(file_list)} files in {folder_path}")
-        return file_list
+                key = str(reply.ok.key_expr)[len(ACCESS_PREFIX):]
+                entry = json.loads(bytes(decode_payload(reply.ok.payload)).decode("utf-8"))
+                accessed[key] = max(accessed.get(key, ""), entry["accessed"])
+        return accessed
+
+    @staticmethod
+    def move_to_cold(file_path):
+        """
+        Move an object to the cold tier: copy it under `cold/`, strongly compressed, then
+        replace it with a stub pointing there. Reads stay transparent. Hot segments are kept
+        for readers still streaming them, until `release_hot_segments`.
+
+        :param file_path: The Zenoh key (e.g., "blobs/<sha1>").
+        :return: Bytes moved, or 0 if the object was not moved (links, stubs, missing or changed meanwhile).
+        """
+        payload = _get_payload(file_path)
+        manifest = _parse_manifest(payload)
+        if payload is None or (manifest is not None and manifest["type"] in ("link", "cold")):
+            return 0
+        entry = _read_index(file_path)
+        stored_object = StoredObject(file_path, manifest, payload)
+        target = cold_key(file_path)
+        if not ZenohFileHandler.put_stream(target, iter(stored_object)):
+            ZenohFileHandler.delete_file(target)
+            return 0
+
+        # Keep the hot copy if the object was rewritten while it was copied
+        if entry is not None and (_read_index(file_path) or {}).get("modified") != entry.get("modified"):
+            logger.warning(f"⚠️ {file_path} changed while moving it to the cold tier, keeping it hot")
+            ZenohFileHandler.delete_file(target)
+            return 0
+        stub = {"type": "cold", "target": target, "size": stored_object.size}
+        if manifest is not None:
+            stub.update(hot=manifest, moved=datetime.now(timezone.utc).isoformat())
+        if not _store_payload(file_path, _encode_manifest(stub)):
+            ZenohFileHandler.delete_file(target)
+            return 0
+        if manifest is not None:
+            _write_index(target, {**(_read_index(target) or {}), "hot_segments": True})
+        publisher_pool.discard(file_path)
+        logger.info(f"🧊 Moved {file_path} ({stored_object.size} bytes) to the cold tier")
+        return stored_object.size
+
+    @staticmethod
+    def stored_type(file_path):
+        """
+        How the object at `file_path` is stored: "inline", or the type of its manifest
+        ("segments", "link", or "cold" for a stub pointing to its cold tier copy).
+
+        :return: The type, or None if the key is missing or could not be read.
+        """
+        payload = _get_payload(file_path)
+        if payload is None:
+            return None
+        manifest = _parse_manifest(payload)
+        return "inline" if manifest is None else manifest["type"]
+
+    @staticmethod
+    def promote(file_path):
+        """
+        Move an object read from the cold tier back to the hot tier, keeping its index entry.
+        Hot segments still in place are reused. The cold copy is left for readers streaming
+        it and deleted by `tiering.sweep_cold_copies` after a grace period.
+
+        :param file_path: The Zenoh key (e.g., "blobs/<sha1>").
+        :return: True if promoted, False if it is not in the cold tier, its hot segments are
+                 being released, or it could not be copied.
+        """
+        manifest = _parse_manifest(_get_payload(file_path))
+        if manifest is None or manifest["type"] != "cold":
+            return False  # Already promoted, or rewritten since
+        if "released" in manifest:
+            return False  # Hot segments being deleted: writing them again would race with the deletion
+        entry = _read_index(file_path)
+        if "hot" in manifest:
+            promoted = _store_payload(file_path, _encode_manifest(manifest["hot"]))
+        else:
+            cold_object = ZenohFileHandler.open(manifest["target"], record_access=False)
+            promoted = cold_object is not None and ZenohFileHandler.put_stream(file_path, iter(cold_object))
+        if not promoted:
+            logger.error(f"❌ Failed to promote {file_path} from the cold tier")
+            return False
+        if entry is not None:
+            _write_index(file_path, entry)
+        cold_entry = _read_index(manifest["target"]) or {}
+        _write_index(manifest["target"], {**cold_entry, "released": datetime.now(timezone.utc).isoformat()})
+        logger.info(f"🔥 Promoted {file_path} back to the hot tier")
+        return True
+
+    @staticmethod
+    def release_hot_segments(file_path, cutoff):
+        """
+        Delete the hot segments an object moved to the cold tier left behind, in two steps
+        taken on different calls: the stub first stops pointing to them, so promotions copy
+        from the cold tier instead of reusing them, then they are deleted. Each step only
+        follows the previous one if it was taken before `cutoff`, so readers are done by then.
+
+        :param file_path: The Zenoh key (e.g., "blobs/<sha1>").
+        :param cutoff: Aware datetime; steps taken after it are not followed up yet.
+        :return: True once the object has no hot segments left to release.
+        """
+        entry = _read_index(file_path)
+        manifest = _parse_manifest(_get_payload(file_path))
+        if manifest is not None and manifest["type"] == "cold" and ("hot" in manifest or "released" in manifest):
+            step = manifest["moved"] if "hot" in manifest else manifest["released"]
+            if datetime.fromisoformat(step) >= cutoff:
+                return False
+            if entry is not None and (_read_index(file_path) or {}).get("modified") != entry.get("modified"):
+                return False  # Rewritten meanwhile
+            stub = {"type": "cold", "target": manifest["target"], "size": manifest["size"]}
+            if "hot" in manifest:
+                stub["released"] = datetime.now(timezone.utc).isoformat()
+                _store_payload(file_path, _encode_manifest(stub))
+                return False
+            _delete_key(segment_key(file_path, "**"))
+            if not _store_payload(file_path, _encode_manifest(stub)):
+                return False
+            logger.info(f"🧹 Deleted the hot segments of {file_path}")
+
+        # Released, promoted or rewritten: no hot segments are left to release
+        cold_entry = _read_index(cold_key(file_path))
+        if cold_entry is not None and cold_entry.pop("hot_segments", None):
+            _write_index(cold_key(file_path), cold_entry)
+        return True
 
     @staticmethod
     def delete_file(file_path):
         """
-        Delete a file from Zenoh.
+        Delete a file from Zenoh, including the segments of a segmented object and its cold tier copy.
 
         :param file_path: The Zenoh key (e.g., "projects/1/files/myfile.txt").
         :return: True if deleted, False otherwise.
         """
+        keys = (file_path,) if file_path.startswith(COLD_PREFIX) else (file_path, cold_key(file_path))
         try:
-            pub = zenoh_session.declare_publisher(file_path)
-            pub.delete()
+            for key in keys:
+                _delete_key(key)
+                if "*" not in key:  # A wildcard already covers segment keys
+                    _delete_key(segment_key(key, "**"))
+                _delete_key(index_key(key))
+            _delete_key(access_key(file_path))
             logger.info(f"🗑️ File deleted from Zenoh: {file_path}")
             return True
         except Exception as e:
             logger.error(f"❌ Failed to delete file in Zenoh: {e}")
             return False
-        
 
+    @staticmethod
+    def put_many(files, concurrency=BATCH_CONCURRENCY):
+        """
+        Store many files, keeping up to `concurrency` writes in flight.
 
-        
-def merge_file_chunks_from_zenoh(file_id, project_id, total_chunks):
-    merged_file = io.BytesIO()
+        :param files: Dict or iterable of (Zenoh key, file content) pairs.
+        :return: Dict of Zenoh key -> True if stored, False otherwise.
+        """
+        items = list(files.items() if isinstance(files, dict) else files)
+        results = prefetch_ordered(lambda item: ZenohFileHandler.put_file(*item), items, concurrency)
+        return _collect_batch("Stored", [key for key, _ in items], results)
 
-    for i in range(total_chunks):
-        chunk_path = f"projects/{project_id}/files/{file_id}/chunks/chunk_{i}"
-        chunk_data = ZenohFileHandler.get_file(chunk_path)
+    @staticmethod
+    def get_many(file_paths, concurrency=BATCH_CONCURRENCY):
+        """
+        Retrieve many files, keeping up to `concurrency` reads in flight.
 
-        if not chunk_data:
-            logger.error(f"❌ Missing chunk: {chunk_path}")
-            return None, f"Missing chunk {i}"
+        :param file_paths: Iterable of Zenoh keys.
+        :return: Dict of Zenoh key -> BytesIO stream of file content, or None if not found.
+        """
+        file_paths = list(file_paths)
+        results = prefetch_ordered(ZenohFileHandler.get_file, file_paths, concurrency)
+        return _collect_batch("Retrieved", file_paths, results)
 
-        merged_file.write(chunk_data.read())
-        logger.info(f"✅ Merged chunk {i} from {chunk_path}")
+    @staticmethod
+    def delete_many(file_paths, concurrency=BATCH_CONCURRENCY):
+        """
+        Delete many files, keeping up to `concurrency` deletions in flight.
 
-    return merged_file, None
+        :param file_paths: Iterable of Zenoh keys.
+        :return: Dict of Zenoh key -> True if deleted, False otherwise.
+        """
+        file_paths = list(file_paths)
+        results = prefetch_ordered(ZenohFileHandler.delete_file, file_paths, concurrency)
+        return _collect_batch("Deleted", file_paths, results)
 
 
+def _collect_batch(action, keys, results):
+    results = dict(zip(keys, results))
+    succeeded = sum(1 for result in results.values() if result)
+    logger.info(f"📦 {action} {succeeded}/{len(results)} objects in Zenoh")
+    return results
 
-def download_file_from_zenoh(file_path, local_path):
-    file_data = ZenohFileHandler.get_file(file_path)
-    if not file_data:
-        raise FileNotFoundError(f"❌ File not found in Zenoh: {file_path}")
-    with open(local_path, "wb") as f:
-        f.write(file_data.read() if isinstance(file_data, io.BytesIO) else file_data)
-    return local_path
 
+class StoredObject:
+    """An object resolved in Zenoh: inline content or a segment manifest."""
+
+    def __init__(self, key, manifest, payload):
+        self.key = key  # Key holding the content, after following links
+        self.manifest = manifest
+        self._payload = payload if manifest is None else None
+
+    @property
+    def size(self):
+        return self.manifest["size"] if self.manifest else len(self._payload)
+
+    def __iter__(self):
+        return self.iter_range(0, self.size)
+
+    def iter_range(self, offset, length):
+        """Yield the bytes in [offset, offset + length), fetching segments lazily."""
+        end = min(offset + length, self.size)
+        if offset >= end:
+            return
+        if self.manifest is None:
+            yield bytes(self._payload[offset:end])
+            return
+
+        segment_size = self.manifest["segment_size"]
+        for i in range(offset // segment_size, (end - 1) // segment_size + 1):
+            segment = _get_payload(segment_key(self.key, i))
+            if segment is None:
+                raise FileNotFoundError(f"Missing segment {i} of {self.key}")
+            start = i * segment_size
+            yield bytes(segment[max(offset - start, 0):end - start])
 
-def save_processed_file(df, file_path, ext):
-    temp_path = f"/tmp/{os.path.basename(file_path)}_processed{ext}"
-    if ext != ".parquet":
-        df.to_csv(temp_path, index=False)
-    else:
-        df.to_parquet(temp_path)
-    with open(temp_path, "rb") as f:
-        ZenohFileHandler.put_file(file_path, f.read())
-    return temp_path
 
+class ChunkIntegrityError(Exception):
+    """An uploaded chunk is missing from Zenoh or does not match its recorded checksum."""
 
+    def __init__(self, chunk_index, message):
+        super().__init__(message)
+        self.chunk_index = chunk_index
+
+
+def _fetch_chunk(chunk):
+    chunk_index, chunk_path, checksum = chunk
+    chunk_data = ZenohFileHandler.get_stream(chunk_path)
+    if chunk_data is None:
+        logger.error(f"❌ Missing chunk: {chunk_path}")
+        raise ChunkIntegrityError(chunk_index, f"Missing chunk {chunk_index}")
+    chunk_data = b"".join(chunk_data)
+    if checksum and hashlib.sha1(chunk_data).hexdigest() != checksum:
+        logger.error(f"❌ Checksum mismatch for chunk: {chunk_path}")
+        raise ChunkIntegrityError(chunk_index, f"Checksum mismatch for chunk {chunk_index}")
+    return chunk_data
+
+
+def merge_file_chunks_from_zenoh(file_id, project_id, total_chunks, concurrency=FETCH_CONCURRENCY, checksums=None):
+    """
+    Yield uploaded chunks in order, fetching up to `concurrency` chunks from Zenoh at once.
+
+    :param checksums: Optional SHA1 of every chunk, by index, to verify chunks against.
+    :raises ChunkIntegrityError: If a chunk is missing or does not match its checksum.
+    """
+    chunks = (
+        (i, f"projects/{project_id}/files/{file_id}/chunks/chunk_{i}", checksums[i] if checksums else None)
+        for i in range(total_chunks)
+    )
+    for i, chunk in enumerate(prefetch_ordered(_fetch_chunk, chunks, concurrency)):
+        logger.info(f"✅ Merged chunk {i}")
+        yield chunk
+
+
+# Worker-local read-through cache shared by the Celery tasks
+file_cache = LocalFileCache(ZenohFileHandler.get_stream)
+
+
+def download_file_from_zenoh(file_path, local_path, file_hash=None):
+    """Copy a Zenoh object to `local_path`, going through the local cache when its hash is known."""
+    if file_hash:
+        with file_cache.local_copy(file_path, file_hash) as cached_path:
+            shutil.copyfile(cached_path, local_path)
+        return local_path
+
+    file_data = ZenohFileHandler.get_stream(file_path)
+    if file_data is None:
+        raise FileNotFoundError(f"❌ File not found in Zenoh: {file_path}")
+    with open(local_path, "wb") as f:
+        for block in file_data:
+            f.write(block)
+    return local_path
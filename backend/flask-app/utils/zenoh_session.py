@@ -0,0 +1,135 @@
+import os
+import json
+import logging
+import threading
+import zenoh
+
+try:
+    from eventlet import patcher as eventlet_patcher, tpool as eventlet_tpool
+except ImportError:
+    eventlet_patcher = None
+
+logger = logging.getLogger(__name__)
+
+_session = None
+_session_pid = None
+_lock = threading.Lock()
+_reset_callbacks = []
+
+
+def _build_config():
+    """
+    Zenoh configuration from `ZENOH_CONFIG_PATH` (if set), with `ZENOH_MODE` and
+    `ZENOH_CONNECT` (comma-separated endpoints) overriding it.
+
+    Same-host transport (opt-in, Linux):
+    - `ZENOH_LOCAL_SOCKET`: path of a Unix socket the storage node listens on. It is tried
+      before the other endpoints, which remain the fallback when it cannot be reached.
+    - `ZENOH_SHARED_MEMORY=true`: negotiate the shared-memory transport with peers that
+      support it. Payloads only travel through shared memory when allocated there, which
+      the Python bindings do not do yet, so the gain today comes from the Unix socket.
+    """
+    config_path = os.getenv("ZENOH_CONFIG_PATH")
+    config = zenoh.Config.from_file(config_path) if config_path else zenoh.Config()
+    mode = os.getenv("ZENOH_MODE")
+    if mode:
+        config.insert_json5("mode", json.dumps(mode))
+    endpoints = os.getenv("ZENOH_CONNECT")
+    if endpoints:
+        endpoints = [endpoint.strip() for endpoint in endpoints.split(",") if endpoint.strip()]
+        config.insert_json5("connect/endpoints", json.dumps(endpoints))
+
+    local_socket = os.getenv("ZENOH_LOCAL_SOCKET")
+    if local_socket:
+        endpoints = json.loads(config.get_json("connect/endpoints"))
+        config.insert_json5("connect/endpoints", json.dumps([f"unixsock-stream/{local_socket}"] + endpoints))
+    if os.getenv("ZENOH_SHARED_MEMORY", "false").lower() in ("1", "true", "yes"):
+        config.insert_json5("transport/shared_memory/enabled", "true")
+    return config
+
+
+def get_zenoh_session():
+    """
+    Return the process-wide Zenoh session, opening it on first use.
+
+    A process forked after the session was opened gets a session of its own.
+    """
+    global _session, _session_pid
+    pid = os.getpid()
+    if _session is not None and _session_pid == pid:
+        return _session
+    with _lock:
+        if _session is None or _session_pid != pid:
+            _session = zenoh.open(_build_config())
+            _session_pid = pid
+            logger.info(f"🔌 Zenoh session opened (pid {pid})")
+        return _session
+
+
+def on_session_reset(callback):
+    """Register `callback` to release objects bound to the session (e.g. publishers) before it is closed."""
+    _reset_callbacks.append(callback)
+
+
+def reset_zenoh_session():
+    """Close the current session so the next `get_zenoh_session` call opens a fresh one."""
+    global _session, _session_pid
+    with _lock:
+        session, owned = _session, _session_pid == os.getpid()
+        _session = None
+        _session_pid = None
+    for callback in _reset_callbacks:
+        callback()
+    if session is not None and owned:
+        try:
+            session.close()
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to close Zenoh session: {e}")
+    logger.info("🔌 Zenoh session reset")
+
+
+def with_zenoh_session(operation):
+    """
+    Run `operation(session)`, reopening the session and retrying once if it fails.
+    Only use for idempotent operations.
+    """
+    try:
+        return operation(get_zenoh_session())
+    except Exception as e:
+        logger.warning(f"⚠️ Zenoh operation failed, reconnecting: {e}")
+        reset_zenoh_session()
+        return operation(get_zenoh_session())
+
+
+def run_blocking(call, *args):
+    """
+    Run a Zenoh call that blocks natively (puts, waiting on a reply queue).
+
+    Under eventlet monkey patching, threads are green threads sharing one OS thread, so a
+    native wait would block all of them. The call then runs on eventlet's pool of real OS
+    threads, and concurrent callers such as the workers of `prefetch_ordered` overlap.
+    """
+    if eventlet_patcher is not None and eventlet_patcher.is_monkey_patched("thread"):
+        return eventlet_tpool.execute(call, *args)
+    return call(*args)
+
+
+def iter_replies(replies):
+    """Iterate over a `zenoh.Queue` of query replies, waiting for each one with `run_blocking`."""
+    while True:
+        try:
+            yield run_blocking(replies.get)
+        except StopIteration:
+            return
+
+
+def _forget_session_after_fork():
+    # The parent's session (and its runtime threads) does not survive fork: drop it without closing
+    global _session, _session_pid, _lock
+    _session = None
+    _session_pid = None
+    _lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_session_after_fork)
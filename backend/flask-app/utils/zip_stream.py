@@ -0,0 +1,67 @@
+import os
+import time
+import zipfile
+import logging
+from utils.zenoh_file_handler import ZenohFileHandler, prefetch_ordered, FETCH_CONCURRENCY
+
+logger = logging.getLogger(__name__)
+
+# Formats that are already compressed: deflating them again only costs CPU
+STORED_EXTENSIONS = {
+    ".zip", ".gz", ".tgz", ".bz2", ".xz", ".7z", ".rar",
+    ".parquet", ".orc", ".feather",
+    ".png", ".jpg", ".jpeg", ".gif", ".webp",
+    ".mp3", ".mp4", ".mkv", ".mov", ".avi", ".webm", ".ogg", ".flac", ".m4a",
+    ".xlsx", ".docx",
+}
+
+
+class _ZipSink:
+    """Write-only, unseekable file object collecting the bytes `zipfile` produces."""
+
+    def __init__(self):
+        self._parts = []
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        parts, self._parts = self._parts, []
+        return parts
+
+
+def stream_zip(entries, window=FETCH_CONCURRENCY):
+    """
+    Build a ZIP archive from Zenoh objects and yield it as it is written.
+
+    Up to `window` objects are opened ahead of the one being written, and each entry's
+    segments are copied one at a time, so memory stays bounded by the window.
+    Missing objects are skipped.
+
+    :param entries: Iterable of (name in archive, Zenoh key).
+    """
+    def fetch(entry):
+        arcname, zenoh_path = entry
+        return arcname, zenoh_path, ZenohFileHandler.open(zenoh_path)
+
+    sink = _ZipSink()
+    # An unseekable sink makes zipfile write sizes in data descriptors after each entry
+    with zipfile.ZipFile(sink, "w") as zipf:
+        for arcname, zenoh_path, stored_object in prefetch_ordered(fetch, entries, window):
+            if stored_object is None:
+                logger.warning(f"⚠️ Skipping missing object in ZIP: {zenoh_path}")
+                continue
+
+            info = zipfile.ZipInfo(arcname, date_time=time.localtime()[:6])
+            ext = os.path.splitext(arcname)[1].lower()
+            info.compress_type = zipfile.ZIP_STORED if ext in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+            with zipf.open(info, "w", force_zip64=True) as entry:
+                for block in stored_object:
+                    entry.write(block)
+                    yield from sink.drain()
+            yield from sink.drain()
+    yield from sink.drain()
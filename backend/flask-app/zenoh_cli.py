@@ -1,20 +1,21 @@
-import eventlet
-eventlet.monkey_patch()  # ✅ Ensure this is at the top before importing anything else
-import zenoh
 import argparse
 import logging
 import io
+import os
+from utils.zenoh_session import get_zenoh_session
+from utils.zenoh_file_handler import ZenohFileHandler, read_in_blocks, download_file_from_zenoh
+from utils.dir_sync import sync_up, sync_down, SYNC_WORKERS
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-zenoh_config = zenoh.Config()
-zenoh_config.insert_json5("mode", '"client"')
-zenoh_config.insert_json5("connect/endpoints", '["tcp/zenoh16:17447"]')
+# Defaults for running outside the cluster; ZENOH_CONFIG_PATH / ZENOH_MODE / ZENOH_CONNECT override them
+os.environ.setdefault("ZENOH_MODE", "client")
+os.environ.setdefault("ZENOH_CONNECT", "tcp/zenoh16:17447")
 
 # Open Zenoh session
-zenoh_session = zenoh.open(zenoh_config)
+zenoh_session = get_zenoh_session()
 
 info = zenoh_session.info()
 zid = str(info.zid())
@@ -29,10 +30,9 @@ def put_file(zenoh_key, local_path):
     """
     try:
         with open(local_path, "rb") as f:
-            content = f.read()
+            if not ZenohFileHandler.put_stream(zenoh_key, read_in_blocks(f)):
+                return False
 
-        pub = zenoh_session.declare_publisher(zenoh_key)
-        pub.put(content)
         logger.info(f"✅ File uploaded to Zenoh: {zenoh_key}")
         return True
     except Exception as e:
@@ -46,15 +46,9 @@ def get_file(zenoh_key, local_path):
     :param local_path: Path to save the file locally.
     """
     try:
-        replies = zenoh_session.get(zenoh_key, zenoh.Queue())
-        for reply in replies:
-            if reply.ok:
-                with open(local_path, "wb") as f:
-                    f.write(reply.ok.payload)
-                logger.info(f"✅ File downloaded from Zenoh to {local_path}")
-                return True
-        logger.error(f"❌ File not found in Zenoh: {zenoh_key}")
-        return False
+        download_file_from_zenoh(zenoh_key, local_path)
+        logger.info(f"✅ File downloaded from Zenoh to {local_path}")
+        return True
     except Exception as e:
         logger.error(f"❌ Failed to download file: {e}")
         return False
@@ -65,16 +59,12 @@ def list_files(folder_path):
     :param folder_path: The Zenoh key prefix (e.g., "projects/1/files/**").
     """
     try:
-        file_list = []
-        replies = zenoh_session.get(folder_path, zenoh.Queue())
-        for reply in replies:
-            if reply.ok:
-                file_list.append(reply.ok.key_expr)
+        file_list = ZenohFileHandler.list_objects(folder_path)  # Keys, sizes and timestamps only
 
         if file_list:
             logger.info(f"📂 Found {len(file_list)} files in {folder_path}")
             for file in file_list:
-                print(f" - {file}")
+                print(f" - {file['key']}  {file['size']} bytes  {file['modified']}")
         else:
             logger.warning(f"❌ No files found in {folder_path}")
     except Exception as e:
@@ -86,8 +76,8 @@ def delete_file(zenoh_key):
     :param zenoh_key: The Zenoh key of the file.
     """
     try:
-        pub = zenoh_session.declare_publisher(zenoh_key)
-        pub.delete()
+        if not ZenohFileHandler.delete_file(zenoh_key):
+            return False
         logger.info(f"🗑️ File deleted from Zenoh: {zenoh_key}")
         return True
     except Exception as e:
@@ -96,9 +86,10 @@ def delete_file(zenoh_key):
 
 def main():
     parser = argparse.ArgumentParser(description="Zenoh File CLI")
-    parser.add_argument("action", choices=["upload", "download", "list", "delete"], help="Action to perform")
+    parser.add_argument("action", choices=["upload", "download", "list", "delete", "reindex", "sync-up", "sync-down"], help="Action to perform")
     parser.add_argument("--local", help="Local file path for upload/download")
     parser.add_argument("--zenoh", help="Zenoh key (e.g., 'projects/1/files/results.csv')")
+    parser.add_argument("--workers", type=int, default=SYNC_WORKERS, help="Parallel transfers for sync-up/sync-down")
 
     args = parser.parse_args()
 
@@ -138,5 +129,22 @@ def main():
         else:
             print("❌ Deletion failed")
 
+    elif args.action == "reindex":
+        if not args.zenoh:
+            print("❌ Error: --zenoh argument (folder path) is required for reindexing")
+            return
+        indexed = ZenohFileHandler.reindex(args.zenoh)
+        print(f"📇 Indexed {indexed} files under {args.zenoh}")
+
+    elif args.action in ("sync-up", "sync-down"):
+        if not args.local or not args.zenoh:
+            print(f"❌ Error: --local and --zenoh arguments are required for {args.action}")
+            return
+        if args.action == "sync-up":
+            transferred, skipped, failed = sync_up(args.local, args.zenoh, args.workers)
+        else:
+            transferred, skipped, failed = sync_down(args.zenoh, args.local, args.workers)
+        print(f"🔁 {args.action}: {transferred} transferred, {skipped} unchanged, {failed} failed")
+
 if __name__ == "__main__":
     main()
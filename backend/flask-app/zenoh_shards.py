@@ -0,0 +1,98 @@
+"""
+Shard layout of the storage nodes: plan, per-node configs and rebalancing.
+
+Usage (from backend/flask-app):
+    # Partitions held by each node, and what moves when going from the previous ring
+    python zenoh_shards.py plan --ring ../../zenoh-shards.json --previous old-shards.json
+
+    # Storage configs, written to <output>/<node>/zenoh-fs.json5
+    python zenoh_shards.py configs --ring ../../zenoh-shards.json --output ../.. [--previous old-shards.json]
+
+    # Copy the partitions gained by nodes to them
+    ZENOH_CONNECT=tcp/zenoh1:7447 python zenoh_shards.py rebalance --ring ../../zenoh-shards.json --previous old-shards.json
+
+Adding a node:
+    1. Write configs with `--previous`: nodes keep the partitions they are losing, the
+       new node declares the partitions it takes over. Start the new node, restart the others.
+    2. Run `rebalance`: only the objects of moved partitions are copied.
+    3. Write configs without `--previous` and restart the nodes. The directories of
+       dropped partitions, listed by `rebalance`, can then be removed.
+"""
+import os
+import json
+import argparse
+import logging
+from utils.shard_ring import HashRing, node_partitions, rebalance_plan, node_config, copy_partition, storage_dir
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def print_plan(ring, previous):
+    for node, shards in sorted(node_partitions(ring).items()):
+        print(f"🗄️ {node}: {len(shards)} partitions")
+    if previous is None:
+        return
+    moves, drops = rebalance_plan(previous, ring)
+    total = len(ring.placement())
+    print(f"📦 {len(moves)}/{total} partitions gain a node")
+    for space, partition, sources, gained in moves:
+        print(f" - {space}/{partition}: {', '.join(sources) or 'nowhere'} -> {', '.join(gained)}")
+    for node, space, partition in drops:
+        print(f" - {node} drops {space}/{partition}")
+
+
+def write_configs(ring, previous, output):
+    for node, shards in sorted(node_partitions(ring, previous).items()):
+        path = os.path.join(output, node, "zenoh-fs.json5")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write("// Generated by backend/flask-app/zenoh_shards.py, edit the ring file instead\n")
+            json.dump(node_config(shards), f, indent=2)
+            f.write("\n")
+        print(f"💾 {path}: {len(shards)} partitions")
+
+
+def rebalance(ring, previous, workers):
+    moves, drops = rebalance_plan(previous, ring)
+    failed = 0
+    for space, partition, sources, gained in moves:
+        logger.info(f"📦 Copying {space}/{partition} to {', '.join(gained)}")
+        failed += copy_partition(space, partition, workers)[1]
+    if failed:
+        print(f"❌ {failed} objects could not be copied, keep the previous ring until a rerun succeeds")
+        return False
+    print(f"✅ Copied {len(moves)} partitions")
+    for node, space, partition in drops:
+        print(f" - {node} no longer needs {storage_dir(space, partition)}")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Zenoh storage shards")
+    parser.add_argument("action", choices=["plan", "configs", "rebalance"], help="Action to perform")
+    parser.add_argument("--ring", required=True, help="Ring file with the nodes, replicas and prefix length")
+    parser.add_argument("--previous", help="Ring file of the layout currently deployed")
+    parser.add_argument("--output", default=".", help="Directory holding one config directory per node")
+    parser.add_argument("--workers", type=int, default=8, help="Objects copied in parallel by rebalance")
+    args = parser.parse_args()
+
+    ring = HashRing.load(args.ring)
+    previous = HashRing.load(args.previous) if args.previous else None
+    if previous is not None and previous.prefix_length != ring.prefix_length:
+        print("❌ Error: the rings have different prefix lengths, every partition would move")
+        return
+
+    if args.action == "plan":
+        print_plan(ring, previous)
+    elif args.action == "configs":
+        write_configs(ring, previous, args.output)
+    elif args.action == "rebalance":
+        if previous is None:
+            print("❌ Error: --previous is required for rebalancing")
+            return
+        rebalance(ring, previous, args.workers)
+
+
+if __name__ == "__main__":
+    main()
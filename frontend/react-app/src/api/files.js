@@ -51,6 +51,33 @@ export const FILES_API = {
     return response.data.files;
   },
 
+  openUploadSession: async (formData) => {
+    const response = await fetch(`${BASE_URL}/file/upload/async/session`, {
+      method: "POST",
+      body: formData,
+    });
+
+    if (!response.ok) {
+      const error = await response.text();
+      throw new Error(error || "Failed to open upload session");
+    }
+
+    return response.json();
+  },
+
+  // Chunks the server already holds for a chunked upload, or null if its session is gone
+  getUploadStatus: async (fileId) => {
+    const response = await fetch(`${BASE_URL}/file/upload/async/${fileId}`);
+    if (response.status === 404) return null;
+
+    if (!response.ok) {
+      const error = await response.text();
+      throw new Error(error || "Failed to get upload status");
+    }
+
+    return response.json();
+  },
+
   uploadChunk: async (formData) => {
     const response = await fetch(`${BASE_URL}/file/upload/async`, {
       method: "POST",
@@ -65,25 +92,29 @@ export const FILES_API = {
     return response.json();
   },
   
+  // The browser downloads straight from the download proxy, without buffering the file here
   downloadFile: async (fileId) => {
-    const response = await axios.get(`${BASE_URL}/file/${fileId}`, {
-      responseType: "blob", // ← to handle binary data
-    });
+    let url, filename;
+    try {
+      ({ url, filename } = (await axios.get(`${BASE_URL}/file/${fileId}/download-url`)).data);
+    } catch (error) {
+      if (error.response?.status !== 503) throw error;
+      // Signed URLs are not configured: download through the API instead
+      const response = await axios.get(`${BASE_URL}/file/${fileId}`, { responseType: "blob" });
+      url = window.URL.createObjectURL(new Blob([response.data]));
+      filename = response.headers["content-disposition"]?.match(/filename="?([^"]+)"?/)?.[1];
+    }
 
-    const blob = new Blob([response.data]);
-    const url = window.URL.createObjectURL(blob);
     const link = document.createElement("a");
-
-    const disposition = response.headers["content-disposition"];
-    const filenameMatch = disposition?.match(/filename="?([^"]+)"?/);
-    const filename = filenameMatch?.[1] || "downloaded_file";
-
     link.href = url;
-    link.setAttribute("download", filename);
+    link.setAttribute("download", filename || "downloaded_file");
     document.body.appendChild(link);
     link.click();
     link.remove();
-    window.URL.revokeObjectURL(url);
+    if (url.startsWith("blob:")) {
+      // Released once the click has handed the Blob to the download
+      setTimeout(() => window.URL.revokeObjectURL(url));
+    }
   },
 
   deleteFile: async (fileId) => {
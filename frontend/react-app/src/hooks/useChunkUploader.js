@@ -6,6 +6,14 @@ import { pollMergeTask } from "./polling";
 import { extractFileName } from "../utils/fileHelpers";
 
 const CHUNK_SIZE = 2 * 1024 * 1024;
+const CHUNK_CONCURRENCY = 6;
+
+// SHA1 of a chunk for server-side verification (crypto.subtle is only available in secure contexts)
+const sha1Hex = async blob => {
+  if (!window.crypto?.subtle) return null;
+  const digest = await window.crypto.subtle.digest("SHA-1", await blob.arrayBuffer());
+  return Array.from(new Uint8Array(digest), b => b.toString(16).padStart(2, "0")).join("");
+};
 
 const FIELD_MAP = {
   name: "upload_filename",
@@ -18,9 +26,10 @@ export const useChunkUploader = ({ setFiles }) => {
 
   const uploadFile = async (fileObj, index) => {
     const file = fileObj.file;
-    const totalChunks = Math.ceil(file.size / CHUNK_SIZE);
+    const totalChunks = Math.max(1, Math.ceil(file.size / CHUNK_SIZE));
     let uploadedChunks = 0;
     let fileId = fileObj.fileId || null;
+    let chunksToSend = Array.from({ length: totalChunks }, (_, i) => i);
 
     const steps = ["Uploading", "Merging", "Processing"];
     setFiles(prev => {
@@ -32,75 +41,144 @@ export const useChunkUploader = ({ setFiles }) => {
       return updated;
     });
 
-    for (let i = 0; i < totalChunks; i++) {
-      const chunkIndex = i;
-      const chunk = file.slice(chunkIndex * CHUNK_SIZE, (chunkIndex + 1) * CHUNK_SIZE);
-      const currentFileId = fileId; // capture current value
-      const formData = new FormData();
-      formData.append("file", chunk);
-      formData.append("chunk_index", chunkIndex);
-      formData.append("total_chunks", totalChunks);
-      formData.append("filename", file.name);
-      formData.append("project_id", fileObj.projectId);
-      if (currentFileId) formData.append("file_id", currentFileId);
+    const markUploadFailed = () => {
+      showMessage(toast, "error", `Failed to upload ${file.name}.`);
+
+      setFiles(prev =>
+        prev.map((f, idx) =>
+          idx === index
+            ? {
+                ...f,
+                statuses: f.statuses.map(s =>
+                  s.step === "Uploading" ? { ...s, status: "❌ Upload Failed!" } : s
+                ),
+              }
+            : f
+        )
+      );
+    };
+
+    // Resuming: only send the chunks the server does not hold yet
+    if (fileId) {
+      try {
+        const status = await FILES_API.getUploadStatus(fileId);
+        if (!status || status.status === "expired") {
+          fileId = null; // Session gone: start a new one
+        } else if (status.status !== "uploading") {
+          // Already merging or merged
+          setFiles(prev =>
+            prev.map((f, idx) =>
+              idx === index
+                ? {
+                    ...f,
+                    progress: 100,
+                    statuses: f.statuses.map(s =>
+                      s.step === "Uploading" ? { ...s, status: "✅ Upload Complete!" } : s
+                    ),
+                  }
+                : f
+            )
+          );
+          return;
+        } else {
+          // Every chunk is there but the merge never started: re-sending the last one starts it
+          chunksToSend = status.missing_chunks.length ? status.missing_chunks : [totalChunks - 1];
+          uploadedChunks = totalChunks - chunksToSend.length;
+        }
+      } catch (err) {
+        console.error("❌ Upload error:", err);
+        markUploadFailed();
+        return;
+      }
+    }
 
+    // Open the upload session first, so chunks can be sent in parallel and in any order
+    if (!fileId) {
       try {
-        const data = await FILES_API.uploadChunk(formData);
-        uploadedChunks++;
+        const sessionData = new FormData();
+        sessionData.append("filename", file.name);
+        sessionData.append("project_id", fileObj.projectId);
+        sessionData.append("total_chunks", totalChunks);
+        const session = await FILES_API.openUploadSession(sessionData);
+        fileId = session.file_id;
 
         setFiles(prev => {
           const updated = [...prev];
           const f = updated[index];
-
-          f.progress = Math.round((uploadedChunks / totalChunks) * 100);
-
-          if (chunkIndex === 0 && data.file_id) {
-            fileId = data.file_id;
-            f.fileId = fileId;
-            f.file.id = fileId;
-            f.id = fileId;
-          }
-
-          if (data.merge_task_id) f.mergeTaskId = data.merge_task_id;
-          if (data.metadata_task_id) f.metadataTaskId = data.metadata_task_id;
-
-          f.statuses = f.statuses.map(s =>
-            s.step === "Uploading"
-              ? {
-                  ...s,
-                  status:
-                    uploadedChunks === totalChunks
-                      ? "✅ Upload Complete!"
-                      : `⏳ Uploading ${uploadedChunks}/${totalChunks}`,
-                }
-              : s
-          );
-
+          f.fileId = fileId;
+          f.file.id = fileId;
+          f.id = fileId;
           return updated;
         });
-
-        if (chunkIndex === totalChunks - 1 && fileId) {
-          showMessage(toast, "success", `File ${file.name} uploaded successfully!`);
-          pollMergeTask(data.merge_task_id, index, file.name, setFiles, toast);
-        }
       } catch (err) {
         console.error("❌ Upload error:", err);
-        showMessage(toast, "error", `Failed to upload ${file.name}.`);
+        markUploadFailed();
+        return;
+      }
+    }
 
-        setFiles(prev =>
-          prev.map((f, idx) =>
-            idx === index
-              ? {
-                  ...f,
-                  statuses: f.statuses.map(s =>
-                    s.step === "Uploading" ? { ...s, status: "❌ Upload Failed!" } : s
-                  ),
-                }
-              : f
-          )
+    const uploadChunk = async chunkIndex => {
+      const chunk = file.slice(chunkIndex * CHUNK_SIZE, (chunkIndex + 1) * CHUNK_SIZE);
+      const formData = new FormData();
+      formData.append("file", chunk);
+      formData.append("chunk_index", chunkIndex);
+      formData.append("total_chunks", totalChunks);
+      formData.append("filename", file.name);
+      formData.append("project_id", fileObj.projectId);
+      formData.append("file_id", fileId);
+      const checksum = await sha1Hex(chunk);
+      if (checksum) formData.append("checksum", checksum);
+
+      const data = await FILES_API.uploadChunk(formData);
+      uploadedChunks++;
+
+      setFiles(prev => {
+        const updated = [...prev];
+        const f = updated[index];
+
+        f.progress = Math.round((uploadedChunks / totalChunks) * 100);
+
+        if (data.merge_task_id) f.mergeTaskId = data.merge_task_id;
+        if (data.metadata_task_id) f.metadataTaskId = data.metadata_task_id;
+
+        f.statuses = f.statuses.map(s =>
+          s.step === "Uploading"
+            ? {
+                ...s,
+                status:
+                  uploadedChunks === totalChunks
+                    ? "✅ Upload Complete!"
+                    : `⏳ Uploading ${uploadedChunks}/${totalChunks}`,
+              }
+            : s
         );
-        return;
+
+        return updated;
+      });
+
+      // Whichever chunk completes the set starts the merge
+      if (data.merge_task_id) {
+        showMessage(toast, "success", `File ${file.name} uploaded successfully!`);
+        pollMergeTask(data.merge_task_id, index, file.name, setFiles, toast);
+      }
+    };
+
+    // ⚡ Keep up to CHUNK_CONCURRENCY chunk requests in flight
+    let nextChunk = 0;
+    const worker = async () => {
+      while (nextChunk < chunksToSend.length) {
+        await uploadChunk(chunksToSend[nextChunk++]);
       }
+    };
+
+    try {
+      await Promise.all(
+        Array.from({ length: Math.min(CHUNK_CONCURRENCY, chunksToSend.length) }, worker)
+      );
+    } catch (err) {
+      console.error("❌ Upload error:", err);
+      nextChunk = chunksToSend.length; // Stop the other workers
+      markUploadFailed();
     }
   };
 